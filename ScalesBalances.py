@@ -1,42 +1,280 @@
 
 # ScalesBalances.py
 import streamlit as st
+import codecs
+import hashlib
 import json
 import math
+import os
 import re
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from functools import lru_cache
+from typing import NamedTuple, Optional
 
+import numpy as np
+import pandas as pd
+
+from certificateModel import Certificate
+from instrumentation import medir, registrar_cache
+from modelSearch import ModelSearchIndex, normalizar
+from unitRegistry import ADIMENSIONAL, NUMERO, UNIDADES
+
+@medir('cargar_json')
 def cargar_json(filename):
+    # Se lee el archivo una sola vez; si no es UTF-8 se decodifica como ISO-8859-1 sin volver a leerlo
     try:
-        with open(filename, 'r', encoding='utf-8') as file:
-            return json.load(file)
+        with open(filename, 'rb') as file:
+            contenido = file.read()
+        try:
+            texto = contenido.decode('utf-8')
+        except UnicodeDecodeError:
+            texto = contenido.decode('iso-8859-1')
+        return json.loads(texto)
+    except Exception as e:
+        raise Exception(f"Error al cargar el archivo {filename}: {e}")
+
+def _detectar_codificacion(filename, tamano_bloque=1 << 20):
+    # Mismo criterio que cargar_json: UTF-8 si todo el archivo es válido, si no ISO-8859-1
+    decodificador = codecs.getincrementaldecoder('utf-8')()
+    try:
+        with open(filename, 'rb') as file:
+            for bloque in iter(lambda: file.read(tamano_bloque), b''):
+                decodificador.decode(bloque)
+        decodificador.decode(b'', final=True)
+        return 'utf-8'
     except UnicodeDecodeError:
-        with open(filename, 'r', encoding='iso-8859-1') as file:
-            return json.load(file)
+        return 'iso-8859-1'
+
+def iterar_json(filename, tamano_bloque=1 << 16, desplazamientos=False):
+    """Recorre un archivo con un arreglo JSON devolviendo sus elementos uno a uno.
+
+    Sólo mantiene en memoria el bloque leído y el elemento en curso, por lo que sirve para
+    exportaciones del datalogger que no caben en memoria. Con desplazamientos=True devuelve
+    (elemento, inicio, fin), con la posición en bytes del elemento dentro del archivo.
+    """
+    decodificador = json.JSONDecoder()
+    codificacion = _detectar_codificacion(filename)
+    try:
+        # newline='' conserva los \r\n para que las posiciones coincidan con los bytes del archivo
+        with open(filename, 'r', encoding=codificacion, newline='') as file:
+            buffer, pos, fin_archivo = '', 0, False
+            esperado = '['
+            # Bytes consumidos antes de buffer[pos]; los separadores JSON son ASCII (un byte)
+            consumidos = 0
+            while True:
+                inicio_espacios = pos
+                while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+                    pos += 1
+                consumidos += pos - inicio_espacios
+                if pos == len(buffer):
+                    if fin_archivo:
+                        raise ValueError("Fin de archivo inesperado")
+                    bloque = file.read(tamano_bloque)
+                    buffer, pos, fin_archivo = bloque, 0, not bloque
+                    continue
+                caracter = buffer[pos]
+                if esperado == '[':
+                    if caracter != '[':
+                        raise ValueError("Se esperaba un arreglo JSON")
+                    pos, esperado, consumidos = pos + 1, 'valor o ]', consumidos + 1
+                elif caracter == ']' and esperado != 'valor':
+                    return
+                elif esperado == ', o ]':
+                    if caracter != ',':
+                        raise ValueError(f"Se esperaba ',' o ']' y se encontró '{caracter}'")
+                    pos, esperado, consumidos = pos + 1, 'valor', consumidos + 1
+                else:
+                    try:
+                        elemento, fin = decodificador.raw_decode(buffer, pos)
+                        completo = fin < len(buffer) or fin_archivo
+                    except json.JSONDecodeError:
+                        if fin_archivo:
+                            raise
+                        completo = False
+                    if not completo:
+                        # Elemento incompleto: se amplía el buffer al doble para que el coste sea lineal
+                        bloque = file.read(max(tamano_bloque, len(buffer) - pos))
+                        buffer, pos, fin_archivo = buffer[pos:] + bloque, 0, not bloque
+                        continue
+                    if desplazamientos:
+                        inicio = consumidos
+                        consumidos += len(buffer[pos:fin].encode(codificacion))
+                        yield elemento, inicio, consumidos
+                    else:
+                        yield elemento
+                    pos, esperado = fin, ', o ]'
     except Exception as e:
         raise Exception(f"Error al cargar el archivo {filename}: {e}")
 
+def _clave_nominal(nominal):
+    # Redondeo equivalente a la tolerancia de 1e-6 usada al comparar nominales
+    return round(float(nominal), 6)
+
+class CertificateStore:
+    """Índices hash sobre los certificados del LabRowe datalogger.
+
+    Se construye una sola vez a partir del JSON cargado y resuelve las búsquedas
+    por CertNo, (CertNo, Group), (CertNo, Group, Units, Nominal) y Model en O(1).
+    Ante claves repetidas conserva la primera aparición, igual que el recorrido lineal.
+    """
+
+    @medir('CertificateStore')
+    def __init__(self, labrowe_datalogger_data=()):
+        self.certificados = []
+        self.por_certno = {}
+        self.por_grupo = {}
+        self.por_medicion = {}
+        self.por_modelo = {}
+        for certificado in labrowe_datalogger_data:
+            self.agregar(certificado)
+
+    def agregar(self, certificado):
+        # Los diccionarios del JSON se convierten una sola vez al modelo tipado
+        certificado = Certificate.desde_dict(certificado)
+        self.certificados.append(certificado)
+        self._buscador = None
+        cert_no = certificado.cert_no
+        self.por_certno.setdefault(cert_no, certificado)
+        self.por_modelo.setdefault(certificado.model, []).append(certificado)
+        for datasheet in certificado.datasheet:
+            self.por_grupo.setdefault((cert_no, datasheet.group), datasheet)
+            for measurement in datasheet.measurements:
+                if math.isnan(measurement.nominal):
+                    continue
+                clave = (cert_no, datasheet.group, measurement.units, _clave_nominal(measurement.nominal))
+                self.por_medicion.setdefault(clave, measurement)
+
+    def __iter__(self):
+        return iter(self.certificados)
+
+    def __len__(self):
+        return len(self.certificados)
+
+    def cert_nos(self):
+        """CertNo de cada certificado en el orden del recorrido, repetidos incluidos."""
+        return (certificado.cert_no for certificado in self.certificados)
+
+    def __contains__(self, cert_no):
+        return cert_no in self.por_certno
+
+    def certificado(self, cert_no):
+        try:
+            return self.por_certno[cert_no]
+        except KeyError:
+            raise ValueError(f"No se encontró el certificado {cert_no}")
+
+    def grupos(self, cert_no):
+        grupos = []
+        for datasheet in self.certificado(cert_no).datasheet:
+            if datasheet.group not in grupos:
+                grupos.append(datasheet.group)
+        return grupos
+
+    def datasheet(self, cert_no, grupo):
+        try:
+            return self.por_grupo[(cert_no, grupo)]
+        except KeyError:
+            raise ValueError(f"No se encontró el grupo {grupo} en el certificado {cert_no}")
+
+    def mediciones(self, cert_no, grupo):
+        return self.datasheet(cert_no, grupo).measurements
+
+    def medicion(self, cert_no, grupo, unidad, nominal):
+        return self.por_medicion.get((cert_no, grupo, unidad, _clave_nominal(nominal)))
+
+    def modelos(self):
+        return list(self.por_modelo)
+
+    def certificados_por_modelo(self, modelo):
+        return self.por_modelo.get(modelo, [])
+
+    def encabezados_por_modelo(self, modelo):
+        """Certificados de un modelo para mostrar su encabezado, como encabezado()."""
+        return self.certificados_por_modelo(modelo)
+
+    def fichas_modelo(self):
+        """Ternas (Model, Manufacturer, AssetDescription) de todos los certificados, para ModelSearchIndex."""
+        return ((c.model, c.manufacturer, c.asset_description) for c in self.certificados)
+
+    def buscador_modelos(self):
+        # Se construye en la primera búsqueda y se descarta cuando se añaden certificados
+        if getattr(self, '_buscador', None) is None:
+            self._buscador = ModelSearchIndex(self.fichas_modelo())
+        return self._buscador
+
+    def encabezado(self, cert_no):
+        """Certificado para mostrar su encabezado; los stores que pueden evitarlo no cargan el Datasheet."""
+        return self.certificado(cert_no)
+
+    def filas_lote(self, cert_nos=None, grupo=None):
+        """DataFrame con las columnas COLUMNAS_LOTE de las mediciones de los certificados indicados
+        (todos si cert_nos es None), opcionalmente de un solo grupo."""
+        certificados = self if cert_nos is None else [self.certificado(cert_no) for cert_no in cert_nos]
+        filas = []
+        for certificado in certificados:
+            for datasheet in certificado.datasheet:
+                if grupo is not None and datasheet.group != grupo:
+                    continue
+                for m in datasheet.measurements:
+                    filas.append((certificado.cert_no, datasheet.group, m.row_id, m.units, _parametro(m), m.nominal,
+                                  m.meas_uncert, m.low_limit, m.high_limit, m.tur_texto))
+        return pd.DataFrame(filas, columns=COLUMNAS_LOTE)
+
+    def estandares(self):
+        """Pares (CertNo, Standards) de todos los certificados, para construir StandardsIndex."""
+        return ((certificado.cert_no, certificado.standards) for certificado in self.certificados)
+
+# Stores e índices construidos a partir de listas crudas, por identidad de la lista, para que
+# las funciones que reciben el JSON cargado no reconstruyan el índice en cada llamada
+_MEMO_LISTAS = OrderedDict()
+_MAX_MEMO_LISTAS = 8
+_memo_lock = threading.Lock()
+
+def _memoizado(clase, datos):
+    """clase(datos), reutilizado mientras se pase la misma lista sin cambiar su longitud.
+
+    Los cambios que no alteran la longitud no se detectan: para datos que cambian, pase el store.
+    """
+    if not isinstance(datos, (list, tuple)):
+        return clase(datos)
+    clave = (clase, id(datos))
+    with _memo_lock:
+        entrada = _MEMO_LISTAS.get(clave)
+        # Se guarda la propia lista: mientras siga en la caché su id no se puede reutilizar
+        if entrada is not None and entrada[0] is datos and entrada[1] == len(datos):
+            _MEMO_LISTAS.move_to_end(clave)
+            return entrada[2]
+    instancia = clase(datos)
+    with _memo_lock:
+        _MEMO_LISTAS[clave] = (datos, len(datos), instancia)
+        while len(_MEMO_LISTAS) > _MAX_MEMO_LISTAS:
+            _MEMO_LISTAS.popitem(last=False)
+    return instancia
+
+def _como_store(labrowe_datalogger_data):
+    if isinstance(labrowe_datalogger_data, CertificateStore):
+        return labrowe_datalogger_data
+    return _memoizado(CertificateStore, labrowe_datalogger_data)
+
+@medir('buscar_en_labrowe_datalogger')
 def buscar_en_labrowe_datalogger(labrowe_datalogger_data, certificado_objetivo, grupo_objetivo, nominal_objetivo_str, unidad_objetivo):
     try:
         nominal_objetivo = float(nominal_objetivo_str)
     except ValueError:
         raise ValueError(f"Error al convertir el valor nominal '{nominal_objetivo_str}' a float")
 
-    for certificado in labrowe_datalogger_data:
-        if certificado['CertNo'] == certificado_objetivo:
-            for datasheet in certificado['Datasheet']:
-                if datasheet['Group'] == grupo_objetivo:
-                    for measurement in datasheet['Measurements']:
-                        if measurement['Units'] == unidad_objetivo and abs(float(measurement['Nominal']) - nominal_objetivo) < 1e-6:
-                            return float(measurement['MeasUncert'])
+    measurement = _como_store(labrowe_datalogger_data).medicion(certificado_objetivo, grupo_objetivo, unidad_objetivo, nominal_objetivo)
+    if measurement is not None:
+        if math.isnan(measurement.meas_uncert):
+            raise ValueError(f"MeasUncert inválido para el certificado {certificado_objetivo}, grupo {grupo_objetivo}, nominal {nominal_objetivo_str}")
+        return measurement.meas_uncert
     raise ValueError(f"No se encontró coincidencia para el certificado {certificado_objetivo}, grupo {grupo_objetivo}, nominal {nominal_objetivo_str}, unidad {unidad_objetivo}")
 
 def elegir_modelo(labrowe_datalogger_data):
-    input_usuario = input("Ingrese las primeras letras del modelo: ").upper()
-    modelos_disponibles = []
-    for certificado in labrowe_datalogger_data:
-        modelo = certificado['Model']
-        if modelo not in modelos_disponibles and modelo.upper().startswith(input_usuario):
-            modelos_disponibles.append(modelo)
+    input_usuario = input("Ingrese las primeras letras del modelo: ")
+    modelos_disponibles = _como_store(labrowe_datalogger_data).buscador_modelos().buscar(input_usuario, limite=None, modo='prefijo')
     if not modelos_disponibles:
         raise Exception("No se encontraron modelos que coincidan con su búsqueda.")
     print("Modelos disponibles que coinciden con su búsqueda:")
@@ -48,13 +286,8 @@ def elegir_modelo(labrowe_datalogger_data):
     return modelos_disponibles[seleccion]
 
 def elegir_grupo(labrowe_datalogger_data, certificado_objetivo):
-    grupos_disponibles = []
-    for certificado in labrowe_datalogger_data:
-        if certificado['CertNo'] == certificado_objetivo:
-            for datasheet in certificado['Datasheet']:
-                grupo = datasheet['Group']
-                if grupo not in grupos_disponibles:
-                    grupos_disponibles.append(grupo)
+    store = _como_store(labrowe_datalogger_data)
+    grupos_disponibles = store.grupos(certificado_objetivo) if certificado_objetivo in store else []
     if not grupos_disponibles:
         raise Exception("No se encontraron grupos para el certificado proporcionado.")
     print("Grupos disponibles:")
@@ -66,20 +299,20 @@ def elegir_grupo(labrowe_datalogger_data, certificado_objetivo):
     return grupos_disponibles[seleccion]
 
 def elegir_nominal(labrowe_datalogger_data, certificado_objetivo, grupo_objetivo):
+    try:
+        mediciones = _como_store(labrowe_datalogger_data).mediciones(certificado_objetivo, grupo_objetivo)
+    except ValueError:
+        mediciones = []
     nominales_disponibles = []
-    for certificado in labrowe_datalogger_data:
-        if certificado['CertNo'] == certificado_objetivo:
-            for datasheet in certificado['Datasheet']:
-                if datasheet['Group'] == grupo_objetivo:
-                    for measurement in datasheet['Measurements']:
-                        nominal = measurement['Nominal']
-                        if nominal not in nominales_disponibles:
-                            nominales_disponibles.append(nominal)
+    for measurement in mediciones:
+        nominal = measurement['Nominal']
+        if nominal not in nominales_disponibles:
+            nominales_disponibles.append(nominal)
     if not nominales_disponibles:
         raise Exception("No se encontraron nominales para el grupo proporcionado.")
     print("Valores nominales disponibles:")
     for i, nominal in enumerate(nominales_disponibles, start=1):
-        print(f"{i}. {nominal} {datasheet['Measurements'][0]['Units']}")
+        print(f"{i}. {nominal} {mediciones[0]['Units']}")
     seleccion = int(input("Seleccione el número del valor nominal deseado: ")) - 1
     if seleccion < 0 or seleccion >= len(nominales_disponibles):
         raise ValueError("Selección de nominal inválida.")
@@ -96,125 +329,494 @@ def elegir_unidad():
     return unidades_disponibles[seleccion]
 
 def convertir_unidad(valor, unidad_origen, unidad_destino):
-    conversiones = {
-        'g': 1,
-        'kg': 1e3,
-        'lb': 453.59237,
-        '°C': 1,
-        '%RH': 1,
-        '°F': 1
-    }
-    
-    if unidad_origen == unidad_destino:
-        return valor
-    
-    if unidad_origen in ['g', 'kg', 'lb'] and unidad_destino in ['g', 'kg', 'lb']:
-        return valor * conversiones[unidad_origen] / conversiones[unidad_destino]
-    elif unidad_origen == '°F' and unidad_destino == '°C':
-        return (valor - 32) * 5/9
-    elif unidad_origen == '°C' and unidad_destino == '°F':
-        return valor * 9/5 + 32
-    else:
-        raise ValueError(f"Conversión no soportada: de {unidad_origen} a {unidad_destino}")
+    """Convierte lecturas (escalares o arreglos) entre unidades de la misma magnitud; ver unitRegistry."""
+    return UNIDADES.convertir(valor, unidad_origen, unidad_destino)
 
 def convertir_unidad_a_gramos(valor, unidad):
-    conversiones = {
-        'µg': 1e-6,
-        'μg': 1e-6,
-        'mg': 1e-3,
-        'g': 1,
-        'kg': 1e3
-    }
-    if '/' in unidad:
-        unidad_base, unidad_referencia = unidad.split('/')
-        valor_base = valor * conversiones.get(unidad_base.strip(), 0)
-        numero_referencia = float(re.findall(r'\d+', unidad_referencia)[0]) if re.findall(r'\d+', unidad_referencia) else 1.0
-        if 'kg' in unidad_referencia:
-            return valor_base / (numero_referencia * conversiones['kg'])
-        elif 'g' in unidad_referencia:
-            return valor_base / (numero_referencia * conversiones['g'])
-    else:
-        return valor * conversiones.get(unidad, 0)
+    """Masa en gramos; para proporciones de masa ('μg/g', 'g / 25 kg') devuelve la fracción adimensional."""
+    if UNIDADES.magnitud(unidad) == ADIMENSIONAL:
+        return UNIDADES.a_base(valor, unidad)
+    return UNIDADES.convertir(valor, unidad, 'g')
+
+
+class RangeIndex:
+    """Índice precompilado de los rangos CMC del alcance, agrupado por Equipment.
+
+    Por cada Equipment guarda los límites ordenados de todos sus rangos y, para cada
+    punto límite y cada intervalo entre límites, el primer registro (en el orden del
+    archivo) que lo cubre. Así una búsqueda es una bisección y devuelve el mismo registro
+    que el recorrido lineal. Al construirse anota los rangos solapados y los huecos.
+
+    Los límites de cada Equipment se guardan en la unidad de su primer rango (Range.Unit);
+    los rangos en otra unidad de la misma magnitud ('°F' junto a '°C') se convierten a ella.
+    """
+
+    @medir('RangeIndex')
+    def __init__(self, certificado_data=()):
+        self.registros = list(certificado_data)
+        self.limites = {}
+        self.ganadores = {}
+        self.unidades = {}
+        self.rangos_invalidos = []
+        self.solapamientos = []
+        self.huecos = []
+        self.cmc = []
+        self.cmc_invalidos = []
+        por_equipo = {}
+        for posicion, registro in enumerate(self.registros):
+            por_equipo.setdefault(registro['Equipment'], []).append(posicion)
+            try:
+                self.cmc.append(compilar_cmc(registro['CMC']))
+            except ValueError as e:
+                self.cmc.append(None)
+                self.cmc_invalidos.append((registro['ID'], str(e)))
+        for equipment, posiciones in por_equipo.items():
+            self._compilar(equipment, posiciones)
+
+    def _compilar(self, equipment, posiciones):
+        unidad = self.unidades[equipment] = self.registros[posiciones[0]]['Range'].get('Unit')
+        rangos = []
+        for p in posiciones:
+            rango = self.registros[p]['Range']
+            minimo, maximo = rango['Min'], rango['Max']
+            if unidad is not None and rango.get('Unit', unidad) != unidad:
+                try:
+                    minimo, maximo = UNIDADES.convertir(np.array([minimo, maximo], dtype=float), rango['Unit'], unidad).tolist()
+                except ValueError as e:
+                    self.rangos_invalidos.append((self.registros[p]['ID'], str(e)))
+                    continue
+            rangos.append((minimo, maximo, p))
+        if not rangos:
+            return
+        limites = sorted({valor for minimo, maximo, _ in rangos for valor in (minimo, maximo)})
+        # Ranura 2i: el punto limites[i]; ranura 2i+1: el intervalo abierto (limites[i], limites[i+1])
+        ganadores = np.full(2 * len(limites) - 1, -1, dtype=np.intp)
+        for minimo, maximo, posicion in rangos:
+            tramo = ganadores[2 * bisect_left(limites, minimo):2 * bisect_left(limites, maximo) + 1]
+            tramo[tramo < 0] = posicion
+        self.limites[equipment] = np.array(limites, dtype=float)
+        self.ganadores[equipment] = ganadores
 
+        ordenados = sorted(rangos)
+        fin, posicion_fin = ordenados[0][1], ordenados[0][2]
+        for minimo, maximo, posicion in ordenados[1:]:
+            if minimo < fin:
+                self.solapamientos.append((equipment, self.registros[posicion_fin]['ID'], self.registros[posicion]['ID']))
+            elif minimo > fin:
+                self.huecos.append((equipment, fin, minimo))
+            if maximo > fin:
+                fin, posicion_fin = maximo, posicion
 
+    def __iter__(self):
+        return iter(self.registros)
+
+    def __len__(self):
+        return len(self.registros)
+
+    def _en_unidad_alcance(self, valor, equipment, unidad):
+        # Sin unidad se asume que el valor ya está en la unidad de los rangos del Equipment
+        unidad_alcance = self.unidades.get(equipment)
+        if unidad is None or unidad_alcance is None or unidad == unidad_alcance:
+            return valor
+        return UNIDADES.convertir(valor, unidad, unidad_alcance)
+
+    @medir('RangeIndex.buscar_posicion')
+    def buscar_posicion(self, valor, equipment, unidad=None):
+        """Posición del registro que cubre valor (en `unidad`, o en la de los rangos si es None), o -1."""
+        limites = self.limites.get(equipment)
+        if limites is None:
+            return -1
+        valor = self._en_unidad_alcance(valor, equipment, unidad)
+        i = bisect_left(limites, valor)
+        if i < len(limites) and limites[i] == valor:
+            ranura = 2 * i
+        elif 0 < i < len(limites):
+            ranura = 2 * i - 1
+        else:
+            return -1
+        return self.ganadores[equipment][ranura]
+
+    def buscar(self, valor, equipment, unidad=None):
+        posicion = self.buscar_posicion(valor, equipment, unidad)
+        return self.registros[posicion] if posicion >= 0 else None
+
+    def buscar_posiciones(self, valores, equipment, unidad=None):
+        """Resuelve un arreglo de valores; devuelve la posición de cada registro o -1 si no hay rango."""
+        valores = np.asarray(valores, dtype=float)
+        limites = self.limites.get(equipment)
+        if limites is None:
+            return np.full(valores.shape, -1, dtype=np.intp)
+        valores = np.asarray(self._en_unidad_alcance(valores, equipment, unidad), dtype=float)
+        i = np.searchsorted(limites, valores, side='left')
+        exacto = limites[np.minimum(i, len(limites) - 1)] == valores
+        ranura = np.where(exacto, 2 * i, 2 * i - 1)
+        valido = exacto | ((i > 0) & (i < len(limites)))
+        ganadores = self.ganadores[equipment]
+        return np.where(valido, ganadores[np.clip(ranura, 0, len(ganadores) - 1)], -1)
+
+def _como_indice_rango(certificado_data):
+    if isinstance(certificado_data, RangeIndex):
+        return certificado_data
+    return _memoizado(RangeIndex, certificado_data)
+
+@medir('identificar_rango_en_certificado')
 def identificar_rango_en_certificado(certificado_data, valor, unidad):
-    for registro in certificado_data:
-        if registro['Equipment'] == unidad:
-            minimo = registro['Range']['Min']
-            maximo = registro['Range']['Max']
-            if minimo <= valor <= maximo:
-                return registro['ID'], registro['CMC']
-    raise ValueError(f"No se encontró un rango adecuado para {valor} {unidad}")
+    registro = _como_indice_rango(certificado_data).buscar(valor, unidad)
+    if registro is None:
+        raise ValueError(f"No se encontró un rango adecuado para {valor} {unidad}")
+    return registro['ID'], registro['CMC']
+
+_TERMINO_CMC = re.compile(rf'^\s*(?P<valor>{NUMERO})\s*(?P<unidad>.*?)\s*$')
+
+class CMC(NamedTuple):
+    """Expresión CMC compilada: término fijo en la unidad normalizada de su magnitud
+    y término proporcional adimensional (fracción de la lectura)."""
+    texto: str
+    magnitud: Optional[str]
+    fijo: float
+    proporcional: float
+
+def _unidad_cmc(unidad):
+    """(magnitud, factor, desplazamiento) hacia la unidad normalizada: kg, °C (K para diferencias), %RH, Pa..."""
+    unidad = UNIDADES.unidad(unidad)
+    return unidad.magnitud, unidad.factor, unidad.desplazamiento
+
+def _cantidad(texto):
+    coincidencia = _TERMINO_CMC.match(texto)
+    if coincidencia is None:
+        return 1.0, texto
+    return float(re.sub(r'[ \u00a0]', '', coincidencia['valor'])), coincidencia['unidad']
+
+def _compilar_termino_cmc(termino):
+    """Devuelve (magnitud, fijo, proporcional) de un término como '0.16 mg', '2.8 g / 25 kg' o '0.36 %'."""
+    if _TERMINO_CMC.match(termino) is None:
+        raise ValueError(f"Término CMC inválido: '{termino.strip()}'")
+    valor, texto_unidad = _cantidad(termino)
+    unidad = UNIDADES.unidad(texto_unidad)
+    if unidad.magnitud == ADIMENSIONAL:
+        # Las proporciones de una magnitud ('μg/g') la fijan para el CMC; '%' y 'ppm' no
+        magnitud = UNIDADES.magnitud(texto_unidad.split('/', 1)[0]) if '/' in texto_unidad else None
+        return magnitud, 0.0, valor * unidad.factor
+    if '/' in unidad.magnitud:
+        raise ValueError(f"Término CMC proporcional con magnitudes distintas: '{termino.strip()}'")
+    return unidad.magnitud, valor * unidad.factor, 0.0
+
+@lru_cache(maxsize=None)
+def compilar_cmc(cmc):
+    """Compila una cadena CMC ('3.5 μg + 0.33 μg/g', '0.25 °C + 0.36 %', '0.97 % RH', ...) una sola vez."""
+    magnitud = None
+    fijo = proporcional = 0.0
+    for termino in cmc.split('+'):
+        magnitud_termino, fijo_termino, proporcional_termino = _compilar_termino_cmc(termino)
+        if magnitud_termino is not None:
+            if magnitud not in (None, magnitud_termino):
+                raise ValueError(f"CMC con magnitudes incompatibles: '{cmc}'")
+            magnitud = magnitud_termino
+        fijo += fijo_termino
+        proporcional += proporcional_termino
+    return CMC(cmc, magnitud, fijo, proporcional)
+
+registrar_cache('compilar_cmc', lambda: compilar_cmc.cache_info()[:2])
 
 def extraer_cmc_fijo_proporcional(cmc):
-    partes = cmc.split('+')
-    if len(partes) == 1:
-        return float(partes[0].split()[0]), 0
-    cmc_fijo = float(partes[0].strip().split()[0])
-    cmc_proporcional = float(partes[1].strip().split()[0])
-    return cmc_fijo, cmc_proporcional
+    cmc_compilado = compilar_cmc(cmc)
+    return cmc_compilado.fijo, cmc_compilado.proporcional
 
-def calcular_incertidumbre(valor_nominal, cmc_fijo, cmc_proporcional, meas_uncert, unidad):
-    # Convertir todos los valores a gramos
-    valor_nominal_g = convertir_unidad_a_gramos(valor_nominal, unidad)
-    cmc_fijo_g = convertir_unidad_a_gramos(cmc_fijo, 'μg')
-    cmc_proporcional_g = convertir_unidad_a_gramos(cmc_proporcional, 'μg/g')
-    meas_uncert_g = convertir_unidad_a_gramos(meas_uncert, unidad)
+def _validar_magnitud(cmc_compilado, unidad):
+    magnitud = _unidad_cmc(unidad)[0]
+    if cmc_compilado.magnitud not in (None, magnitud):
+        raise ValueError(f"El CMC '{cmc_compilado.texto}' no es aplicable a mediciones en {unidad}")
+
+def _incertidumbre_combinada(valor_nominal, cmc_fijo, cmc_proporcional, meas_uncert, unidad):
+    # Llevar nominal e incertidumbre a la unidad normalizada de su magnitud; acepta escalares o arreglos de NumPy
+    _, factor, desplazamiento = _unidad_cmc(unidad)
+    valor_nominal_base = (valor_nominal + desplazamiento) * factor if desplazamiento else valor_nominal * factor
+    meas_uncert_base = meas_uncert * factor
 
     # Calcular CMC total
-    cmc_total = cmc_fijo_g + (cmc_proporcional_g * valor_nominal_g)
+    cmc_total = cmc_fijo + (cmc_proporcional * np.abs(valor_nominal_base))
 
     # Calcular incertidumbre combinada
-    incertidumbre_combinada = math.sqrt(cmc_total**2 + meas_uncert_g**2)
+    return cmc_total, np.sqrt(cmc_total**2 + meas_uncert_base**2)
+
+# Unidades en las que se presenta la incertidumbre total, con su escala desde la unidad normalizada
+_PRESENTACION_INCERTIDUMBRE = {
+    'masa': (('g', 1e3), ('mg', 1e6), ('μg', 1e9)),
+    'temperatura': (('°C', 1.0), ('K', 1.0), ('°F', 9 / 5)),
+    'humedad': (('%RH', 1.0),),
+}
+
+@medir('calcular_incertidumbre')
+def calcular_incertidumbre(valor_nominal, cmc_fijo, cmc_proporcional, meas_uncert, unidad):
+    """cmc_fijo va en la unidad normalizada de la magnitud (kg, K, %RH) y cmc_proporcional es adimensional."""
+    _, incertidumbre_combinada = _incertidumbre_combinada(valor_nominal, cmc_fijo, cmc_proporcional, meas_uncert, unidad)
 
-    # Convertir el resultado a diferentes unidades
-    return (
-        f"{incertidumbre_combinada:.4f} g",
-        f"{incertidumbre_combinada * 1000:.4f} mg",
-        f"{incertidumbre_combinada * 1e6:.4f} μg"
+    # Convertir el resultado a diferentes unidades; las demás magnitudes se presentan en la unidad medida
+    magnitud, factor, _ = _unidad_cmc(unidad)
+    return tuple(
+        f"{incertidumbre_combinada * escala:.4f} {simbolo}"
+        for simbolo, escala in _PRESENTACION_INCERTIDUMBRE.get(magnitud, ((unidad, 1 / factor),))
     )
 
+# Equipment del alcance termodinámico según EquipmentType, MeasParameter y MeasSubParameter de la
+# medición (sin acentos ni mayúsculas): vale la primera regla de la magnitud con alguna de sus
+# palabras en esos textos y, si su alcance no cubre el valor, la regla general (sin palabras)
+ALCANCES_TERMODINAMICOS = (
+    ('temperatura', ('punto de rocio', 'dew point'), 'Dew Point - Measuring Equipment'),
+    ('temperatura', ('termopar', 'thermocouple', 'tc tipo'), 'Temperature - Measuring Equipment (Thermocouples)'),
+    ('temperatura', ('infrarroj', 'infrared'), 'Infrared Temperature Thermometer'),
+    ('temperatura', ('bloque seco', 'dry block'), 'Temperature - Dry Blocks'),
+    ('temperatura', ('vidrio', 'liquid-in-glass'), 'Temperature - Liquid-in-Glass Thermometers'),
+    ('temperatura', ('camara', 'horno', 'congelador', 'chamber', 'oven', 'freezer'), 'Temperature - Measure (Temperature Chambers, Ovens, Freezers)'),
+    ('temperatura', ('datalogger', 'registrador', 'termohigrometro', 'ambient'), 'Temperature - Measuring Equipment (Ambient Equipment)'),
+    ('temperatura', (), 'Temperature - Measuring Equipment'),
+    ('humedad', ('camara', 'chamber', 'environmental', 'ambiental'), 'Relative Humidity - Measure & Environmental Testing'),
+    ('humedad', (), 'Relative Humidity - Measuring Equipment'),
+)
+
+@lru_cache(maxsize=1024)
+def _alcance(unidad, parametro=None, tipo_equipo=None):
+    """Devuelve (usa alcance de balanzas, Equipments candidatos en orden) para buscar el rango CMC."""
+    magnitud = UNIDADES.magnitud(unidad)
+    if magnitud == 'masa':
+        return True, ('Balances & Scales',)
+    texto = normalizar(' '.join(t for t in (tipo_equipo, parametro) if isinstance(t, str)))
+    candidatos = []
+    for magnitud_regla, palabras, equipment in ALCANCES_TERMODINAMICOS:
+        if magnitud_regla != magnitud:
+            continue
+        if not palabras or (not candidatos and any(palabra in texto for palabra in palabras)):
+            candidatos.append(equipment)
+    if not candidatos:
+        raise ValueError(f"No hay alcance CMC para mediciones en {unidad}")
+    return False, tuple(candidatos)
+
+def _parametro(measurement):
+    """MeasParameter y MeasSubParameter de una medición, para elegir el Equipment del alcance."""
+    return ' '.join(t.strip() for t in (measurement.meas_parameter, measurement.meas_sub_parameter) if t and t.strip())
+
+@medir('procesar_certificado')
 def procesar_certificado(labrowe_datalogger_data, certificado_balance_data, thermodynamics_data, certificado_objetivo, grupo_objetivo, nominal_objetivo, unidad_objetivo):
-    meas_uncert = buscar_en_labrowe_datalogger(labrowe_datalogger_data, certificado_objetivo, grupo_objetivo, nominal_objetivo, unidad_objetivo)
-    
-    if unidad_objetivo in ['g', 'kg', 'lb']:
-        valor_en_gramos = convertir_unidad(float(nominal_objetivo), unidad_objetivo, 'g')
-        id_cmc, cmc_string = identificar_rango_en_certificado(certificado_balance_data, valor_en_gramos, 'Balances & Scales')
-    elif unidad_objetivo in ['°C', '°F', '%RH']:
-        valor_convertido = convertir_unidad(float(nominal_objetivo), unidad_objetivo, '°C') if unidad_objetivo == '°F' else float(nominal_objetivo)
-        id_cmc, cmc_string = identificar_rango_en_certificado(thermodynamics_data, valor_convertido, unidad_objetivo)
+    store = _como_store(labrowe_datalogger_data)
+    meas_uncert = buscar_en_labrowe_datalogger(store, certificado_objetivo, grupo_objetivo, nominal_objetivo, unidad_objetivo)
+    measurement = store.medicion(certificado_objetivo, grupo_objetivo, unidad_objetivo, float(nominal_objetivo))
+
+    usa_balanzas, equipos = _alcance(unidad_objetivo, _parametro(measurement), store.encabezado(certificado_objetivo).equipment_type)
+    indice = _como_indice_rango(certificado_balance_data if usa_balanzas else thermodynamics_data)
+    for equipment in equipos:
+        posicion = indice.buscar_posicion(float(nominal_objetivo), equipment, unidad_objetivo)
+        if posicion >= 0:
+            break
     else:
-        raise ValueError(f"Unidad no soportada: {unidad_objetivo}")
+        raise ValueError(f"No se encontró un rango adecuado para {nominal_objetivo} {unidad_objetivo} en {equipos[0]}")
+    cmc = indice.cmc[posicion]
+    if cmc is None:
+        raise ValueError(f"CMC inválido en el rango {indice.registros[posicion]['ID']}: {indice.registros[posicion]['CMC']}")
+    _validar_magnitud(cmc, unidad_objetivo)
     
-    cmc_fijo, cmc_proporcional = extraer_cmc_fijo_proporcional(cmc_string)
-    total_uncertainty = calcular_incertidumbre(float(nominal_objetivo), cmc_fijo, cmc_proporcional, meas_uncert, unidad_objetivo)
+    total_uncertainty = calcular_incertidumbre(float(nominal_objetivo), cmc.fijo, cmc.proporcional, meas_uncert, unidad_objetivo)
     
     return {
         "meas_uncert": meas_uncert,
-        "cmc_used": cmc_string,
+        "cmc_used": cmc.texto,
         "total_uncertainty": total_uncertainty
     }
 
+def version_fuentes(*rutas):
+    """Hash de versión de los archivos de datos a partir de su ruta, mtime y tamaño.
+
+    Cambia en cuanto se reemplaza o modifica cualquiera de los archivos, sin leer su contenido.
+    """
+    firma = hashlib.sha256()
+    for ruta in rutas:
+        estado = os.stat(ruta)
+        firma.update(f"{ruta}\0{estado.st_mtime_ns}\0{estado.st_size}\n".encode('utf-8'))
+    return firma.hexdigest()[:16]
+
+class ResultCache:
+    """Caché LRU acotada de resultados de procesar_certificado, segura entre hilos.
+
+    La clave es (CertNo, Group, Nominal, Units), con el nominal redondeado igual que en la
+    búsqueda del datalogger. Cada entrada pertenece a una versión de los archivos de datos
+    (ver version_fuentes): al consultar con otra versión la caché se vacía entera. Sólo se
+    guardan los cálculos correctos; los errores se vuelven a calcular.
+    """
+
+    def __init__(self, capacidad=1024):
+        self.capacidad = capacidad
+        self.version = None
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.invalidaciones = 0
+        self._resultados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._resultados)
+
+    def invalidar(self, version=None):
+        with self._lock:
+            self._resultados.clear()
+            self.version = version
+            self.invalidaciones += 1
+
+    def _cambiar_version(self, version):
+        if version != self.version:
+            self._resultados.clear()
+            if self.version is not None:
+                self.invalidaciones += 1
+            self.version = version
+
+    def obtener(self, version, clave):
+        with self._lock:
+            self._cambiar_version(version)
+            resultado = self._resultados.get(clave)
+            if resultado is None:
+                self.fallos += 1
+                return None
+            self._resultados.move_to_end(clave)
+            self.aciertos += 1
+            return dict(resultado)
+
+    def guardar(self, version, clave, resultado):
+        with self._lock:
+            # Un cálculo de una versión ya reemplazada no se guarda
+            if self.version is None:
+                self._cambiar_version(version)
+            elif version != self.version:
+                return
+            self._resultados[clave] = dict(resultado)
+            self._resultados.move_to_end(clave)
+            while len(self._resultados) > self.capacidad:
+                self._resultados.popitem(last=False)
+                self.desalojos += 1
+
+    def metricas(self):
+        consultas = self.aciertos + self.fallos
+        return {
+            'hits': self.aciertos,
+            'misses': self.fallos,
+            'hit_rate': self.aciertos / consultas if consultas else 0.0,
+            'size': len(self._resultados),
+            'capacity': self.capacidad,
+            'evictions': self.desalojos,
+            'invalidations': self.invalidaciones,
+            'version': self.version
+        }
+
+def procesar_certificado_cacheado(cache, version, labrowe_datalogger_data, certificado_balance_data, thermodynamics_data, certificado_objetivo, grupo_objetivo, nominal_objetivo, unidad_objetivo):
+    """procesar_certificado con memorización en un ResultCache para la versión de datos indicada."""
+    try:
+        clave = (certificado_objetivo, grupo_objetivo, _clave_nominal(nominal_objetivo), unidad_objetivo)
+    except (TypeError, ValueError):
+        clave = None
+    resultado = cache.obtener(version, clave) if clave is not None else None
+    if resultado is None:
+        resultado = procesar_certificado(labrowe_datalogger_data, certificado_balance_data, thermodynamics_data,
+                                         certificado_objetivo, grupo_objetivo, nominal_objetivo, unidad_objetivo)
+        if clave is not None:
+            cache.guardar(version, clave, resultado)
+    return resultado
+
+COLUMNAS_LOTE = ['cert_no', 'group', 'row_id', 'units', 'meas_parameter', 'nominal', 'meas_uncert', 'low_limit', 'high_limit', 'tur']
+
+def _enteros(valores):
+    # Enteros con nulos (Int64) sea cual sea el store de origen; si algún valor no es entero se deja igual
+    try:
+        return pd.array(valores, dtype='Int64')
+    except (TypeError, ValueError):
+        return valores
+
+@medir('procesar_lote')
+def procesar_lote(labrowe_datalogger_data, certificado_balance_data, thermodynamics_data, certificado_objetivo=None, grupo_objetivo=None):
+    """Calcula la incertidumbre de todas las mediciones de un certificado, de un grupo o del datalogger completo.
+
+    certificado_objetivo puede ser un CertNo o una lista de CertNo.
+
+    Devuelve un DataFrame con una fila por medición; row_id y cmc_id son Int64. cmc_fixed, cmc_total y total_uncertainty
+    están en las unidades de cada medición, cmc_proportional es adimensional y tur_calculated es
+    (HighLimit - LowLimit) / (2 * total_uncertainty). Las filas sin rango CMC aplicable o con
+    unidad no soportada quedan en NaN.
+    """
+    store = _como_store(labrowe_datalogger_data)
+    indices = {True: _como_indice_rango(certificado_balance_data), False: _como_indice_rango(thermodynamics_data)}
+    if certificado_objetivo is not None and not isinstance(certificado_objetivo, (list, tuple)):
+        certificado_objetivo = [certificado_objetivo]
+    tabla = store.filas_lote(certificado_objetivo, grupo_objetivo)
+    tabla['row_id'] = _enteros(tabla['row_id'].to_numpy(dtype=object))
+
+    n = len(tabla)
+    nominal = tabla['nominal'].to_numpy(dtype=float)
+    meas_uncert = tabla['meas_uncert'].to_numpy(dtype=float)
+    amplitud = tabla['high_limit'].to_numpy(dtype=float) - tabla['low_limit'].to_numpy(dtype=float)
+    factor = np.full(n, np.nan)
+    cmc_id = np.full(n, None, dtype=object)
+    cmc_used = np.full(n, None, dtype=object)
+    cmc_fijo = np.full(n, np.nan)
+    cmc_proporcional = np.full(n, np.nan)
+    cmc_total = np.full(n, np.nan)
+    total = np.full(n, np.nan)
+
+    # El Equipment del alcance depende de la unidad, del parámetro medido y del tipo de equipo
+    tipos = {cert_no: store.encabezado(cert_no).equipment_type for cert_no in pd.unique(tabla['cert_no'])}
+    claves = pd.DataFrame({'units': tabla['units'], 'meas_parameter': tabla['meas_parameter'], 'equipment_type': tabla['cert_no'].map(tipos)})
+    for (unidad, parametro, tipo_equipo), mascara in claves.groupby(list(claves.columns), dropna=False, sort=False).indices.items():
+        try:
+            usa_balanzas, equipos = _alcance(unidad, parametro, tipo_equipo)
+            magnitud, factor[mascara], _ = _unidad_cmc(unidad)
+        except (TypeError, ValueError):
+            continue
+        indice = indices[usa_balanzas]
+        pendientes = mascara
+        for equipment in equipos:
+            posiciones = indice.buscar_posiciones(nominal[pendientes], equipment, unidad)
+            for posicion in np.unique(posiciones[posiciones >= 0]):
+                cmc = indice.cmc[posicion]
+                if cmc is None or cmc.magnitud not in (None, magnitud):
+                    posiciones[posiciones == posicion] = -1
+                    continue
+                filas_rango = pendientes[posiciones == posicion]
+                cmc_id[filas_rango] = indice.registros[posicion]['ID']
+                cmc_used[filas_rango] = cmc.texto
+                cmc_fijo[filas_rango] = cmc.fijo
+                cmc_proporcional[filas_rango] = cmc.proporcional
+            pendientes = pendientes[posiciones < 0]
+        resueltas = mascara[~np.isnan(cmc_fijo[mascara])]
+        cmc_total[resueltas], total[resueltas] = _incertidumbre_combinada(
+            nominal[resueltas], cmc_fijo[resueltas], cmc_proporcional[resueltas], meas_uncert[resueltas], unidad)
+
+    # Volver de la unidad normalizada a la unidad de cada medición
+    tabla['cmc_id'] = _enteros(cmc_id)
+    tabla['cmc_used'] = cmc_used
+    tabla['cmc_fixed'] = cmc_fijo / factor
+    tabla['cmc_proportional'] = cmc_proporcional
+    tabla['cmc_total'] = cmc_total / factor
+    tabla['total_uncertainty'] = total / factor
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tabla['tur_calculated'] = amplitud / (2 * tabla['total_uncertainty'].to_numpy())
+    return tabla
+
+@medir('obtener_info_certificado')
 def obtener_info_certificado(labrowe_datalogger_data, certificado_objetivo):
-    for certificado in labrowe_datalogger_data:
-        if certificado['CertNo'] == certificado_objetivo:
-            return {
-                'CertNo': certificado['CertNo'],
-                'EquipmentType': certificado['EquipmentType'],
-                'AssetDescription': certificado['AssetDescription'],
-                'Manufacturer': certificado['Manufacturer'],
-                'Model': certificado['Model'],
-                'OperatingRange': certificado['OperatingRange'],
-                'EnvironmentalConditions': {
-                    'Temperature': certificado['EnvironmentalTemperature'],
-                    'RelativeHumidity': certificado['EnvironmentalRelativeHumidity'],
-                    'BarometricPressure': certificado['EnvironmentalBarometricPressure']
-                },
-                'Standards': certificado['Standards'],
-                'CustomerRequirements': certificado['CustomerRequirements'],
-                'Remarks': certificado['Remarks']
-            }
-    raise ValueError(f"No se encontró el certificado {certificado_objetivo}")
+    # Sólo usa campos del encabezado
+    certificado = _como_store(labrowe_datalogger_data).encabezado(certificado_objetivo)
+    return {
+        'CertNo': certificado['CertNo'],
+        'EquipmentType': certificado['EquipmentType'],
+        'AssetDescription': certificado['AssetDescription'],
+        'Manufacturer': certificado['Manufacturer'],
+        'Model': certificado['Model'],
+        'OperatingRange': certificado['OperatingRange'],
+        'EnvironmentalConditions': {
+            'Temperature': certificado['EnvironmentalTemperature'],
+            'RelativeHumidity': certificado['EnvironmentalRelativeHumidity'],
+            'BarometricPressure': certificado['EnvironmentalBarometricPressure']
+        },
+        'Standards': certificado['Standards'],
+        'CustomerRequirements': certificado['CustomerRequirements'],
+        'Remarks': certificado['Remarks']
+    }
 
 """
 Interacción con el menú:
@@ -1,18 +1,40 @@
+import os
+import time
+
 import streamlit as st
 from ScalesBalances import (
     cargar_json, 
-    procesar_certificado, 
+    procesar_certificado_cacheado, 
+    version_fuentes,
+    ResultCache,
     convertir_unidad, 
-    obtener_info_certificado
+    obtener_info_certificado,
+    RangeIndex
 )
-from htmlTemplates import CSS_STYLES, LOGO_TITLE_HTML, get_image_base64
-from datetime import datetime, date
+from dataloggerCache import MergedCertificateStore, cargar_datalogger, cargar_exportaciones, rutas_exportaciones
+from lazyDatalogger import aciertos_y_fallos, cargar_datalogger_perezoso
+from monteCarlo import DISTRIBUCIONES, procesar_lote_montecarlo_cacheado
+from htmlTemplates import LOGO_TITLE_HTML, css_styles
+from staticAssets import construir_assets, url_asset
+import instrumentation
+
+# Whole-script timing for the instrumentation panel (no-op unless CALIBRATION_INSTRUMENTATION is set)
+render_start = time.perf_counter()
 
-# Get the background image in base64
-background_base64 = get_image_base64("images/background.png")
+# Build the content-hashed static assets once per process. With static serving enabled the
+# browser caches the stylesheet and background image, and each rerun only sends a short
+# @import; otherwise fall back to the inline stylesheet with the image as a data URI.
+@st.cache_resource
+def load_styles():
+    if st.get_option("server.enableStaticServing"):
+        try:
+            return css_styles(url_asset(construir_assets(), 'styles.css'))
+        except OSError:
+            pass
+    return css_styles()
 
 # Apply custom CSS styles
-st.markdown(CSS_STYLES, unsafe_allow_html=True)
+st.markdown(load_styles(), unsafe_allow_html=True)
 
 # Show the title with gradient style
 st.markdown(LOGO_TITLE_HTML, unsafe_allow_html=True)
@@ -23,16 +45,54 @@ if 'opcion' not in st.session_state:
 if 'numero_certificado' not in st.session_state:
     st.session_state.numero_certificado = ''
 
-# Load data
-@st.cache_data
-def load_data():
+SCOPE_FILES = ("doc/Balances&Scales.json", "doc/Thermodynamics.json")
+
+# Datalogger exports (doc/LabRoweDatalogger.json plus any doc/LabRoweDatalogger_*.json) merged into
+# one store that lives for the whole process. When an export changes only that export is reloaded,
+# and an export that only grew at the end just reads the new certificates.
+@st.cache_resource
+def load_datalogger_store():
+    # CALIBRATION_LAZY_DATALOGGER=1 reads only the certificate headers at startup; each certificate
+    # is then read from the JSON on first access and kept in a bounded LRU cache
+    if os.environ.get('CALIBRATION_LAZY_DATALOGGER', '').lower() in ('1', 'true', 'yes', 'on'):
+        store = MergedCertificateStore(cargador=cargar_datalogger_perezoso)
+        instrumentation.registrar_cache('certificados', lambda: aciertos_y_fallos(store))
+        return store
+    return MergedCertificateStore(cargador=cargar_datalogger)
+
+# Load data once per process; the certificate store is shared across sessions.
+# The cache key is the version of the data files, so a changed file is reloaded on the next rerun.
+@st.cache_resource(max_entries=1)
+def load_data(version):
+    store = cargar_exportaciones(rutas_exportaciones("doc"), load_datalogger_store())
+    # Build the model search index once; every session reuses it
+    store.buscador_modelos()
     return {
-        'labrowe_datalogger': cargar_json("doc/LabRoweDatalogger.json"),
-        'certificado_balance': cargar_json("doc/Balances&Scales.json"),
-        'thermodynamics': cargar_json("doc/Thermodynamics.json")
+        'labrowe_datalogger': store,
+        'certificado_balance': RangeIndex(cargar_json("doc/Balances&Scales.json")),
+        'thermodynamics': RangeIndex(cargar_json("doc/Thermodynamics.json")),
+        'estandares': store.indice_estandares()
     }
 
-data = load_data()
+# Calculation results shared across sessions; entries from older data versions are dropped
+@st.cache_resource
+def load_result_cache():
+    cache = ResultCache(capacidad=4096)
+    instrumentation.registrar_cache('resultados', lambda: (cache.aciertos, cache.fallos))
+    return cache
+
+# Monte Carlo results per (certificate, group, trials, seed, distribution, coverage factor), shared across sessions
+@st.cache_resource
+def load_montecarlo_cache():
+    cache = ResultCache(capacidad=256)
+    instrumentation.registrar_cache('montecarlo', lambda: (cache.aciertos, cache.fallos))
+    return cache
+
+data_version = version_fuentes(*rutas_exportaciones("doc"), *SCOPE_FILES)
+with instrumentation.etapa('app.load_data'):
+    data = load_data(data_version)
+result_cache = load_result_cache()
+montecarlo_cache = load_montecarlo_cache()
 
 # Application title
 st.title('Calibration Assistant')
@@ -45,19 +105,8 @@ def apply_style(text, color=None, bold=False):
     return text
 
 def calculate_expiration_status(due_date_str):
-    try:
-        due_date = datetime.strptime(due_date_str, '%m/%d/%Y').date()
-        current_date = date.today()
-        days_until_expiration = (due_date - current_date).days
-        
-        if days_until_expiration < 0:
-            return "Expired", f"{abs(days_until_expiration)} days ago"
-        elif days_until_expiration == 0:
-            return "Expires today", "Today"
-        else:
-            return "Valid", f"{days_until_expiration} days remaining"
-    except ValueError:
-        return "Invalid date", "Unable to calculate"
+    # Statuses are cached per due date in the standards index and refreshed when the day changes
+    return data['estandares'].estado(due_date_str)
 
 def display_certificate_info(certificado):
     st.markdown(f"## Certificate Information {apply_style(certificado.get('CertNo', 'N/A'), color='#ed6f38', bold=True)}", unsafe_allow_html=True)
@@ -96,6 +145,21 @@ def display_certificate_info(certificado):
 # Navigation menu
 opcion = st.sidebar.radio('Select an option:', ['Enter certificate number', 'Search certificate by model', 'Exit'], index=0 if 'opcion' not in st.session_state else ['Enter certificate number', 'Search certificate by model', 'Exit'].index(st.session_state.opcion))
 
+# Shared calculation cache statistics
+with st.sidebar.expander('Calculation cache'):
+    metricas = result_cache.metricas()
+    st.caption(f"Hits: {metricas['hits']} · Misses: {metricas['misses']} · Hit rate: {metricas['hit_rate']:.0%}")
+    st.caption(f"Entries: {metricas['size']}/{metricas['capacity']} · Evictions: {metricas['evictions']} · Invalidations: {metricas['invalidations']}")
+
+# Per-stage latencies, only when instrumentation is enabled
+if instrumentation.activo():
+    with st.sidebar.expander('Instrumentation'):
+        st.caption('Stage latencies since the process started (seconds)')
+        st.dataframe(instrumentation.resumen(), hide_index=True)
+        st.dataframe(instrumentation.resumen_caches(), hide_index=True)
+        st.download_button('Download Prometheus metrics', instrumentation.exportar_prometheus(),
+                           file_name='metrics.txt', mime='text/plain')
+
 if opcion == 'Enter certificate number':
     st.header('Search by Certificate')
     certificado_objetivo = st.text_input("Enter the target certificate number:", value=st.session_state.numero_certificado if 'numero_certificado' in st.session_state else '')
@@ -103,43 +167,71 @@ if opcion == 'Enter certificate number':
     if certificado_objetivo:
         try:
             info_certificado = obtener_info_certificado(data['labrowe_datalogger'], certificado_objetivo)
-            display_certificate_info(info_certificado)
+            with instrumentation.etapa('app.certificate_info'):
+                display_certificate_info(info_certificado)
 
             st.markdown("---")
             st.markdown("### Uncertainty Calculation")
 
-            grupo_seleccionado = st.selectbox('Target Group:', ['Select group'] + [g['Group'] for g in next(cert for cert in data['labrowe_datalogger'] if cert['CertNo'] == certificado_objetivo)['Datasheet']])
+            grupo_seleccionado = st.selectbox('Target Group:', ['Select group'] + [g.group for g in data['labrowe_datalogger'].certificado(certificado_objetivo).datasheet])
             
             if grupo_seleccionado != 'Select group':
-                mediciones = next(g['Measurements'] for g in next(cert for cert in data['labrowe_datalogger'] if cert['CertNo'] == certificado_objetivo)['Datasheet'] if g['Group'] == grupo_seleccionado)
-                nominal_seleccionado = st.selectbox('Target Nominal Value:', ['Select nominal value'] + [str(m['Nominal']) for m in mediciones])
+                mediciones = data['labrowe_datalogger'].mediciones(certificado_objetivo, grupo_seleccionado)
+                nominal_seleccionado = st.selectbox('Target Nominal Value:', ['Select nominal value'] + [m.nominal_texto for m in mediciones])
                 
                 if nominal_seleccionado != 'Select nominal value':
-                    medicion_seleccionada = next(m for m in mediciones if str(m['Nominal']) == nominal_seleccionado)
+                    medicion_seleccionada = next(m for m in mediciones if m.nominal_texto == nominal_seleccionado)
                     
                     if st.button('Perform calculation'):
                         try:
-                            resultado = procesar_certificado(
-                                data['labrowe_datalogger'],
-                                data['certificado_balance'],
-                                data['thermodynamics'],
-                                certificado_objetivo,
-                                grupo_seleccionado,
-                                nominal_seleccionado,
-                                medicion_seleccionada['Units']
-                            )
+                            with instrumentation.etapa('app.calculation'):
+                                resultado = procesar_certificado_cacheado(
+                                    result_cache,
+                                    data_version,
+                                    data['labrowe_datalogger'],
+                                    data['certificado_balance'],
+                                    data['thermodynamics'],
+                                    certificado_objetivo,
+                                    grupo_seleccionado,
+                                    nominal_seleccionado,
+                                    medicion_seleccionada.units
+                                )
                             
                             st.success(f"""
                             **Calculation Results:**
                             - **Target Group**: {grupo_seleccionado}
-                            - **Target Nominal Value**: {nominal_seleccionado} {medicion_seleccionada['Units']}
-                            - **Measurement Uncertainty**: {resultado['meas_uncert']} {medicion_seleccionada['Units']}
+                            - **Target Nominal Value**: {nominal_seleccionado} {medicion_seleccionada.units}
+                            - **Measurement Uncertainty**: {resultado['meas_uncert']} {medicion_seleccionada.units}
                             - **CMC used**: {resultado['cmc_used']}
-                            - **Total Uncertainty**: {resultado['total_uncertainty'][0]}, {resultado['total_uncertainty'][1]}, {resultado['total_uncertainty'][2]}
-                            - **TUR**: {medicion_seleccionada['TUR']}
+                            - **Total Uncertainty**: {', '.join(resultado['total_uncertainty'])}
+                            - **TUR**: {medicion_seleccionada.tur_texto}
                             """)
                         except Exception as e:
                             st.error(f"Error during calculation: {str(e)}")
+
+                # GUM Supplement 1 propagation for every measurement of the group (fixed seed, so results are reproducible)
+                with st.expander('Monte Carlo (GUM Supplement 1)'):
+                    ensayos = st.select_slider('Trials:', options=[10**4, 10**5, 10**6, 10**7], value=10**6, format_func=lambda n: f"{n:,}")
+                    distribucion = st.radio('CMC distribution:', DISTRIBUCIONES, horizontal=True)
+                    if st.button('Run Monte Carlo for this group'):
+                        try:
+                            with instrumentation.etapa('app.montecarlo'):
+                                tabla = procesar_lote_montecarlo_cacheado(
+                                    montecarlo_cache,
+                                    data_version,
+                                    data['labrowe_datalogger'],
+                                    data['certificado_balance'],
+                                    data['thermodynamics'],
+                                    certificado_objetivo,
+                                    grupo_seleccionado,
+                                    ensayos,
+                                    distribucion_cmc=distribucion
+                                )
+                            st.caption('Uncertainties and 95 % coverage intervals in the units of each measurement')
+                            st.dataframe(tabla[['row_id', 'units', 'nominal', 'total_uncertainty', 'mc_uncertainty',
+                                                'mc_interval_low', 'mc_interval_high', 'mc_coverage_factor']], hide_index=True)
+                        except Exception as e:
+                            st.error(f"Error during Monte Carlo calculation: {str(e)}")
         except ValueError as e:
             st.warning(f"Target certificate not found: {str(e)}")
 
@@ -148,10 +240,12 @@ elif opcion == 'Search certificate by model':
     modelo_objetivo = st.text_input("Enter the target model:")
 
     if modelo_objetivo:
-        modelos_disponibles = list(set([cert['Model'] for cert in data['labrowe_datalogger'] if modelo_objetivo.lower() in cert['Model'].lower()]))
+        # Ranked matches: exact, prefix, word prefix, substring, then typo-tolerant matches
+        with instrumentation.etapa('app.model_search'):
+            modelos_disponibles = data['labrowe_datalogger'].buscador_modelos().buscar(modelo_objetivo)
         if modelos_disponibles:
             modelo_seleccionado = st.selectbox('Available models:', modelos_disponibles)
-            certificados_modelo = [cert for cert in data['labrowe_datalogger'] if cert['Model'] == modelo_seleccionado]
+            certificados_modelo = data['labrowe_datalogger'].encabezados_por_modelo(modelo_seleccionado)
 
             st.markdown(f"### Available certificates for model {apply_style(modelo_seleccionado, color='#ed6f38', bold=True)}", unsafe_allow_html=True)
             
@@ -159,9 +253,11 @@ elif opcion == 'Search certificate by model':
             table_header = "| Certificate | Description | Operating Range | Due Date | Status |\n|------------|-------------|------------------|----------|--------|"
             table_rows = []
             for cert in certificados_modelo:
-                status, time_info = calculate_expiration_status(cert['Standards'][0]['DueDate'])
+                # Show the standard that expires first, not just the first one listed
+                proximo = data['estandares'].proximo_vencimiento(cert['CertNo'])
+                due_date = proximo.due_date_texto if proximo else (cert['Standards'][0]['DueDate'] if cert['Standards'] else 'N/A')
+                status, time_info = calculate_expiration_status(due_date)
                 color = '#00FF00' if status == 'Valid' else '#FF0000'
-                due_date = cert['Standards'][0]['DueDate']
                 table_rows.append(f"| {apply_style(cert['CertNo'], bold=True)} | {cert['AssetDescription']} | {cert['OperatingRange']} | {due_date} | {apply_style(f'{status} ({time_info})', color=color)} |")
             
             table_content = "\n".join([table_header] + table_rows)
@@ -183,4 +279,6 @@ elif opcion == 'Exit':
 
 # Add a footer
 st.markdown("---")
-st.markdown("© 2023 Calibration Assistant. All rights reserved.")
\ No newline at end of file
+st.markdown("© 2023 Calibration Assistant. All rights reserved.")
+
+instrumentation.observar('app.render', time.perf_counter() - render_start)
\ No newline at end of file
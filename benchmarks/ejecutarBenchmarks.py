@@ -0,0 +1,197 @@
+# ejecutarBenchmarks.py
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from ScalesBalances import (
+    cargar_json,
+    obtener_info_certificado,
+    buscar_en_labrowe_datalogger,
+    identificar_rango_en_certificado,
+    procesar_certificado,
+    CertificateStore,
+    RangeIndex
+)
+from modelSearch import ModelSearchIndex
+from generarDatos import generar_conjunto, generar_fichas_modelo
+
+CARPETA_DATOS = os.path.join(RAIZ, 'benchmarks', 'datos')
+CARPETA_RESULTADOS = os.path.join(RAIZ, 'benchmarks', 'resultados')
+
+# Búsqueda de modelos: consultas por tipo de coincidencia y mediana objetivo por consulta
+CONSULTAS_MODELO = {
+    'prefijo': 'bce12',
+    'subcadena': 'toledo',
+    'difusa_modelo': 'bce1234-tx',
+    'difusa_fabricante': 'mettlr',
+    'difusa_descripcion': 'medidor humedad',
+}
+OBJETIVO_BUSQUEDA_US = 1000
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _medir(funcion, argumentos):
+    """Tiempo de cada llamada funcion(*args) en segundos, con el recolector de basura desactivado."""
+    tiempos = []
+    gc.disable()
+    try:
+        for args in argumentos:
+            inicio = time.perf_counter()
+            funcion(*args)
+            tiempos.append(time.perf_counter() - inicio)
+    finally:
+        gc.enable()
+    return tiempos
+
+def _resumen(operacion, n_filas, tiempos):
+    return {
+        'operacion': operacion,
+        'filas': n_filas,
+        'llamadas': len(tiempos),
+        'total_s': sum(tiempos),
+        'media_us': statistics.fmean(tiempos) * 1e6,
+        'p50_us': float(np.percentile(tiempos, 50)) * 1e6,
+        'p95_us': float(np.percentile(tiempos, 95)) * 1e6,
+        'min_us': min(tiempos) * 1e6
+    }
+
+def ejecutar_tamano(n_filas, consultas, repeticiones, semilla=0):
+    """Mide las operaciones de consulta y cálculo sobre un conjunto sintético de n_filas mediciones."""
+    carpeta = generar_conjunto(os.path.join(CARPETA_DATOS, str(n_filas)), n_filas, semilla=semilla,
+                               ruta_termodinamica=os.path.join(RAIZ, 'doc', 'Thermodynamics.json'))
+    ruta_datalogger = os.path.join(carpeta, 'LabRoweDatalogger.json')
+    resultados = []
+
+    tiempos = _medir(cargar_json, [(ruta_datalogger,)] * repeticiones)
+    resultados.append(_resumen('cargar_json', n_filas, tiempos))
+    datos = cargar_json(ruta_datalogger)
+
+    tiempos = _medir(CertificateStore, [(datos,)] * repeticiones)
+    resultados.append(_resumen('CertificateStore', n_filas, tiempos))
+    store = CertificateStore(datos)
+    del datos
+
+    alcance = cargar_json(os.path.join(carpeta, 'Balances&Scales.json'))
+    tiempos = _medir(RangeIndex, [(alcance,)] * repeticiones)
+    resultados.append(_resumen('RangeIndex', n_filas, tiempos))
+    balanzas = RangeIndex(alcance)
+    termodinamica = RangeIndex(cargar_json(os.path.join(carpeta, 'Thermodynamics.json')))
+
+    # Consultas al azar sobre mediciones existentes (grupo de masa: el cálculo completo tiene rango CMC)
+    rng = random.Random(semilla)
+    certificados = store.certificados
+    muestras = []
+    for _ in range(consultas):
+        certificado = rng.choice(certificados)
+        datasheet = certificado.datasheet[0]
+        medicion = rng.choice(datasheet.measurements)
+        muestras.append((certificado.cert_no, datasheet.group, medicion.nominal_texto, medicion.units))
+
+    tiempos = _medir(obtener_info_certificado, [(store, cert_no) for cert_no, _, _, _ in muestras])
+    resultados.append(_resumen('obtener_info_certificado', n_filas, tiempos))
+    tiempos = _medir(buscar_en_labrowe_datalogger, [(store, *muestra) for muestra in muestras])
+    resultados.append(_resumen('buscar_en_labrowe_datalogger', n_filas, tiempos))
+    # Como en procesar_certificado: el tercer argumento es el Equipment del alcance (nominales en g)
+    tiempos = _medir(identificar_rango_en_certificado, [(balanzas, float(nominal), 'Balances & Scales') for _, _, nominal, _ in muestras])
+    resultados.append(_resumen('identificar_rango_en_certificado', n_filas, tiempos))
+    tiempos = _medir(procesar_certificado, [(store, balanzas, termodinamica, *muestra) for muestra in muestras])
+    resultados.append(_resumen('procesar_certificado', n_filas, tiempos))
+    return resultados
+
+def ejecutar_busqueda_modelos(n_modelos, consultas, semilla=0):
+    """Mide ModelSearchIndex.buscar_con_puntaje (límite 50) sobre n_modelos modelos distintos."""
+    indice = ModelSearchIndex(generar_fichas_modelo(n_modelos, semilla))
+    resultados = []
+    for tipo, consulta in CONSULTAS_MODELO.items():
+        tiempos = _medir(indice.buscar_con_puntaje, [(consulta,)] * consultas)
+        resultado = _resumen(f"buscar_modelo_{tipo}", n_modelos, tiempos)
+        resultado['objetivo_us'] = OBJETIVO_BUSQUEDA_US
+        resultados.append(resultado)
+    return resultados
+
+def comparar(base, actual):
+    """Tabla de cociente actual/base de la mediana por (operacion, filas); > 1 es más lento."""
+    anteriores = {(r['operacion'], r['filas']): r for r in base['resultados']}
+    print(f"{'operacion':34} {'filas':>9} {'base p50 us':>12} {'actual p50 us':>14} {'cociente':>9}")
+    for r in actual['resultados']:
+        anterior = anteriores.get((r['operacion'], r['filas']))
+        if anterior is None:
+            continue
+        cociente = r['p50_us'] / anterior['p50_us'] if anterior['p50_us'] else float('nan')
+        print(f"{r['operacion']:34} {r['filas']:>9} {anterior['p50_us']:>12.1f} {r['p50_us']:>14.1f} {cociente:>9.2f}")
+
+def _leer(ruta):
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de carga, consulta y cálculo sobre datos sintéticos")
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[1000, 10000, 100000], help="Filas de medición (p. ej. 1000 ... 1000000)")
+    parser.add_argument('--consultas', type=int, default=2000, help="Llamadas por operación de consulta")
+    parser.add_argument('--repeticiones', type=int, default=3, help="Repeticiones de las operaciones de carga")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--modelos', type=int, nargs='*', default=[100000], help="Modelos distintos para la búsqueda de modelos")
+    parser.add_argument('--salida', help="Archivo JSON de resultados (por defecto benchmarks/resultados/<fecha>_<commit>.json)")
+    parser.add_argument('--comparar', nargs='+', metavar='JSON', help="Compara con un resultado anterior; con dos archivos sólo compara sin ejecutar")
+    args = parser.parse_args(argv)
+
+    if args.comparar and len(args.comparar) == 2:
+        comparar(_leer(args.comparar[0]), _leer(args.comparar[1]))
+        return
+
+    commit = _commit()
+    informe = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'procesador': platform.processor() or platform.machine(),
+        'parametros': {'consultas': args.consultas, 'repeticiones': args.repeticiones, 'semilla': args.semilla},
+        'resultados': []
+    }
+    for n_filas in args.tamanos:
+        for resultado in ejecutar_tamano(n_filas, args.consultas, args.repeticiones, args.semilla):
+            informe['resultados'].append(resultado)
+            print(f"{resultado['operacion']:34} {n_filas:>9} filas  p50 {resultado['p50_us']:>12.1f} us  p95 {resultado['p95_us']:>12.1f} us", flush=True)
+    lentas = []
+    for n_modelos in args.modelos:
+        for resultado in ejecutar_busqueda_modelos(n_modelos, min(args.consultas, 200), args.semilla):
+            informe['resultados'].append(resultado)
+            if resultado['p50_us'] > resultado['objetivo_us']:
+                lentas.append(resultado)
+            print(f"{resultado['operacion']:34} {n_modelos:>9} modelos  p50 {resultado['p50_us']:>10.1f} us  p95 {resultado['p95_us']:>12.1f} us", flush=True)
+
+    salida = args.salida or os.path.join(CARPETA_RESULTADOS, f"{datetime.now():%Y%m%d-%H%M%S}_{commit or 'sin-commit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as archivo:
+        json.dump(informe, archivo, ensure_ascii=False, indent=2)
+    print(f"Resultados en {salida}")
+    if args.comparar:
+        comparar(_leer(args.comparar[0]), informe)
+    for resultado in lentas:
+        print(f"AVISO: {resultado['operacion']} con {resultado['filas']} modelos supera el objetivo de "
+              f"{resultado['objetivo_us']} us (p50 {resultado['p50_us']:.1f} us)")
+    if lentas:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+# generarDatos.py
+import argparse
+import json
+import math
+import os
+import random
+
+# Cada certificado sintético tiene un grupo de masa y uno de temperatura con este número de filas
+FILAS_POR_GRUPO = 5
+GRUPOS = [('Masa', 'g', 'Masa'), ('Temperatura - Medición', '°C', 'Temperatura')]
+
+FABRICANTES = ['Ohaus', 'Mettler Toledo', 'Sartorius', 'A&D', 'Kern', 'Ebro', 'MadgeTech']
+DESCRIPCIONES = ['Balanza Analítica', 'Balanza de Precisión', 'Báscula de Plataforma', 'Medidor de Temperatura y Humedad']
+PREFIJOS_MODELO = ['PA', 'EX', 'XS', 'ML', 'GX', 'BCE', 'EBI', 'HMT']
+
+# Alcance de balanzas: de 1 mg a 100 t en gramos, como doc/Balances&Scales.json
+MASA_MINIMA, MASA_MAXIMA = 0.001, 1e8
+
+def _texto(valor):
+    return f"{valor:.6g}"
+
+def _fecha(rng, desde_anio=2022, hasta_anio=2027):
+    return f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/{rng.randint(desde_anio, hasta_anio)}"
+
+def _medicion(rng, row_id, unidad, parametro):
+    if unidad == 'g':
+        nominal = 10 ** rng.uniform(math.log10(MASA_MINIMA), math.log10(MASA_MAXIMA))
+        error = max(nominal * 1e-4, 1e-4)
+        meas_uncert = error / rng.uniform(1.5, 12)
+    else:
+        nominal = rng.uniform(-30, 70)
+        error = 0.5
+        meas_uncert = rng.uniform(0.05, 0.4)
+    as_found = nominal + rng.uniform(-error, error)
+    return {
+        'RowId': row_id,
+        'Units': unidad,
+        'MaximumPermissibleError': _texto(error),
+        'Nominal': _texto(nominal),
+        'LowLimit': _texto(nominal - error),
+        'HighLimit': _texto(nominal + error),
+        'AsFound': _texto(as_found),
+        'AfterAdjustment': '',
+        'MeasUncert': _texto(meas_uncert),
+        'MeasUnit': unidad,
+        'MeasParameter': parametro,
+        'MeasSubParameter': '',
+        'TUR': f"{error / meas_uncert:.1f}:1" if error / meas_uncert <= 10 else '>10:1',
+        'IsVisible': True,
+        'FormattedComment': ''
+    }
+
+def generar_datalogger(n_filas, semilla=0):
+    """Lista de certificados con el esquema de doc/LabRoweDatalogger.json y unas n_filas mediciones."""
+    rng = random.Random(semilla)
+    n_certificados = max(1, n_filas // (FILAS_POR_GRUPO * len(GRUPOS)))
+    certificados = []
+    for i in range(n_certificados):
+        datasheet = []
+        row_id = 1
+        for grupo, unidad, parametro in GRUPOS:
+            mediciones = []
+            for _ in range(FILAS_POR_GRUPO):
+                mediciones.append(_medicion(rng, row_id, unidad, parametro))
+                row_id += 1
+            datasheet.append({'Group': grupo, 'Measurements': mediciones})
+        certificados.append({
+            'IsAccredited': True,
+            'CustomerRequirements': ['#Cert.Language: español.'],
+            'EnvironmentalTemperature': f"{rng.uniform(18, 24):.2f}°C",
+            'EnvironmentalRelativeHumidity': f"{rng.randint(35, 70)}%RH",
+            'EnvironmentalBarometricPressure': '',
+            'Procedures': ['DR-WI-0078'],
+            'Standards': [
+                {'IdInst': str(10000 + rng.randint(0, 500)), 'Description': 'Mass Standard Set',
+                 'SerialNo': str(rng.randint(10 ** 7, 10 ** 8)), 'CalDate': _fecha(rng, 2021, 2024), 'DueDate': _fecha(rng)}
+                for _ in range(rng.randint(1, 3))
+            ],
+            'CertNo': f"S{i:07d}",
+            'CustomerCode': f"CDR{rng.randint(0, 999):05d}",
+            'EquipmentType': 'Balanza',
+            'AssetDescription': rng.choice(DESCRIPCIONES),
+            'Manufacturer': rng.choice(FABRICANTES),
+            'Model': f"{rng.choice(PREFIJOS_MODELO)}{rng.randint(1, 9999)}",
+            'OperatingRange': '0 a 220 g',
+            'AccreditationInfo': 'Esta calibración es trazable al Sistema Internacional de Unidades (SI).',
+            'Remarks': 'Datos sintéticos para benchmarks.',
+            'Datasheet': datasheet
+        })
+    return certificados
+
+def generar_fichas_modelo(n_modelos, semilla=0):
+    """(Model, Manufacturer, AssetDescription) de n_modelos modelos distintos, como fichas_modelo()."""
+    rng = random.Random(semilla)
+    fichas = []
+    for i in range(n_modelos):
+        modelo = f"{rng.choice(PREFIJOS_MODELO)}{i}{rng.choice(['', '-S', '-TH', 'DR'])}"
+        fichas.append((modelo, rng.choice(FABRICANTES), rng.choice(DESCRIPCIONES)))
+    return fichas
+
+def generar_alcance(n_rangos, semilla=0):
+    """Rangos contiguos de 'Balances & Scales' (en g) con el esquema de doc/Balances&Scales.json."""
+    rng = random.Random(semilla)
+    limites = [MASA_MINIMA * (MASA_MAXIMA / MASA_MINIMA) ** (k / n_rangos) for k in range(n_rangos + 1)]
+    alcance = []
+    for k in range(n_rangos):
+        minimo, maximo = limites[k], limites[k + 1]
+        # Términos fijos y proporcionales con las mismas formas de texto que el alcance real
+        if maximo < 1000:
+            cmc = f"{_texto(maximo * 1e6 * rng.uniform(1e-6, 1e-5))} μg + {rng.uniform(0.1, 0.6):.2f} μg/g"
+        elif maximo < 1e5:
+            cmc = f"{_texto(maximo * 1e3 * rng.uniform(1e-6, 1e-5))} mg + {rng.uniform(0.1, 2.5):.2f} μg/g"
+        else:
+            cmc = f"{_texto(maximo * rng.uniform(1e-6, 1e-5))} g + {rng.uniform(1, 3):.1f} g / 25 kg"
+        alcance.append({
+            'Categoria': 'Mechanical',
+            'Equipment': 'Balances & Scales',
+            'Range': {'Min': float(_texto(minimo)), 'Max': float(_texto(maximo)), 'Unit': 'g'},
+            'CMC': cmc,
+            'Comments': 'Synthetic range',
+            'ID': k + 1
+        })
+    return alcance
+
+def _escribir_json(datos, ruta):
+    temporal = f"{ruta}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump(datos, archivo, ensure_ascii=False, indent=2)
+    os.replace(temporal, ruta)
+
+def generar_conjunto(destino, n_filas, n_rangos=None, semilla=0, ruta_termodinamica='doc/Thermodynamics.json'):
+    """Escribe LabRoweDatalogger.json, Balances&Scales.json y Thermodynamics.json en `destino`.
+
+    Si ya existe un conjunto generado con los mismos parámetros se reutiliza.
+    """
+    n_rangos = n_rangos or max(12, n_filas // 100)
+    os.makedirs(destino, exist_ok=True)
+    parametros = {'n_filas': n_filas, 'n_rangos': n_rangos, 'semilla': semilla}
+    ruta_parametros = os.path.join(destino, 'parametros.json')
+    try:
+        with open(ruta_parametros, encoding='utf-8') as archivo:
+            if json.load(archivo) == parametros:
+                return destino
+    except (OSError, ValueError):
+        pass
+    _escribir_json(generar_datalogger(n_filas, semilla), os.path.join(destino, 'LabRoweDatalogger.json'))
+    _escribir_json(generar_alcance(n_rangos, semilla), os.path.join(destino, 'Balances&Scales.json'))
+    with open(ruta_termodinamica, encoding='utf-8') as archivo:
+        _escribir_json(json.load(archivo), os.path.join(destino, 'Thermodynamics.json'))
+    _escribir_json(parametros, ruta_parametros)
+    return destino
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Genera archivos sintéticos del datalogger y del alcance CMC")
+    parser.add_argument('destino')
+    parser.add_argument('--filas', type=int, default=10000, help="Filas de medición del datalogger")
+    parser.add_argument('--rangos', type=int, default=None, help="Rangos del alcance de balanzas (por defecto filas/100)")
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+    generar_conjunto(args.destino, args.filas, args.rangos, args.semilla)
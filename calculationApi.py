@@ -0,0 +1,388 @@
+# calculationApi.py
+import argparse
+import gc
+import json
+import math
+import os
+import signal
+import socket
+import sys
+import time
+
+import pandas as pd
+import uvicorn
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from ScalesBalances import (
+    cargar_json,
+    procesar_certificado_cacheado,
+    procesar_lote,
+    obtener_info_certificado,
+    RangeIndex,
+    ResultCache,
+    version_fuentes
+)
+from dataloggerCache import cargar_datalogger, cargar_exportaciones, rutas_exportaciones
+import instrumentation
+from lazyDatalogger import aciertos_y_fallos, cargar_datalogger_perezoso
+from modelSearch import TIPOS
+from monteCarlo import DISTRIBUCIONES, ENSAYOS_POR_DEFECTO, FACTOR_COBERTURA_POR_DEFECTO, procesar_lote_montecarlo_cacheado
+
+# Intervalo mínimo, en segundos, entre dos comprobaciones de la versión de los archivos de datos
+INTERVALO_RECARGA = 2.0
+
+def _rutas_datos(ruta_doc):
+    # Exportaciones del datalogger, alcances de balanzas y alcances termodinámicos
+    return rutas_exportaciones(ruta_doc) + [os.path.join(ruta_doc, nombre) for nombre in ('Balances&Scales.json', 'Thermodynamics.json')]
+
+def cargar_datos(ruta_doc='doc', perezoso=False, anteriores=None):
+    """Carga los tres orígenes de datos con la misma forma que load_data en app.py.
+
+    Las exportaciones del datalogger (ver rutas_exportaciones) se unen en un MergedCertificateStore.
+    Con perezoso=True sólo se cargan los encabezados del datalogger y cada certificado se lee
+    del JSON la primera vez que se consulta (ver lazyDatalogger). Con `anteriores` (los datos
+    de una carga previa) se conservan sus cachés de resultados, cuyas entradas son por versión.
+    """
+    *exportaciones, ruta_balanzas, ruta_termodinamica = rutas = _rutas_datos(ruta_doc)
+    version = version_fuentes(*rutas)
+    store = cargar_exportaciones(exportaciones, cargador=cargar_datalogger_perezoso if perezoso else cargar_datalogger)
+    if perezoso:
+        instrumentation.registrar_cache('certificados', lambda: aciertos_y_fallos(store))
+    store.buscador_modelos()
+    if anteriores is not None:
+        resultados, montecarlo = anteriores['resultados'], anteriores['montecarlo']
+    else:
+        resultados = ResultCache(capacidad=4096)
+        instrumentation.registrar_cache('resultados', lambda: (resultados.aciertos, resultados.fallos))
+        montecarlo = ResultCache(capacidad=256)
+        instrumentation.registrar_cache('montecarlo', lambda: (montecarlo.aciertos, montecarlo.fallos))
+    return {
+        'labrowe_datalogger': store,
+        'certificado_balance': RangeIndex(cargar_json(ruta_balanzas)),
+        'thermodynamics': RangeIndex(cargar_json(ruta_termodinamica)),
+        'estandares': store.indice_estandares(),
+        'version': version,
+        'resultados': resultados,
+        'montecarlo': montecarlo,
+        'ruta_doc': ruta_doc,
+        'perezoso': perezoso
+    }
+
+def datos_vigentes(data):
+    """data si sus archivos no cambiaron; si cambió la versión de alguno, los datos recargados."""
+    if version_fuentes(*_rutas_datos(data['ruta_doc'])) == data['version']:
+        return data
+    return cargar_datos(data['ruta_doc'], data['perezoso'], anteriores=data)
+
+async def _datos(request):
+    """Datos de la aplicación, recargados si cambiaron los archivos.
+
+    La versión se comprueba como mucho cada INTERVALO_RECARGA segundos y la recarga se hace
+    en un hilo aparte: el resto de peticiones siguen con los datos anteriores hasta que termina.
+    """
+    estado = request.app.state
+    ahora = time.monotonic()
+    if ahora >= estado.proxima_verificacion and not estado.recargando:
+        estado.proxima_verificacion = ahora + INTERVALO_RECARGA
+        estado.recargando = True
+        try:
+            estado.data = await run_in_threadpool(datos_vigentes, estado.data)
+        except Exception as e:
+            # Un archivo a medio escribir no debe tirar la API: se reintenta en la próxima comprobación
+            print(f"No se pudieron recargar los datos: {e}", file=sys.stderr)
+        finally:
+            estado.recargando = False
+    return estado.data
+
+def _a_json(valor):
+    # Registros del modelo tipado y escalares de NumPy
+    if hasattr(valor, 'a_dict'):
+        return valor.a_dict()
+    if hasattr(valor, 'item'):
+        return valor.item()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+def _sin_nan(registro):
+    # NaN de las columnas float y NA de las enteras (row_id) se envían como null
+    return {clave: None if valor is pd.NA or (isinstance(valor, float) and math.isnan(valor)) else valor
+            for clave, valor in registro.items()}
+
+class RespuestaJSON(JSONResponse):
+    def render(self, content):
+        return json.dumps(content, ensure_ascii=False, default=_a_json).encode('utf-8')
+
+class ErrorPeticion(Exception):
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+def _error(estado, mensaje):
+    return RespuestaJSON({'error': mensaje}, status_code=estado)
+
+async def _cuerpo_json(request):
+    try:
+        return json.loads(await request.body() or b'null')
+    except ValueError:
+        raise ErrorPeticion(400, "El cuerpo de la petición no es JSON válido")
+
+def _calcular(data, peticion):
+    """Ejecuta procesar_certificado para {'cert_no', 'group', 'nominal', 'units'}."""
+    if not isinstance(peticion, dict):
+        raise ErrorPeticion(400, "Se esperaba un objeto JSON")
+    faltantes = [campo for campo in ('cert_no', 'group', 'nominal', 'units') if campo not in peticion]
+    if faltantes:
+        raise ErrorPeticion(400, f"Faltan campos: {', '.join(faltantes)}")
+    no_texto = [campo for campo in ('cert_no', 'group', 'units') if not isinstance(peticion[campo], str)]
+    if no_texto:
+        raise ErrorPeticion(400, f"Deben ser texto: {', '.join(no_texto)}")
+    if isinstance(peticion['nominal'], bool) or not isinstance(peticion['nominal'], (str, int, float)):
+        raise ErrorPeticion(400, "'nominal' debe ser un número o un texto numérico")
+    return procesar_certificado_cacheado(
+        data['resultados'],
+        data['version'],
+        data['labrowe_datalogger'],
+        data['certificado_balance'],
+        data['thermodynamics'],
+        peticion['cert_no'],
+        peticion['group'],
+        str(peticion['nominal']),
+        peticion['units']
+    )
+
+async def salud(request):
+    data = await _datos(request)
+    return RespuestaJSON({'status': 'ok', 'certificates': len(data['labrowe_datalogger']), 'result_cache': data['resultados'].metricas()})
+
+async def metricas(request):
+    # Cada proceso de trabajo lleva sus propios contadores: la respuesta es la del que atendió
+    return PlainTextResponse(instrumentation.exportar_prometheus(), media_type='text/plain; version=0.0.4')
+
+# Los handlers corren el trabajo síncrono (cálculos, índices y, con --lazy, lecturas del JSON)
+# con run_in_threadpool para que una petición lenta no detenga el bucle de eventos del worker
+
+def _info_certificado(store, cert_no):
+    info = obtener_info_certificado(store, cert_no)
+    info['Groups'] = store.grupos(cert_no)
+    return info
+
+async def certificado(request):
+    store = (await _datos(request))['labrowe_datalogger']
+    try:
+        return RespuestaJSON(await run_in_threadpool(_info_certificado, store, request.path_params['cert_no']))
+    except ValueError as e:
+        return _error(404, str(e))
+
+async def mediciones(request):
+    store = (await _datos(request))['labrowe_datalogger']
+    try:
+        return RespuestaJSON(await run_in_threadpool(store.mediciones, request.path_params['cert_no'], request.path_params['group']))
+    except ValueError as e:
+        return _error(404, str(e))
+
+def _verificar_grupo(store, cert_no, grupo):
+    # procesar_lote devuelve una tabla vacía para un grupo que no existe; la API responde 404
+    if grupo is not None and grupo not in store.grupos(cert_no):
+        raise ValueError(f"No se encontró el grupo {grupo} en el certificado {cert_no}")
+
+def _registros(tabla):
+    return [_sin_nan(registro) for registro in tabla.to_dict('records')]
+
+def _incertidumbre(data, cert_no, grupo):
+    _verificar_grupo(data['labrowe_datalogger'], cert_no, grupo)
+    return _registros(procesar_lote(
+        data['labrowe_datalogger'],
+        data['certificado_balance'],
+        data['thermodynamics'],
+        cert_no,
+        grupo
+    ))
+
+async def incertidumbre_certificado(request):
+    data = await _datos(request)
+    try:
+        registros = await run_in_threadpool(_incertidumbre, data, request.path_params['cert_no'], request.query_params.get('group'))
+    except ValueError as e:
+        return _error(404, str(e))
+    return RespuestaJSON(registros)
+
+# Límite de ensayos por petición: cada ensayo son 16 bytes por medición mientras dura la simulación
+MAX_ENSAYOS = 10 ** 7
+
+def _montecarlo(data, cert_no, grupo, ensayos, probabilidad, semilla, distribucion, factor_cobertura):
+    _verificar_grupo(data['labrowe_datalogger'], cert_no, grupo)
+    return _registros(procesar_lote_montecarlo_cacheado(
+        data['montecarlo'],
+        data['version'],
+        data['labrowe_datalogger'],
+        data['certificado_balance'],
+        data['thermodynamics'],
+        cert_no,
+        grupo,
+        ensayos,
+        probabilidad,
+        semilla,
+        distribucion,
+        factor_cobertura=factor_cobertura
+    ))
+
+async def incertidumbre_montecarlo(request):
+    """Como /uncertainty, con las columnas de Monte Carlo (GUM S1). Parámetros: group, trials,
+    probability, seed, distribution (de la componente CMC) y k (factor de cobertura del CMC y de
+    MeasUncert)."""
+    data = await _datos(request)
+    parametros = request.query_params
+    try:
+        ensayos = int(parametros.get('trials', ENSAYOS_POR_DEFECTO))
+        probabilidad = float(parametros.get('probability', '0.95'))
+        semilla = int(parametros.get('seed', '0'))
+        factor_cobertura = float(parametros.get('k', FACTOR_COBERTURA_POR_DEFECTO))
+    except ValueError:
+        return _error(400, "'trials' y 'seed' deben ser enteros y 'probability' y 'k' números")
+    if not 2 <= ensayos <= MAX_ENSAYOS:
+        return _error(400, f"'trials' debe estar entre 2 y {MAX_ENSAYOS}")
+    if not 0 < probabilidad < 1:
+        return _error(400, "'probability' debe estar entre 0 y 1")
+    if not 0 < factor_cobertura < float('inf'):
+        return _error(400, "'k' debe ser un número positivo")
+    distribucion = parametros.get('distribution', 'normal')
+    if distribucion not in DISTRIBUCIONES:
+        return _error(400, f"'distribution' debe ser uno de: {', '.join(DISTRIBUCIONES)}")
+    try:
+        registros = await run_in_threadpool(_montecarlo, data, request.path_params['cert_no'], parametros.get('group'),
+                                            ensayos, probabilidad, semilla, distribucion, factor_cobertura)
+    except ValueError as e:
+        return _error(404, str(e))
+    return RespuestaJSON(registros)
+
+def _buscar_modelos(store, consulta, limite):
+    # El índice de búsqueda se construye en la primera consulta
+    return [
+        {'Model': modelo, 'Match': TIPOS[tipo], 'Score': round(puntaje, 3), 'Certificates': [c.cert_no for c in store.encabezados_por_modelo(modelo)]}
+        for modelo, tipo, puntaje in store.buscador_modelos().buscar_con_puntaje(consulta, limite)
+    ]
+
+async def modelos(request):
+    store = (await _datos(request))['labrowe_datalogger']
+    try:
+        limite = int(request.query_params.get('limit', '50'))
+    except ValueError:
+        return _error(400, "'limit' debe ser un entero")
+    return RespuestaJSON(await run_in_threadpool(_buscar_modelos, store, request.query_params.get('q', ''), limite))
+
+# Ventana máxima de /standards/expiring: cien años cubren cualquier vencimiento real
+MAX_DIAS = 36500
+
+async def estandares_por_vencer(request):
+    try:
+        dias = int(request.query_params.get('days', '30'))
+    except ValueError:
+        return _error(400, "'days' debe ser un entero")
+    if not 0 <= dias <= MAX_DIAS:
+        return _error(400, f"'days' debe estar entre 0 y {MAX_DIAS}")
+    estandares = (await _datos(request))['estandares']
+    return RespuestaJSON([
+        {'CertNo': cert_no, 'Standard': standard}
+        for cert_no, standard in estandares.vencen_en(dias)
+    ])
+
+async def certificados_por_estandar(request):
+    return RespuestaJSON((await _datos(request))['estandares'].certificados_por_serie(request.path_params['serial_no']))
+
+async def calculo(request):
+    try:
+        data, peticion = await _datos(request), await _cuerpo_json(request)
+        return RespuestaJSON(await run_in_threadpool(_calcular, data, peticion))
+    except ErrorPeticion as e:
+        return _error(e.estado, str(e))
+    except ValueError as e:
+        return _error(422, str(e))
+
+# Límite de elementos por petición de /calculate/batch
+MAX_ELEMENTOS_LOTE = 1000
+
+def _calcular_lote(data, peticiones):
+    resultados = []
+    for peticion in peticiones:
+        try:
+            resultados.append({'result': _calcular(data, peticion)})
+        except (ErrorPeticion, ValueError) as e:
+            resultados.append({'error': str(e)})
+    return resultados
+
+async def calculo_lote(request):
+    """Recibe {'items': [peticion, ...]} y devuelve un resultado o un error por elemento, en orden."""
+    try:
+        cuerpo = await _cuerpo_json(request)
+    except ErrorPeticion as e:
+        return _error(e.estado, str(e))
+    if not isinstance(cuerpo, dict) or not isinstance(cuerpo.get('items'), list):
+        return _error(400, "Se esperaba {'items': [...]}")
+    if len(cuerpo['items']) > MAX_ELEMENTOS_LOTE:
+        return _error(400, f"'items' admite como máximo {MAX_ELEMENTOS_LOTE} elementos")
+    data = await _datos(request)
+    return RespuestaJSON({'items': await run_in_threadpool(_calcular_lote, data, cuerpo['items'])})
+
+def crear_aplicacion(data):
+    """Aplicación ASGI sobre un conjunto de datos ya cargado (ver cargar_datos), que se recarga
+    cuando cambian sus archivos (ver _datos).
+
+    Se puede probar localmente con starlette.testclient.TestClient(crear_aplicacion(data)) (requiere httpx).
+    """
+    aplicacion = Starlette(routes=[
+        Route('/health', salud),
+        Route('/metrics', metricas),
+        Route('/models', modelos),
+        Route('/certificates/{cert_no}', certificado),
+        Route('/certificates/{cert_no}/uncertainty', incertidumbre_certificado),
+        Route('/certificates/{cert_no}/uncertainty/montecarlo', incertidumbre_montecarlo),
+        Route('/certificates/{cert_no}/groups/{group}/measurements', mediciones),
+        Route('/standards/expiring', estandares_por_vencer),
+        Route('/standards/{serial_no}/certificates', certificados_por_estandar),
+        Route('/calculate', calculo, methods=['POST']),
+        Route('/calculate/batch', calculo_lote, methods=['POST']),
+    ])
+    aplicacion.state.data = data
+    aplicacion.state.proxima_verificacion = time.monotonic() + INTERVALO_RECARGA
+    aplicacion.state.recargando = False
+    return aplicacion
+
+def _servir(aplicacion, sock):
+    uvicorn.Server(uvicorn.Config(aplicacion, log_level='warning', access_log=False)).run(sockets=[sock])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="API HTTP de cálculo de incertidumbre del Calibration Assistant")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1, help="Procesos de trabajo (0 = uno por CPU)")
+    parser.add_argument('--doc', default='doc', help="Carpeta con los archivos JSON")
+    parser.add_argument('--lazy', action='store_true', help="Cargar sólo los encabezados del datalogger y leer cada certificado al consultarlo")
+    args = parser.parse_args(argv)
+
+    # Los datos se cargan antes de crear los procesos: todos comparten las mismas páginas
+    # de memoria (copy-on-write) y la caché mapeada del datalogger
+    aplicacion = crear_aplicacion(cargar_datos(args.doc, perezoso=args.lazy))
+    sock = socket.create_server((args.host, args.port))
+    sock.set_inheritable(True)
+    workers = args.workers or os.cpu_count()
+    if not hasattr(os, 'fork'):
+        workers = 1
+    gc.freeze()
+
+    hijos = []
+    for _ in range(workers - 1):
+        pid = os.fork()
+        if pid == 0:
+            _servir(aplicacion, sock)
+            os._exit(0)
+        hijos.append(pid)
+    try:
+        _servir(aplicacion, sock)
+    finally:
+        for pid in hijos:
+            os.kill(pid, signal.SIGTERM)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+# certificateModel.py
+import math
+import re
+import sys
+from datetime import datetime
+
+_TUR = re.compile(r'^\s*[<>≤≥]?\s*=?\s*(\d+(?:\.\d+)?)\s*:\s*1\s*$')
+
+def _numero(valor):
+    if isinstance(valor, bool):
+        return math.nan
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return math.nan
+
+def _texto_original(valor):
+    # Campo numérico tal como venía en el JSON, para devolverlo sin reformatear ('90.0' sigue
+    # siendo '90.0'); cadena vacía si no había valor
+    return '' if valor is None else _texto(valor)
+
+def _texto(valor):
+    # Los textos muy repetidos (unidades, parámetros, TUR, grupos) se comparten entre filas
+    return sys.intern(valor) if isinstance(valor, str) else valor
+
+def parsear_tur(texto):
+    """Convierte un TUR como '1.4:1' o '>10:1' en su razón numérica (1.4, 10.0); None si no es válido."""
+    coincidencia = _TUR.match(texto) if isinstance(texto, str) else None
+    return float(coincidencia[1]) if coincidencia else None
+
+def parsear_fecha(texto):
+    """Convierte una fecha MM/DD/YYYY en date; None si no es válida."""
+    try:
+        return datetime.strptime(texto, '%m/%d/%Y').date()
+    except (TypeError, ValueError):
+        return None
+
+class _Registro:
+    """Base de los registros del datalogger.
+
+    Los valores se convierten una sola vez al construir el objeto y se guardan en __slots__.
+    El acceso por clave del JSON (registro['Nominal'], registro.get('DueDate')) sigue
+    funcionando para el código que trabaja con diccionarios: sólo existen las claves que
+    venían en el JSON de origen.
+    """
+    __slots__ = ('extra', 'ausentes')
+
+    # Clave del JSON -> atributo
+    _CAMPOS = {}
+
+    def __getitem__(self, clave):
+        atributo = self._CAMPOS.get(clave)
+        if atributo is None or (self.ausentes and clave in self.ausentes):
+            if self.extra and clave in self.extra:
+                return self.extra[clave]
+            raise KeyError(clave)
+        return self._valor_json(clave, getattr(self, atributo))
+
+    def _valor_json(self, clave, valor):
+        return valor
+
+    def get(self, clave, por_defecto=None):
+        try:
+            return self[clave]
+        except KeyError:
+            return por_defecto
+
+    def __contains__(self, clave):
+        if clave in self._CAMPOS:
+            return not (self.ausentes and clave in self.ausentes)
+        return bool(self.extra and clave in self.extra)
+
+    def __iter__(self):
+        if self.ausentes:
+            yield from (clave for clave in self._CAMPOS if clave not in self.ausentes)
+        else:
+            yield from self._CAMPOS
+        if self.extra:
+            yield from self.extra
+
+    def keys(self):
+        return list(self)
+
+    def _origen(self, datos):
+        # Guarda los campos que no son de _CAMPOS y los de _CAMPOS que faltaban en el JSON
+        # (None si estaban todos, lo habitual)
+        extra = {clave: valor for clave, valor in datos.items() if clave not in self._CAMPOS}
+        self.extra = extra or None
+        self.ausentes = None if len(datos) - len(extra) == len(self._CAMPOS) else frozenset(self._CAMPOS.keys() - datos.keys())
+
+    def a_dict(self):
+        """Diccionario con la forma del JSON de origen."""
+        return {clave: _a_json(self[clave]) for clave in self}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{a}={getattr(self, a)!r}' for a in list(self._CAMPOS.values())[:3])}, ...)"
+
+def _a_json(valor):
+    if isinstance(valor, _Registro):
+        return valor.a_dict()
+    if isinstance(valor, (list, tuple)):
+        return [_a_json(v) for v in valor]
+    return valor
+
+class Measurement(_Registro):
+    __slots__ = ('row_id', 'units', 'maximum_permissible_error', 'maximum_permissible_error_texto', 'nominal', 'nominal_texto',
+                 'low_limit', 'low_limit_texto', 'high_limit', 'high_limit_texto', 'as_found', 'as_found_texto',
+                 'after_adjustment', 'after_adjustment_texto', 'meas_uncert', 'meas_uncert_texto', 'meas_unit',
+                 'meas_parameter', 'meas_sub_parameter', 'tur', 'tur_texto', 'is_visible', 'formatted_comment')
+
+    _CAMPOS = {
+        'RowId': 'row_id',
+        'Units': 'units',
+        'MaximumPermissibleError': 'maximum_permissible_error_texto',
+        'Nominal': 'nominal_texto',
+        'LowLimit': 'low_limit_texto',
+        'HighLimit': 'high_limit_texto',
+        'AsFound': 'as_found_texto',
+        'AfterAdjustment': 'after_adjustment_texto',
+        'MeasUncert': 'meas_uncert_texto',
+        'MeasUnit': 'meas_unit',
+        'MeasParameter': 'meas_parameter',
+        'MeasSubParameter': 'meas_sub_parameter',
+        'TUR': 'tur_texto',
+        'IsVisible': 'is_visible',
+        'FormattedComment': 'formatted_comment',
+    }
+
+    @classmethod
+    def desde_dict(cls, datos):
+        m = cls.__new__(cls)
+        m.row_id = datos.get('RowId')
+        m.units = _texto(datos.get('Units'))
+        m.nominal_texto = _texto_original(datos.get('Nominal'))
+        m.nominal = _numero(m.nominal_texto)
+        # Cada campo numérico guarda su valor convertido y el texto original, como Nominal
+        m.maximum_permissible_error_texto = _texto_original(datos.get('MaximumPermissibleError'))
+        m.maximum_permissible_error = _numero(m.maximum_permissible_error_texto)
+        m.low_limit_texto = _texto_original(datos.get('LowLimit'))
+        m.low_limit = _numero(m.low_limit_texto)
+        m.high_limit_texto = _texto_original(datos.get('HighLimit'))
+        m.high_limit = _numero(m.high_limit_texto)
+        m.as_found_texto = _texto_original(datos.get('AsFound'))
+        m.as_found = _numero(m.as_found_texto)
+        m.after_adjustment_texto = _texto_original(datos.get('AfterAdjustment'))
+        m.after_adjustment = _numero(m.after_adjustment_texto)
+        m.meas_uncert_texto = _texto_original(datos.get('MeasUncert'))
+        m.meas_uncert = _numero(m.meas_uncert_texto)
+        m.meas_unit = _texto(datos.get('MeasUnit'))
+        m.meas_parameter = _texto(datos.get('MeasParameter'))
+        m.meas_sub_parameter = _texto(datos.get('MeasSubParameter'))
+        m.tur_texto = _texto(datos.get('TUR'))
+        m.tur = parsear_tur(m.tur_texto)
+        m.is_visible = datos.get('IsVisible')
+        m.formatted_comment = _texto(datos.get('FormattedComment'))
+        m._origen(datos)
+        return m
+
+class Datasheet(_Registro):
+    __slots__ = ('group', 'measurements')
+
+    _CAMPOS = {'Group': 'group', 'Measurements': 'measurements'}
+
+    @classmethod
+    def desde_dict(cls, datos):
+        d = cls.__new__(cls)
+        d.group = _texto(datos['Group'])
+        d.measurements = [m if isinstance(m, Measurement) else Measurement.desde_dict(m) for m in datos['Measurements']]
+        d._origen(datos)
+        return d
+
+class Standard(_Registro):
+    __slots__ = ('id_inst', 'description', 'serial_no', 'cal_date', 'cal_date_texto', 'due_date', 'due_date_texto')
+
+    _CAMPOS = {
+        'IdInst': 'id_inst',
+        'Description': 'description',
+        'SerialNo': 'serial_no',
+        'CalDate': 'cal_date_texto',
+        'DueDate': 'due_date_texto',
+    }
+
+    @classmethod
+    def desde_dict(cls, datos):
+        s = cls.__new__(cls)
+        s.id_inst = datos.get('IdInst')
+        s.description = _texto(datos.get('Description'))
+        s.serial_no = datos.get('SerialNo')
+        s.cal_date_texto = datos.get('CalDate')
+        s.cal_date = parsear_fecha(s.cal_date_texto)
+        s.due_date_texto = datos.get('DueDate')
+        s.due_date = parsear_fecha(s.due_date_texto)
+        s._origen(datos)
+        return s
+
+class Certificate(_Registro):
+    __slots__ = ('is_accredited', 'customer_requirements', 'environmental_temperature', 'environmental_relative_humidity',
+                 'environmental_barometric_pressure', 'procedures', 'standards', 'cert_no', 'customer_code',
+                 'equipment_type', 'asset_description', 'manufacturer', 'model', 'operating_range',
+                 'accreditation_info', 'remarks', 'datasheet')
+
+    _CAMPOS = {
+        'IsAccredited': 'is_accredited',
+        'CustomerRequirements': 'customer_requirements',
+        'EnvironmentalTemperature': 'environmental_temperature',
+        'EnvironmentalRelativeHumidity': 'environmental_relative_humidity',
+        'EnvironmentalBarometricPressure': 'environmental_barometric_pressure',
+        'Procedures': 'procedures',
+        'Standards': 'standards',
+        'CertNo': 'cert_no',
+        'CustomerCode': 'customer_code',
+        'EquipmentType': 'equipment_type',
+        'AssetDescription': 'asset_description',
+        'Manufacturer': 'manufacturer',
+        'Model': 'model',
+        'OperatingRange': 'operating_range',
+        'AccreditationInfo': 'accreditation_info',
+        'Remarks': 'remarks',
+        'Datasheet': 'datasheet',
+    }
+
+    @classmethod
+    def desde_dict(cls, datos):
+        if isinstance(datos, cls):
+            return datos
+        c = cls.__new__(cls)
+        c.is_accredited = datos.get('IsAccredited')
+        c.customer_requirements = tuple(_texto(r) for r in datos.get('CustomerRequirements', ()))
+        c.environmental_temperature = datos.get('EnvironmentalTemperature')
+        c.environmental_relative_humidity = datos.get('EnvironmentalRelativeHumidity')
+        c.environmental_barometric_pressure = datos.get('EnvironmentalBarometricPressure')
+        c.procedures = tuple(_texto(p) for p in datos.get('Procedures', ()))
+        c.standards = tuple(Standard.desde_dict(s) for s in datos.get('Standards', ()))
+        c.cert_no = datos['CertNo']
+        c.customer_code = _texto(datos.get('CustomerCode'))
+        c.equipment_type = _texto(datos.get('EquipmentType'))
+        c.asset_description = _texto(datos.get('AssetDescription'))
+        c.manufacturer = _texto(datos.get('Manufacturer'))
+        c.model = _texto(datos['Model'])
+        c.operating_range = _texto(datos.get('OperatingRange'))
+        c.accreditation_info = _texto(datos.get('AccreditationInfo'))
+        c.remarks = datos.get('Remarks')
+        c.datasheet = [Datasheet.desde_dict(d) for d in datos['Datasheet']]
+        c._origen(datos)
+        return c
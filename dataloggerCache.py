@@ -0,0 +1,777 @@
+# dataloggerCache.py
+import glob
+import hashlib
+import json
+from array import array
+import mmap
+import os
+import threading
+
+import numpy as np
+
+import pandas as pd
+
+from ScalesBalances import iterar_json, CertificateStore, COLUMNAS_LOTE, _clave_nominal
+from certificateModel import Certificate, Datasheet, Measurement
+from instrumentation import medir
+from modelSearch import ModelSearchIndex
+from standardsIndex import StandardsIndex
+
+MAGIA = b'DLCACHE1'
+VERSION = 1
+ALINEACION = 64
+
+# Campos de Measurements que además se guardan ya convertidos a float64
+CAMPOS_NUMERICOS = ['Nominal', 'LowLimit', 'HighLimit', 'AsFound', 'AfterAdjustment', 'MeasUncert', 'MaximumPermissibleError']
+
+def ruta_cache_por_defecto(ruta_json):
+    return os.path.splitext(ruta_json)[0] + '.dlcache'
+
+def calcular_hash(ruta, bloque=1 << 20):
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as file:
+        for parte in iter(lambda: file.read(bloque), b''):
+            sha.update(parte)
+    return sha.hexdigest()
+
+def firma_fuente(ruta_json, con_hash=True):
+    estado = os.stat(ruta_json)
+    return {
+        'mtime_ns': estado.st_mtime_ns,
+        'size': estado.st_size,
+        'sha256': calcular_hash(ruta_json) if con_hash else None
+    }
+
+def _a_float(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return float('nan')
+
+def _agregar_fila(columnas, registro, fila, codificar, excluir=()):
+    # Un campo que aparece por primera vez se rellena con -1 (ausente) en las filas anteriores
+    for campo in registro:
+        if campo not in excluir and campo not in columnas:
+            columnas[campo] = array('i', [-1]) * fila
+    for campo, columna in columnas.items():
+        columna.append(codificar(registro[campo]) if campo in registro else -1)
+
+def escribir_cache(labrowe_datalogger_data, ruta_cache, fuente):
+    """Escribe el datalogger en formato columnar.
+
+    Cada valor de encabezado o de medición se guarda como un código int32 hacia una tabla
+    única de valores JSON (los textos repetidos se almacenan una sola vez). Las mediciones
+    quedan en columnas por fila y los grupos y certificados guardan los desplazamientos
+    [inicio, fin) de sus filas y grupos. Los certificados se consumen de uno en uno, así que
+    acepta directamente el generador de iterar_json.
+    """
+    valores = {}
+    def codificar(valor):
+        return valores.setdefault(json.dumps(valor, ensure_ascii=False), len(valores))
+
+    columnas_certificado, columnas_medicion = {}, {}
+    numericas = {campo: array('d') for campo in CAMPOS_NUMERICOS}
+    grupo_certificado, grupo_nombre = array('i'), array('i')
+    grupo_inicio, grupo_fin, cert_inicio, cert_fin = array('q'), array('q'), array('q'), array('q')
+    n_certificados = n_filas = 0
+    for certificado in labrowe_datalogger_data:
+        _agregar_fila(columnas_certificado, certificado, n_certificados, codificar, excluir=('Datasheet',))
+        cert_inicio.append(len(grupo_nombre))
+        for datasheet in certificado['Datasheet']:
+            grupo_certificado.append(n_certificados)
+            grupo_nombre.append(codificar(datasheet['Group']))
+            grupo_inicio.append(n_filas)
+            for measurement in datasheet['Measurements']:
+                _agregar_fila(columnas_medicion, measurement, n_filas, codificar)
+                for campo in CAMPOS_NUMERICOS:
+                    numericas[campo].append(_a_float(measurement.get(campo)))
+                n_filas += 1
+            grupo_fin.append(n_filas)
+        cert_fin.append(len(grupo_nombre))
+        n_certificados += 1
+
+    arreglos = {}
+    for campo, columna in columnas_certificado.items():
+        arreglos[f'cert/{campo}'] = np.frombuffer(columna, dtype=np.int32)
+    for campo, columna in columnas_medicion.items():
+        arreglos[f'fila/{campo}'] = np.frombuffer(columna, dtype=np.int32)
+    for campo, columna in numericas.items():
+        arreglos[f'num/{campo}'] = np.frombuffer(columna, dtype=np.float64)
+    arreglos['grupo/certificado'] = np.frombuffer(grupo_certificado, dtype=np.int32)
+    arreglos['grupo/nombre'] = np.frombuffer(grupo_nombre, dtype=np.int32)
+    arreglos['grupo/inicio'] = np.frombuffer(grupo_inicio, dtype=np.int64)
+    arreglos['grupo/fin'] = np.frombuffer(grupo_fin, dtype=np.int64)
+    arreglos['certgrupos/inicio'] = np.frombuffer(cert_inicio, dtype=np.int64)
+    arreglos['certgrupos/fin'] = np.frombuffer(cert_fin, dtype=np.int64)
+
+    textos = [texto.encode('utf-8') for texto in valores]
+    arreglos['valores/desplazamientos'] = np.cumsum([0] + [len(t) for t in textos], dtype=np.int64)
+    arreglos['valores/datos'] = np.frombuffer(b''.join(textos), dtype=np.uint8)
+
+    encabezado = {
+        'version': VERSION,
+        'fuente': fuente,
+        'campos_certificado': list(columnas_certificado),
+        'campos_medicion': list(columnas_medicion),
+        'n_certificados': n_certificados,
+        'n_filas': n_filas,
+        'arreglos': {}
+    }
+    desplazamiento = 0
+    for nombre, arreglo in arreglos.items():
+        encabezado['arreglos'][nombre] = {'dtype': arreglo.dtype.str, 'shape': list(arreglo.shape), 'offset': desplazamiento}
+        desplazamiento += -(-arreglo.nbytes // ALINEACION) * ALINEACION
+    bytes_encabezado = json.dumps(encabezado, ensure_ascii=False).encode('utf-8')
+    inicio_datos = -(-(len(MAGIA) + 8 + len(bytes_encabezado)) // ALINEACION) * ALINEACION
+
+    # Escritura atómica: un lector nunca ve un archivo a medio escribir
+    temporal = f"{ruta_cache}.{os.getpid()}.tmp"
+    with open(temporal, 'wb') as file:
+        file.write(MAGIA)
+        file.write(len(bytes_encabezado).to_bytes(8, 'little'))
+        file.write(bytes_encabezado)
+        for nombre, arreglo in arreglos.items():
+            file.seek(inicio_datos + encabezado['arreglos'][nombre]['offset'])
+            file.write(arreglo.tobytes())
+        file.truncate(inicio_datos + desplazamiento)
+    os.replace(temporal, ruta_cache)
+
+def actualizar_fuente(ruta_cache, fuente):
+    """Reescribe en el sitio la firma de la fuente del encabezado, sin tocar los arreglos.
+
+    Se usa cuando cambió el mtime del JSON pero no su contenido, para no volver a calcular el
+    hash en cada arranque. Devuelve False si el nuevo encabezado no cabe antes de los datos.
+    """
+    with open(ruta_cache, 'r+b') as file:
+        cabecera = file.read(len(MAGIA) + 8)
+        if cabecera[:len(MAGIA)] != MAGIA:
+            return False
+        largo = int.from_bytes(cabecera[len(MAGIA):], 'little')
+        encabezado = json.loads(file.read(largo).decode('utf-8'))
+        inicio_datos = -(-(len(MAGIA) + 8 + largo) // ALINEACION) * ALINEACION
+        encabezado['fuente'] = fuente
+        # Con espacios al final el JSON sigue siendo válido y el encabezado conserva su largo
+        bytes_encabezado = json.dumps(encabezado, ensure_ascii=False).encode('utf-8').ljust(largo)
+        if len(MAGIA) + 8 + len(bytes_encabezado) > inicio_datos:
+            return False
+        file.seek(len(MAGIA))
+        file.write(len(bytes_encabezado).to_bytes(8, 'little'))
+        file.write(bytes_encabezado)
+    return True
+
+class DataloggerCache:
+    """Vista de solo lectura sobre un archivo .dlcache mapeado en memoria.
+
+    Los arreglos son vistas sin copia sobre el mmap; los valores se decodifican sólo al
+    materializar un certificado, un grupo o una fila.
+    """
+
+    def __init__(self, ruta_cache):
+        with open(ruta_cache, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIA)] != MAGIA:
+            raise ValueError(f"El archivo {ruta_cache} no es una caché del datalogger")
+        largo = int.from_bytes(self._mmap[len(MAGIA):len(MAGIA) + 8], 'little')
+        encabezado = json.loads(self._mmap[len(MAGIA) + 8:len(MAGIA) + 8 + largo].decode('utf-8'))
+        if encabezado['version'] != VERSION:
+            raise ValueError(f"Versión de caché no soportada: {encabezado['version']}")
+        inicio_datos = -(-(len(MAGIA) + 8 + largo) // ALINEACION) * ALINEACION
+
+        self.ruta = ruta_cache
+        self.fuente = encabezado['fuente']
+        self.campos_certificado = encabezado['campos_certificado']
+        self.campos_medicion = encabezado['campos_medicion']
+        self.n_certificados = encabezado['n_certificados']
+        self.n_filas = encabezado['n_filas']
+        self.arreglos = {}
+        for nombre, meta in encabezado['arreglos'].items():
+            dtype = np.dtype(meta['dtype'])
+            cantidad = int(np.prod(meta['shape']))
+            self.arreglos[nombre] = np.frombuffer(self._mmap, dtype=dtype, count=cantidad, offset=inicio_datos + meta['offset']).reshape(meta['shape'])
+        self._decodificados = {}
+
+    def valor(self, codigo):
+        codigo = int(codigo)
+        if codigo not in self._decodificados:
+            desplazamientos = self.arreglos['valores/desplazamientos']
+            datos = self.arreglos['valores/datos'][desplazamientos[codigo]:desplazamientos[codigo + 1]]
+            self._decodificados[codigo] = json.loads(datos.tobytes().decode('utf-8'))
+        return self._decodificados[codigo]
+
+    def decodificar(self, codigos):
+        """Arreglo de objetos con los valores de un arreglo de códigos (-1 = None), decodificando cada código distinto una vez."""
+        distintos, inversa = np.unique(codigos, return_inverse=True)
+        valores = np.empty(len(distintos), dtype=object)
+        for j, codigo in enumerate(distintos):
+            valores[j] = self.valor(codigo) if codigo >= 0 else None
+        return valores[inversa.reshape(-1)]
+
+    def columna_codigos(self, prefijo, campo, largo):
+        return self.arreglos.get(f'{prefijo}/{campo}', np.full(largo, -1, dtype=np.int32))
+
+    def columna(self, campo):
+        """Columna numérica (float64) de las mediciones, p. ej. 'Nominal' o 'MeasUncert'."""
+        return self.arreglos[f'num/{campo}']
+
+    def valores_certificado(self, campo):
+        codigos = self.columna_codigos('cert', campo, self.n_certificados)
+        return [self.valor(codigo) if codigo >= 0 else None for codigo in codigos]
+
+    def encabezado(self, i):
+        return {campo: self.valor(codigo) for campo in self.campos_certificado
+                if (codigo := self.arreglos[f'cert/{campo}'][i]) >= 0}
+
+    def medicion(self, fila):
+        return {campo: self.valor(codigo) for campo in self.campos_medicion
+                if (codigo := self.arreglos[f'fila/{campo}'][fila]) >= 0}
+
+    def nombre_grupo(self, g):
+        return self.valor(self.arreglos['grupo/nombre'][g])
+
+    def grupos_de(self, i):
+        return range(self.arreglos['certgrupos/inicio'][i], self.arreglos['certgrupos/fin'][i])
+
+    def filas_de(self, g):
+        return range(self.arreglos['grupo/inicio'][g], self.arreglos['grupo/fin'][g])
+
+    def datasheet(self, g):
+        return {'Group': self.nombre_grupo(g), 'Measurements': [self.medicion(fila) for fila in self.filas_de(g)]}
+
+    def certificado(self, i):
+        certificado = self.encabezado(i)
+        certificado['Datasheet'] = [self.datasheet(g) for g in self.grupos_de(i)]
+        return certificado
+
+    def __len__(self):
+        return self.n_certificados
+
+    def __iter__(self):
+        return (self.certificado(i) for i in range(self.n_certificados))
+
+class CachedCertificateStore(CertificateStore):
+    """CertificateStore respaldado por un DataloggerCache.
+
+    Indexa CertNo, Model y (CertNo, Group) a partir de las columnas sin materializar las
+    mediciones; la búsqueda por (Units, Nominal) se resuelve con NumPy dentro de las filas del grupo.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.por_certno = {}
+        self.por_modelo = {}
+        self.por_grupo = {}
+        self.por_medicion = {}
+        for i, (cert_no, modelo) in enumerate(zip(cache.valores_certificado('CertNo'), cache.valores_certificado('Model'))):
+            self.por_certno.setdefault(cert_no, i)
+            self.por_modelo.setdefault(modelo, []).append(i)
+            for g in cache.grupos_de(i):
+                self.por_grupo.setdefault((cert_no, cache.nombre_grupo(g)), g)
+
+    def agregar(self, certificado):
+        raise TypeError("La caché del datalogger es de solo lectura; regenérela desde el JSON")
+
+    @property
+    def certificados(self):
+        return self.cache
+
+    def __iter__(self):
+        return (Certificate.desde_dict(certificado) for certificado in self.cache)
+
+    def __len__(self):
+        return len(self.cache)
+
+    def cert_nos(self):
+        return self.cache.valores_certificado('CertNo')
+
+    def certificado(self, cert_no):
+        try:
+            return Certificate.desde_dict(self.cache.certificado(self.por_certno[cert_no]))
+        except KeyError:
+            raise ValueError(f"No se encontró el certificado {cert_no}")
+
+    def grupos(self, cert_no):
+        grupos = []
+        for g in self.cache.grupos_de(self._indice(cert_no)):
+            if self.cache.nombre_grupo(g) not in grupos:
+                grupos.append(self.cache.nombre_grupo(g))
+        return grupos
+
+    def _indice(self, cert_no):
+        try:
+            return self.por_certno[cert_no]
+        except KeyError:
+            raise ValueError(f"No se encontró el certificado {cert_no}")
+
+    def datasheet(self, cert_no, grupo):
+        try:
+            return Datasheet.desde_dict(self.cache.datasheet(self.por_grupo[(cert_no, grupo)]))
+        except KeyError:
+            raise ValueError(f"No se encontró el grupo {grupo} en el certificado {cert_no}")
+
+    def medicion(self, cert_no, grupo, unidad, nominal):
+        g = self.por_grupo.get((cert_no, grupo))
+        if g is None:
+            return None
+        filas = self.cache.filas_de(g)
+        nominales = self.cache.columna('Nominal')[filas.start:filas.stop]
+        for desplazamiento in np.flatnonzero(np.round(nominales, 6) == _clave_nominal(nominal)):
+            medicion = self.cache.medicion(filas.start + desplazamiento)
+            if medicion.get('Units') == unidad:
+                return Measurement.desde_dict(medicion)
+        return None
+
+    def certificados_por_modelo(self, modelo):
+        return [Certificate.desde_dict(self.cache.certificado(i)) for i in self.por_modelo.get(modelo, [])]
+
+    def encabezado(self, cert_no):
+        return Certificate.desde_dict({**self.cache.encabezado(self._indice(cert_no)), 'Datasheet': []})
+
+    def encabezados_por_modelo(self, modelo):
+        return [Certificate.desde_dict({**self.cache.encabezado(i), 'Datasheet': []}) for i in self.por_modelo.get(modelo, [])]
+
+    def filas_lote(self, cert_nos=None, grupo=None):
+        # Se arma directamente desde las columnas: sólo se decodifica cada valor de texto distinto una vez
+        cache = self.cache
+        indices = range(len(cache)) if cert_nos is None else [self._indice(cert_no) for cert_no in cert_nos]
+        grupos = np.array([g for i in indices for g in cache.grupos_de(i)], dtype=np.int64)
+        if grupo is not None:
+            grupos = grupos[cache.decodificar(cache.arreglos['grupo/nombre'][grupos]) == grupo]
+        inicio = cache.arreglos['grupo/inicio'][grupos]
+        largos = cache.arreglos['grupo/fin'][grupos] - inicio
+        desplazamiento = np.repeat(np.cumsum(largos) - largos, largos)
+        filas = np.repeat(inicio, largos) + np.arange(largos.sum()) - desplazamiento
+        grupo_de_fila = np.repeat(grupos, largos)
+        n = cache.n_filas
+        return pd.DataFrame({
+            'cert_no': cache.decodificar(cache.columna_codigos('cert', 'CertNo', cache.n_certificados)[cache.arreglos['grupo/certificado'][grupo_de_fila]]),
+            'group': cache.decodificar(cache.arreglos['grupo/nombre'][grupo_de_fila]),
+            'row_id': cache.decodificar(cache.columna_codigos('fila', 'RowId', n)[filas]),
+            'units': cache.decodificar(cache.columna_codigos('fila', 'Units', n)[filas]),
+            'meas_parameter': self._parametros(filas),
+            'nominal': cache.columna('Nominal')[filas],
+            'meas_uncert': cache.columna('MeasUncert')[filas],
+            'low_limit': cache.columna('LowLimit')[filas],
+            'high_limit': cache.columna('HighLimit')[filas],
+            'tur': cache.decodificar(cache.columna_codigos('fila', 'TUR', n)[filas]),
+        }, columns=COLUMNAS_LOTE)
+
+    def _parametros(self, filas):
+        # MeasParameter y MeasSubParameter unidos como en _parametro, una vez por cada par distinto
+        n = self.cache.n_filas
+        codigos = np.stack([self.cache.columna_codigos('fila', campo, n)[filas] for campo in ('MeasParameter', 'MeasSubParameter')], axis=1)
+        pares, inversa = np.unique(codigos, axis=0, return_inverse=True)
+        textos = np.array([' '.join(t.strip() for t in (self.cache.valor(c) for c in par if c >= 0) if isinstance(t, str) and t.strip())
+                           for par in pares], dtype=object)
+        return textos[inversa.reshape(-1)] if len(pares) else np.empty(0, dtype=object)
+
+    def fichas_modelo(self):
+        return zip(*(self.cache.valores_certificado(campo) for campo in ('Model', 'Manufacturer', 'AssetDescription')))
+
+    def estandares(self):
+        # Sólo se decodifican las columnas CertNo y Standards
+        return zip(self.cache.valores_certificado('CertNo'), (s or () for s in self.cache.valores_certificado('Standards')))
+
+@medir('cargar_datalogger')
+def cargar_datalogger(ruta_json, ruta_cache=None):
+    """Abre la caché columnar del datalogger, regenerándola sólo si cambió el JSON de origen.
+
+    La caché es válida si coinciden el mtime y el tamaño del JSON o, si cambió el mtime,
+    su hash SHA-256. Si no se puede escribir la caché se usa el JSON en memoria.
+    """
+    ruta_cache = ruta_cache or ruta_cache_por_defecto(ruta_json)
+    firma = firma_fuente(ruta_json, con_hash=False)
+    if os.path.exists(ruta_cache):
+        try:
+            cache = DataloggerCache(ruta_cache)
+        except (ValueError, OSError, KeyError):
+            cache = None
+        if cache is not None:
+            fuente = cache.fuente
+            if (fuente['mtime_ns'], fuente['size']) == (firma['mtime_ns'], firma['size']):
+                return CachedCertificateStore(cache)
+            if fuente['size'] == firma['size'] and fuente['sha256'] == calcular_hash(ruta_json):
+                # Mismo contenido con otro mtime (touch, checkout): se guarda el nuevo mtime
+                firma['sha256'] = fuente['sha256']
+                try:
+                    if actualizar_fuente(ruta_cache, firma):
+                        cache.fuente = firma
+                except (OSError, ValueError):
+                    pass
+                return CachedCertificateStore(cache)
+
+    firma['sha256'] = calcular_hash(ruta_json)
+    try:
+        escribir_cache(iterar_json(ruta_json), ruta_cache, firma)
+    except OSError:
+        return CertificateStore(iterar_json(ruta_json))
+    return CachedCertificateStore(DataloggerCache(ruta_cache))
+
+def rutas_exportaciones(ruta_doc):
+    """Exportaciones del datalogger de una carpeta: LabRoweDatalogger.json y después las
+    LabRoweDatalogger_*.json en orden alfabético (ante CertNo repetidos gana la primera)."""
+    adicionales = glob.glob(os.path.join(glob.escape(ruta_doc), 'LabRoweDatalogger_*.json'))
+    return [os.path.join(ruta_doc, 'LabRoweDatalogger.json')] + sorted(adicionales)
+
+def _cierre(datos, inicio):
+    # Final del último elemento del arreglo JSON que termina en `datos` (que empieza en el byte
+    # `inicio` del archivo): posición de fin, bytes que le siguen y si el arreglo está vacío
+    resto = datos.rstrip(b' \t\r\n')
+    if not resto.endswith(b']'):
+        return {'fin': None, 'cierre': None, 'vacio': None}
+    resto = resto[:-1].rstrip(b' \t\r\n')
+    return {'fin': inicio + len(resto), 'cierre': datos[len(resto):], 'vacio': resto.endswith(b'[')}
+
+def _cierre_archivo(ruta_json, bloque=1 << 12):
+    with open(ruta_json, 'rb') as archivo:
+        tamano = archivo.seek(0, os.SEEK_END)
+        archivo.seek(max(0, tamano - bloque))
+        return _cierre(archivo.read(), max(0, tamano - bloque))
+
+def _leer_agregados(ruta_json, exportacion, bloque=1 << 20):
+    """Certificados añadidos al final de una exportación ya cargada, junto con el hash y el
+    cierre del JSON nuevo, o None si el JSON cambió de otra forma.
+
+    El JSON anterior era el contenido hasta el final de su último elemento seguido de su
+    cierre, así que basta con comprobar el hash de ese prefijo más el cierre guardado.
+    """
+    fin, sha256 = exportacion['fin'], exportacion['sha256']
+    if fin is None or sha256 is None:
+        return None
+    sha = hashlib.sha256()
+    with open(ruta_json, 'rb') as archivo:
+        pendiente = fin
+        while pendiente:
+            parte = archivo.read(min(bloque, pendiente))
+            if not parte:
+                return None
+            sha.update(parte)
+            pendiente -= len(parte)
+        anterior = sha.copy()
+        anterior.update(exportacion['cierre'])
+        if anterior.hexdigest() != sha256:
+            return None
+        agregado = archivo.read()
+    sha.update(agregado)
+    try:
+        texto = agregado.decode('utf-8').lstrip(' \t\r\n')
+        if not exportacion['vacio'] and not texto.startswith(']'):
+            if not texto.startswith(','):
+                return None
+            texto = texto[1:]
+        certificados = json.loads('[' + texto)
+    except ValueError:
+        return None
+    if not all(isinstance(certificado, dict) for certificado in certificados):
+        return None
+    return certificados, {'sha256': sha.hexdigest(), **_cierre(agregado, fin)}
+
+def _sha256_segmento(segmento):
+    # Hash del JSON con el que se construyó el segmento, si el store lo conserva
+    fuente = segmento.cache.fuente if isinstance(segmento, CachedCertificateStore) else getattr(segmento, 'fuente', None)
+    return fuente.get('sha256') if isinstance(fuente, dict) else None
+
+# Segmentos en memoria con certificados añadidos al final de una exportación antes de unirlos
+MAX_COLAS = 8
+
+class _Indices:
+    """Segmentos e índices globales de un MergedCertificateStore en un momento dado.
+
+    Una vez publicado no se modifica: cada cambio construye otro y lo publica con una sola
+    asignación, así que quien lo lee ve siempre un estado completo. Sólo el buscador de
+    modelos y el índice de estándares se construyen sobre él la primera vez que se piden.
+    """
+
+    __slots__ = ('segmentos', 'por_certno', 'por_grupo', 'por_modelo', 'repetidos', 'omitidos', 'duplicados',
+                 'buscador', 'estandares')
+
+    def __init__(self):
+        self.segmentos = []
+        self.por_certno = {}
+        self.por_grupo = {}
+        self.por_modelo = {}
+        # CertNo de cada segmento que pertenecen a un segmento anterior, y cuántas copias suman
+        self.repetidos = {}
+        self.omitidos = {}
+        self.duplicados = []
+        self.buscador = None
+        self.estandares = None
+
+    def copia(self):
+        indices = _Indices()
+        indices.segmentos = list(self.segmentos)
+        indices.por_certno = dict(self.por_certno)
+        indices.por_grupo = dict(self.por_grupo)
+        indices.por_modelo = dict(self.por_modelo)
+        indices.repetidos = dict(self.repetidos)
+        indices.omitidos = dict(self.omitidos)
+        indices.duplicados = list(self.duplicados)
+        return indices
+
+    def agregar_segmento(self, segmento):
+        """Añade un segmento al final (sólo antes de publicar estos índices)."""
+        self.segmentos.append(segmento)
+        repetidos = self.repetidos[segmento] = set()
+        omitidos = 0
+        for cert_no in segmento.cert_nos():
+            if self.por_certno.setdefault(cert_no, segmento) is not segmento:
+                if cert_no not in repetidos:
+                    repetidos.add(cert_no)
+                    self.duplicados.append(cert_no)
+                omitidos += 1
+        self.omitidos[segmento] = omitidos
+        for clave in segmento.por_grupo:
+            if clave[0] not in repetidos:
+                self.por_grupo.setdefault(clave, segmento)
+        for modelo in segmento.por_modelo:
+            # Las listas se reemplazan en vez de ampliarse: pueden ser de índices ya publicados
+            segmentos = self.por_modelo.get(modelo, ())
+            if segmento not in segmentos:
+                self.por_modelo[modelo] = [*segmentos, segmento]
+
+class MergedCertificateStore(CertificateStore):
+    """Une varias exportaciones del datalogger (segmentos) en un único store lógico.
+
+    Cada segmento es un CertificateStore (por defecto un CachedCertificateStore por archivo,
+    o el que devuelva `cargador`). Los índices globales sólo guardan qué segmento resuelve
+    cada clave. Ante CertNo repetidos gana el primer segmento: las copias de los siguientes
+    no se recorren, no se cuentan ni aparecen en filas_lote, estandares o fichas_modelo.
+
+    Se puede consultar desde varios hilos mientras otro carga exportaciones: los segmentos
+    publicados no se modifican y los índices se reemplazan enteros (ver _Indices).
+    """
+
+    def __init__(self, segmentos=(), cargador=None):
+        self.cargador = cargador or cargar_datalogger
+        self.rutas = {}
+        self._sueltos = None
+        self._lock = threading.Lock()
+        self._indices = self._construir(segmentos)
+
+    @staticmethod
+    def _construir(segmentos):
+        indices = _Indices()
+        for segmento in segmentos:
+            indices.agregar_segmento(segmento)
+        return indices
+
+    def _publicar_al_final(self, segmento):
+        # Un segmento añadido al final no cambia a qué segmento pertenecen las claves anteriores
+        anteriores = self._indices
+        indices = anteriores.copia()
+        indices.agregar_segmento(segmento)
+        if anteriores.estandares is not None:
+            estandares = anteriores.estandares.copia()
+            repetidos = indices.repetidos[segmento]
+            for cert_no, standards in segmento.estandares():
+                if cert_no not in repetidos:
+                    estandares.agregar(cert_no, standards)
+            indices.estandares = estandares
+        self._indices = indices
+
+    def _publicar(self, segmentos):
+        segmentos = list(segmentos)
+        actuales = self._indices.segmentos
+        if len(segmentos) == len(actuales) + 1 and all(a is b for a, b in zip(segmentos, actuales)):
+            self._publicar_al_final(segmentos[-1])
+        else:
+            self._indices = self._construir(segmentos)
+
+    @property
+    def segmentos(self):
+        return self._indices.segmentos
+
+    @property
+    def por_certno(self):
+        return self._indices.por_certno
+
+    @property
+    def por_grupo(self):
+        return self._indices.por_grupo
+
+    @property
+    def por_modelo(self):
+        return self._indices.por_modelo
+
+    @property
+    def duplicados(self):
+        return self._indices.duplicados
+
+    def agregar(self, certificado):
+        # Los certificados sueltos van a un segmento en memoria propio, que se reemplaza por una
+        # copia ampliada para no modificar uno publicado
+        with self._lock:
+            anterior = self._sueltos
+            self._sueltos = CertificateStore([*(anterior or ()), certificado])
+            self._publicar([self._sueltos if s is anterior else s for s in self._indices.segmentos]
+                           if anterior is not None else [*self._indices.segmentos, self._sueltos])
+
+    def cargar_exportacion(self, ruta_json):
+        """Añade una exportación, o la actualiza si su JSON cambió desde la última vez.
+
+        Si el JSON sólo creció por el final (el contenido hasta su último certificado no
+        cambió) se leen únicamente los certificados añadidos; si no, se recarga entero.
+        """
+        with self._lock:
+            firma = firma_fuente(ruta_json, con_hash=False)
+            anterior = self.rutas.get(ruta_json)
+            if anterior is not None:
+                if anterior['firma'] == firma or self._extender(ruta_json, anterior, firma):
+                    return
+            segmento = self.cargador(ruta_json)
+            self.rutas[ruta_json] = {'segmentos': [segmento], 'firma': firma, 'sha256': _sha256_segmento(segmento),
+                                     **_cierre_archivo(ruta_json)}
+            if anterior is None:
+                self._publicar([*self._indices.segmentos, segmento])
+                return
+            viejos = anterior['segmentos']
+            self._publicar([segmento if s is viejos[0] else s for s in self._indices.segmentos
+                            if not any(s is v for v in viejos[1:])])
+
+    def _extender(self, ruta_json, exportacion, firma):
+        agregados = _leer_agregados(ruta_json, exportacion)
+        if agregados is None:
+            return False
+        certificados, cierre = agregados
+        exportacion.update(firma=firma, **cierre)
+        if not certificados:
+            return True
+        # Los certificados añadidos van a un segmento en memoria nuevo, justo después de los de la
+        # exportación; pasadas MAX_COLAS ampliaciones las colas se unen en una sola
+        segmentos = list(self._indices.segmentos)
+        propios = exportacion['segmentos']
+        if len(propios) > MAX_COLAS:
+            colas = propios[1:]
+            cola = CertificateStore([certificado for c in colas for certificado in c] + certificados)
+            segmentos = [cola if s is colas[0] else s for s in segmentos if not any(s is c for c in colas[1:])]
+            propios[1:] = [cola]
+        else:
+            cola = CertificateStore(certificados)
+            segmentos.insert(next(i for i, s in enumerate(segmentos) if s is propios[-1]) + 1, cola)
+            propios.append(cola)
+        # Si no queda al final, los nuevos pueden quitarle CertNo a segmentos posteriores y se reconstruye
+        self._publicar(segmentos)
+        return True
+
+    def __iter__(self):
+        indices = self._indices
+        for segmento in indices.segmentos:
+            repetidos = indices.repetidos[segmento]
+            if repetidos:
+                yield from (certificado for certificado in segmento if certificado.cert_no not in repetidos)
+            else:
+                yield from segmento
+
+    def __len__(self):
+        indices = self._indices
+        return sum(len(segmento) - indices.omitidos[segmento] for segmento in indices.segmentos)
+
+    def cert_nos(self):
+        indices = self._indices
+        for segmento in indices.segmentos:
+            repetidos = indices.repetidos[segmento]
+            yield from (cert_no for cert_no in segmento.cert_nos() if cert_no not in repetidos)
+
+    def _segmento(self, cert_no):
+        segmento = self._indices.por_certno.get(cert_no)
+        if segmento is None:
+            raise ValueError(f"No se encontró el certificado {cert_no}")
+        return segmento
+
+    def certificado(self, cert_no):
+        return self._segmento(cert_no).certificado(cert_no)
+
+    def grupos(self, cert_no):
+        return self._segmento(cert_no).grupos(cert_no)
+
+    def datasheet(self, cert_no, grupo):
+        segmento = self._indices.por_grupo.get((cert_no, grupo))
+        if segmento is None:
+            raise ValueError(f"No se encontró el grupo {grupo} en el certificado {cert_no}")
+        return segmento.datasheet(cert_no, grupo)
+
+    def medicion(self, cert_no, grupo, unidad, nominal):
+        segmento = self._indices.por_grupo.get((cert_no, grupo))
+        return segmento.medicion(cert_no, grupo, unidad, nominal) if segmento is not None else None
+
+    def certificados_por_modelo(self, modelo):
+        indices = self._indices
+        return [c for segmento in indices.por_modelo.get(modelo, []) for c in segmento.certificados_por_modelo(modelo)
+                if c.cert_no not in indices.repetidos[segmento]]
+
+    def encabezados_por_modelo(self, modelo):
+        indices = self._indices
+        return [c for segmento in indices.por_modelo.get(modelo, []) for c in segmento.encabezados_por_modelo(modelo)
+                if c.cert_no not in indices.repetidos[segmento]]
+
+    def encabezado(self, cert_no):
+        return self._segmento(cert_no).encabezado(cert_no)
+
+    def filas_lote(self, cert_nos=None, grupo=None):
+        indices = self._indices
+        if cert_nos is None:
+            tablas = []
+            for segmento in indices.segmentos:
+                tabla = segmento.filas_lote(None, grupo)
+                repetidos = indices.repetidos[segmento]
+                tablas.append(tabla[~tabla['cert_no'].isin(repetidos)] if repetidos else tabla)
+        else:
+            # Certificados consecutivos del mismo segmento se piden juntos, conservando el orden
+            tablas, pendientes, actual = [], [], None
+            for cert_no in cert_nos:
+                segmento = indices.por_certno.get(cert_no)
+                if segmento is None:
+                    raise ValueError(f"No se encontró el certificado {cert_no}")
+                if segmento is not actual and pendientes:
+                    tablas.append(actual.filas_lote(pendientes, grupo))
+                    pendientes = []
+                actual = segmento
+                pendientes.append(cert_no)
+            if pendientes:
+                tablas.append(actual.filas_lote(pendientes, grupo))
+        return pd.concat(tablas, ignore_index=True) if tablas else pd.DataFrame(columns=COLUMNAS_LOTE)
+
+    @staticmethod
+    def _fichas_modelo(indices):
+        for segmento in indices.segmentos:
+            repetidos = indices.repetidos[segmento]
+            if repetidos:
+                yield from (ficha for cert_no, ficha in zip(segmento.cert_nos(), segmento.fichas_modelo()) if cert_no not in repetidos)
+            else:
+                yield from segmento.fichas_modelo()
+
+    def fichas_modelo(self):
+        return self._fichas_modelo(self._indices)
+
+    def buscador_modelos(self):
+        # Se construye en la primera búsqueda sobre cada versión de los índices
+        indices = self._indices
+        if indices.buscador is None:
+            indices.buscador = ModelSearchIndex(self._fichas_modelo(indices))
+        return indices.buscador
+
+    @staticmethod
+    def _estandares(indices):
+        for segmento in indices.segmentos:
+            repetidos = indices.repetidos[segmento]
+            yield from ((cert_no, standards) for cert_no, standards in segmento.estandares() if cert_no not in repetidos)
+
+    def estandares(self):
+        return self._estandares(self._indices)
+
+    def indice_estandares(self):
+        """StandardsIndex de los certificados del store. Se construye en la primera llamada y los
+        certificados que se añaden después al final (agregar, exportaciones que crecen) se
+        incorporan a una copia con StandardsIndex.agregar; sólo se reconstruye si cambian los
+        segmentos anteriores."""
+        indices = self._indices
+        if indices.estandares is None:
+            indices.estandares = StandardsIndex(self._estandares(indices))
+        return indices.estandares
+
+def cargar_exportaciones(rutas_json, store=None, cargador=None):
+    """Carga varias exportaciones como un único store. Si se pasa un store existente sólo
+    se procesan las exportaciones nuevas o modificadas; el resto conserva su caché e índices."""
+    store = store if store is not None else MergedCertificateStore(cargador=cargador)
+    for ruta_json in rutas_json:
+        store.cargar_exportacion(ruta_json)
+    return store
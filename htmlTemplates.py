@@ -5,14 +5,12 @@ def get_image_base64(image_path):
     with open(image_path, "rb") as image_file:
         return base64.b64encode(image_file.read()).decode()
 
-# Preparar la imagen de fondo en base64
-background_base64 = get_image_base64("images/background.png")
-
-CSS_STYLES = f"""
-<style>
+# Hoja de estilos de la aplicación. {background_url} se sustituye por la URL de la imagen de
+# fondo: el archivo estático con hash (ver staticAssets.py) o, como respaldo, un data-URI.
+CSS_BUNDLE = """
     /* Establecer la imagen de fondo para la página principal */
     body, .stApp {{
-        background-image: url("data:image/png;base64,{background_base64}");
+        background-image: url("{background_url}");
         background-size: cover;
         background-attachment: fixed;
     }}
@@ -31,9 +29,19 @@ CSS_STYLES = f"""
         text-align: center;
         font-size: 2rem; /* Ajusta el tamaño del texto según necesites */
     }}
-</style>
 """
 
+def css_styles(css_url=None, background_path="images/background.png"):
+    """Bloque <style> a insertar en la página.
+
+    Con css_url sólo se envía un @import de la hoja estática (unos cientos de bytes por
+    ejecución); sin ella se incrusta la hoja completa con la imagen en base64.
+    """
+    if css_url:
+        return f'<style>@import url("{css_url}");</style>'
+    background_url = f"data:image/png;base64,{get_image_base64(background_path)}"
+    return f"<style>{CSS_BUNDLE.format(background_url=background_url)}</style>"
+
 LOGO_TITLE_HTML = """
 <div class="logo-title-container">
     <h1 class="gradient-text">Scale and Balances</h1>
@@ -0,0 +1,174 @@
+# instrumentation.py
+import functools
+import os
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+# Desactivada por defecto; se activa con CALIBRATION_INSTRUMENTATION=1 antes de importar los módulos
+_activo = os.environ.get('CALIBRATION_INSTRUMENTATION', '').lower() in ('1', 'true', 'yes', 'on')
+
+# Límites superiores (segundos) de los cubos del histograma, de 1 μs a 10 s
+LIMITES = [m * 10.0 ** e for e in range(-6, 1) for m in (1, 2.5, 5)] + [10.0]
+
+class Histogram:
+    """Histograma de latencias con cubos fijos, en el formato acumulado de Prometheus."""
+
+    def __init__(self):
+        self.cubos = [0] * (len(LIMITES) + 1)
+        self.cantidad = 0
+        self.suma = 0.0
+        self._lock = threading.Lock()
+
+    def observar(self, segundos):
+        with self._lock:
+            self.cubos[bisect_left(LIMITES, segundos)] += 1
+            self.cantidad += 1
+            self.suma += segundos
+
+    def percentil(self, q):
+        """Percentil aproximado por interpolación lineal dentro del cubo."""
+        if not self.cantidad:
+            return 0.0
+        objetivo = q * self.cantidad
+        acumulado = 0
+        for i, n in enumerate(self.cubos):
+            if n and acumulado + n >= objetivo:
+                inferior = LIMITES[i - 1] if i > 0 else 0.0
+                superior = LIMITES[i] if i < len(LIMITES) else LIMITES[-1]
+                return inferior + (superior - inferior) * (objetivo - acumulado) / n
+            acumulado += n
+        return LIMITES[-1]
+
+_histogramas = {}
+_caches = {}
+_lock = threading.Lock()
+
+def activo():
+    return _activo
+
+def activar(valor=True):
+    """Activa o desactiva las mediciones de etapa() y observar().
+
+    Las funciones decoradas con medir() se fijan al importarse: sólo se miden si la
+    instrumentación ya estaba activa entonces (variable de entorno).
+    """
+    global _activo
+    _activo = bool(valor)
+
+def _histograma(etapa):
+    histograma = _histogramas.get(etapa)
+    if histograma is None:
+        with _lock:
+            histograma = _histogramas.setdefault(etapa, Histogram())
+    return histograma
+
+def observar(etapa, segundos):
+    if _activo:
+        _histograma(etapa).observar(segundos)
+
+def medir(etapa):
+    """Decorador que registra la latencia de cada llamada en el histograma de `etapa`.
+
+    Con la instrumentación desactivada al importar devuelve la función sin envolver, así que
+    las funciones de la ruta crítica no pagan ni una llamada extra.
+    """
+    def decorador(funcion):
+        if not _activo:
+            return funcion
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            inicio = perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                _histograma(etapa).observar(perf_counter() - inicio)
+        return envoltura
+    return decorador
+
+class _Etapa:
+    __slots__ = ('etapa', 'inicio')
+
+    def __init__(self, etapa):
+        self.etapa = etapa
+
+    def __enter__(self):
+        self.inicio = perf_counter()
+        return self
+
+    def __exit__(self, *excepcion):
+        _histograma(self.etapa).observar(perf_counter() - self.inicio)
+        return False
+
+class _SinMedicion:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+_SIN_MEDICION = _SinMedicion()
+
+def etapa(nombre):
+    """Contexto que mide un bloque de código (p. ej. una fase de renderizado de app.py)."""
+    return _Etapa(nombre) if _activo else _SIN_MEDICION
+
+def registrar_cache(nombre, contadores):
+    """Registra una caché cuyos aciertos y fallos se leen al exportar: contadores() -> (aciertos, fallos)."""
+    _caches[nombre] = contadores
+
+def reiniciar():
+    with _lock:
+        _histogramas.clear()
+
+def resumen():
+    """Lista de etapas con llamadas, tiempo total, media y percentiles aproximados (en segundos)."""
+    filas = []
+    for nombre, histograma in sorted(_histogramas.items()):
+        filas.append({
+            'stage': nombre,
+            'calls': histograma.cantidad,
+            'total_s': histograma.suma,
+            'mean_s': histograma.suma / histograma.cantidad if histograma.cantidad else 0.0,
+            'p50_s': histograma.percentil(0.5),
+            'p95_s': histograma.percentil(0.95),
+            'p99_s': histograma.percentil(0.99)
+        })
+    return filas
+
+def resumen_caches():
+    filas = []
+    for nombre, contadores in sorted(_caches.items()):
+        aciertos, fallos = contadores()
+        filas.append({'cache': nombre, 'hits': aciertos, 'misses': fallos,
+                      'hit_rate': aciertos / (aciertos + fallos) if aciertos + fallos else 0.0})
+    return filas
+
+def _etiqueta(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def exportar_prometheus(prefijo='calibration'):
+    """Métricas en el formato de texto de exposición de Prometheus."""
+    lineas = [
+        f"# HELP {prefijo}_stage_seconds Latencia por etapa instrumentada.",
+        f"# TYPE {prefijo}_stage_seconds histogram",
+    ]
+    for nombre, histograma in sorted(_histogramas.items()):
+        etiqueta = _etiqueta(nombre)
+        acumulado = 0
+        for limite, n in zip(LIMITES, histograma.cubos):
+            acumulado += n
+            lineas.append(f'{prefijo}_stage_seconds_bucket{{stage="{etiqueta}",le="{limite:g}"}} {acumulado}')
+        lineas.append(f'{prefijo}_stage_seconds_bucket{{stage="{etiqueta}",le="+Inf"}} {histograma.cantidad}')
+        lineas.append(f'{prefijo}_stage_seconds_sum{{stage="{etiqueta}"}} {histograma.suma!r}')
+        lineas.append(f'{prefijo}_stage_seconds_count{{stage="{etiqueta}"}} {histograma.cantidad}')
+    caches = resumen_caches()
+    for metrica, clave, ayuda in (('cache_hits_total', 'hits', 'Aciertos de caché.'), ('cache_misses_total', 'misses', 'Fallos de caché.')):
+        lineas.append(f"# HELP {prefijo}_{metrica} {ayuda}")
+        lineas.append(f"# TYPE {prefijo}_{metrica} counter")
+        for fila in caches:
+            lineas.append(f'{prefijo}_{metrica}{{cache="{_etiqueta(fila["cache"])}"}} {fila[clave]}')
+    return '\n'.join(lineas) + '\n'
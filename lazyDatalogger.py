@@ -0,0 +1,241 @@
+# lazyDatalogger.py
+import json
+import os
+import threading
+from collections import OrderedDict
+from itertools import islice
+
+import numpy as np
+
+from ScalesBalances import CertificateStore, _clave_nominal, _detectar_codificacion, iterar_json
+from certificateModel import Certificate
+from dataloggerCache import calcular_hash, firma_fuente
+from instrumentation import medir
+
+VERSION_INDICE = 3
+
+# Columnas del encabezado que el índice siempre tiene; además guarda cualquier otro campo del
+# encabezado (Standards, condiciones ambientales, OperatingRange...). Sólo el Datasheet se lee del JSON
+COLUMNAS_INDICE = ('CertNo', 'Model', 'Manufacturer', 'AssetDescription')
+
+def ruta_indice_por_defecto(ruta_json):
+    return os.path.splitext(ruta_json)[0] + '.dlindex'
+
+def indexar_json(ruta_json, fuente):
+    """Recorre el JSON una vez y devuelve el índice por columnas: rango de bytes, nombres de grupo
+    y una columna por campo del encabezado (todo salvo el Datasheet), con None donde falta; 'nulos'
+    lista los campos que sí venían, pero con valor null."""
+    campos = list(COLUMNAS_INDICE)
+    columnas = {'inicio': [], 'fin': [], 'grupos': [], 'nulos': [], **{campo: [] for campo in campos}}
+    for n, (certificado, inicio, fin) in enumerate(iterar_json(ruta_json, desplazamientos=True)):
+        columnas['inicio'].append(inicio)
+        columnas['fin'].append(fin)
+        columnas['grupos'].append([datasheet.get('Group') for datasheet in certificado.get('Datasheet', [])])
+        columnas['nulos'].append([campo for campo, valor in certificado.items() if valor is None])
+        for campo in certificado:
+            if campo != 'Datasheet' and campo not in columnas:
+                campos.append(campo)
+                columnas[campo] = [None] * n
+        for campo in campos:
+            columnas[campo].append(certificado.get(campo))
+    return {'version': VERSION_INDICE, 'fuente': fuente, 'codificacion': _detectar_codificacion(ruta_json),
+            'campos': campos, 'columnas': columnas}
+
+def _escribir_indice(indice, ruta_indice):
+    temporal = f"{ruta_indice}.tmp{os.getpid()}"
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump(indice, archivo, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temporal, ruta_indice)
+
+def _leer_indice(ruta_indice):
+    try:
+        with open(ruta_indice, encoding='utf-8') as archivo:
+            indice = json.load(archivo)
+    except (OSError, ValueError):
+        return None
+    return indice if isinstance(indice, dict) and indice.get('version') == VERSION_INDICE else None
+
+class LazyCertificateStore(CertificateStore):
+    """CertificateStore que sólo mantiene en memoria el índice de encabezados del datalogger.
+
+    Los encabezados (todo salvo el Datasheet) y los nombres de grupo vienen del índice
+    (*.dlindex), así que encabezado(), encabezados_por_modelo() y estandares() no leen el JSON.
+    El certificado completo se lee de su rango de bytes en el JSON de origen la primera vez
+    que se pide y se guarda en una caché LRU de `capacidad` certificados.
+    """
+
+    def __init__(self, ruta_json, indice, ruta_indice=None, capacidad=256):
+        columnas = indice['columnas']
+        self.ruta = ruta_json
+        self.ruta_indice = ruta_indice
+        self.codificacion = indice['codificacion']
+        self.fuente = indice['fuente']
+        self.capacidad = capacidad
+        self.campos = indice['campos']
+        self.columnas = {campo: columnas[campo] for campo in self.campos}
+        self.nombres_grupo = columnas['grupos']
+        self.nulos = columnas['nulos']
+        self.desplazamientos = np.column_stack([np.asarray(columnas['inicio'], dtype=np.int64),
+                                                np.asarray(columnas['fin'], dtype=np.int64)])
+        self.por_certno = {}
+        self.por_modelo = {}
+        self.por_grupo = {}
+        self.por_medicion = {}
+        for i, (cert_no, modelo, grupos) in enumerate(zip(self.columnas['CertNo'], self.columnas['Model'], self.nombres_grupo)):
+            self.por_certno.setdefault(cert_no, i)
+            self.por_modelo.setdefault(modelo, []).append(i)
+            for grupo in grupos:
+                self.por_grupo.setdefault((cert_no, grupo), i)
+        self.aciertos = 0
+        self.fallos = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def agregar(self, certificado):
+        raise TypeError("El store perezoso es de solo lectura; vuelva a cargar el JSON")
+
+    @property
+    def certificados(self):
+        return self
+
+    def __iter__(self):
+        # Recorrido secuencial del JSON sin pasar por la caché, sólo de los certificados indexados
+        return (Certificate.desde_dict(certificado) for certificado in islice(iterar_json(self.ruta), len(self)))
+
+    def __len__(self):
+        return len(self.desplazamientos)
+
+    def cert_nos(self):
+        return iter(self.columnas['CertNo'])
+
+    def _leer(self, i):
+        inicio, fin = (int(valor) for valor in self.desplazamientos[i])
+        with open(self.ruta, 'rb') as archivo:
+            archivo.seek(inicio)
+            datos = archivo.read(fin - inicio)
+        try:
+            certificado = json.loads(datos.decode(self.codificacion))
+        except ValueError:
+            certificado = None
+        if not isinstance(certificado, dict) or certificado.get('CertNo') != self.columnas['CertNo'][i]:
+            raise ValueError(f"El archivo {self.ruta} cambió desde que se indexó; vuelva a cargarlo")
+        return Certificate.desde_dict(certificado)
+
+    def _certificado(self, i):
+        """Certificado i, desde la caché o leído del JSON."""
+        with self._lock:
+            certificado = self._cache.get(i)
+            if certificado is not None:
+                self._cache.move_to_end(i)
+                self.aciertos += 1
+                return certificado
+            self.fallos += 1
+        # La lectura se hace fuera del lock; si dos sesiones piden el mismo certificado gana la última
+        certificado = self._leer(i)
+        with self._lock:
+            self._cache[i] = certificado
+            while len(self._cache) > self.capacidad:
+                self._cache.popitem(last=False)
+        return certificado
+
+    def _indice(self, cert_no):
+        try:
+            return self.por_certno[cert_no]
+        except KeyError:
+            raise ValueError(f"No se encontró el certificado {cert_no}")
+
+    def certificado(self, cert_no):
+        return self._certificado(self._indice(cert_no))
+
+    def grupos(self, cert_no):
+        return list(dict.fromkeys(self.nombres_grupo[self._indice(cert_no)]))
+
+    def datasheet(self, cert_no, grupo):
+        i = self.por_grupo.get((cert_no, grupo))
+        if i is None:
+            raise ValueError(f"No se encontró el grupo {grupo} en el certificado {cert_no}")
+        return next(datasheet for datasheet in self._certificado(i).datasheet if datasheet.group == grupo)
+
+    def medicion(self, cert_no, grupo, unidad, nominal):
+        i = self.por_grupo.get((cert_no, grupo))
+        if i is None:
+            return None
+        clave = _clave_nominal(nominal)
+        for datasheet in self._certificado(i).datasheet:
+            if datasheet.group != grupo:
+                continue
+            for measurement in datasheet.measurements:
+                if measurement.units == unidad and not np.isnan(measurement.nominal) and _clave_nominal(measurement.nominal) == clave:
+                    return measurement
+        return None
+
+    def certificados_por_modelo(self, modelo):
+        return [self._certificado(i) for i in self.por_modelo.get(modelo, [])]
+
+    def _encabezado(self, i):
+        # Los campos que faltaban en el JSON (None en su columna y no en 'nulos') se omiten
+        nulos = self.nulos[i]
+        encabezado = {campo: valor for campo in self.campos if (valor := self.columnas[campo][i]) is not None or campo in nulos}
+        return Certificate.desde_dict({**encabezado, 'Datasheet': []})
+
+    def encabezado(self, cert_no):
+        return self._encabezado(self._indice(cert_no))
+
+    def encabezados_por_modelo(self, modelo):
+        return [self._encabezado(i) for i in self.por_modelo.get(modelo, [])]
+
+    def fichas_modelo(self):
+        return zip(*(self.columnas[campo] for campo in ('Model', 'Manufacturer', 'AssetDescription')))
+
+    def estandares(self):
+        columna = self.columnas.get('Standards') or [None] * len(self)
+        return zip(self.columnas['CertNo'], (standards or [] for standards in columna))
+
+    def metricas(self):
+        total = self.aciertos + self.fallos
+        return {
+            'hits': self.aciertos,
+            'misses': self.fallos,
+            'hit_rate': self.aciertos / total if total else 0.0,
+            'size': len(self._cache),
+            'capacity': self.capacidad,
+        }
+
+@medir('cargar_datalogger_perezoso')
+def cargar_datalogger_perezoso(ruta_json, ruta_indice=None, capacidad=256):
+    """Store perezoso del datalogger: sólo carga el índice de encabezados (*.dlindex).
+
+    El índice se regenera cuando cambia el JSON, con el mismo criterio que la caché
+    columnar (mtime y tamaño o, si cambió el mtime, hash SHA-256). Si no se puede escribir
+    se usa el índice en memoria.
+    """
+    ruta_indice = ruta_indice or ruta_indice_por_defecto(ruta_json)
+    firma = firma_fuente(ruta_json, con_hash=False)
+    indice = _leer_indice(ruta_indice)
+    if indice is not None:
+        fuente = indice['fuente']
+        if (fuente['mtime_ns'], fuente['size']) == (firma['mtime_ns'], firma['size']):
+            return LazyCertificateStore(ruta_json, indice, ruta_indice, capacidad=capacidad)
+        if fuente['size'] == firma['size'] and fuente['sha256'] == calcular_hash(ruta_json):
+            # Mismo contenido con otro mtime: se guarda el nuevo para no volver a calcular el hash
+            firma['sha256'] = fuente['sha256']
+            indice['fuente'] = firma
+            try:
+                _escribir_indice(indice, ruta_indice)
+            except OSError:
+                pass
+            return LazyCertificateStore(ruta_json, indice, ruta_indice, capacidad=capacidad)
+
+    firma['sha256'] = calcular_hash(ruta_json)
+    indice = indexar_json(ruta_json, firma)
+    try:
+        _escribir_indice(indice, ruta_indice)
+    except OSError:
+        return LazyCertificateStore(ruta_json, indice, capacidad=capacidad)
+    return LazyCertificateStore(ruta_json, indice, ruta_indice, capacidad=capacidad)
+
+def aciertos_y_fallos(store):
+    """(aciertos, fallos) sumados de los segmentos perezosos de un MergedCertificateStore,
+    para instrumentation.registrar_cache."""
+    perezosos = [segmento for segmento in store.segmentos if isinstance(segmento, LazyCertificateStore)]
+    return sum(s.aciertos for s in perezosos), sum(s.fallos for s in perezosos)
@@ -0,0 +1,235 @@
+# modelSearch.py
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+import numpy as np
+
+from instrumentation import medir
+
+# Orden de los resultados: primero coincidencias exactas, luego prefijos, subcadenas y aproximadas
+EXACTO, PREFIJO_MODELO, PREFIJO_PALABRA, SUBCADENA, APROXIMADO = range(5)
+TIPOS = ('exact', 'model_prefix', 'word_prefix', 'substring', 'fuzzy')
+
+_SEPARADORES = re.compile(r'[^0-9a-z]+')
+
+def normalizar(texto):
+    """Minúsculas, sin acentos y con espacios simples, para comparar textos de búsqueda."""
+    texto = unicodedata.normalize('NFKD', str(texto or '').casefold())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r'\s+', ' ', texto).strip()
+
+def _gramas(texto, n):
+    return {texto[i:i + n] for i in range(len(texto) - n + 1)}
+
+def _trigramas_difusos(texto):
+    # Con relleno para que los extremos de cada palabra también cuenten
+    return _gramas(f"  {texto} ", 3)
+
+def _subgramas(texto):
+    # Todos los n-gramas de 1 a 3 caracteres, para las subcadenas
+    return {texto[i:i + n] for n in (1, 2, 3) for i in range(len(texto) - n + 1)}
+
+def _listas(postings):
+    return {clave: np.array(ids, dtype=np.int32) for clave, ids in postings.items()}
+
+def _postings(textos, gramas_de):
+    # grama -> identificadores (en orden) de los textos que lo contienen
+    postings = defaultdict(list)
+    for i, texto in enumerate(textos):
+        for grama in gramas_de(texto):
+            postings[grama].append(i)
+    return _listas(postings)
+
+class ModelSearchIndex:
+    """Índice de búsqueda de modelos por modelo, fabricante y descripción.
+
+    Los modelos distintos reciben identificadores en orden alfabético, así que cualquier
+    lista de identificadores ordenada ya está ordenada por nombre. Usa:
+    - la lista ordenada de modelos normalizados para prefijos del modelo (bisección),
+    - listas ordenadas de palabras para prefijos de palabra,
+    - un índice de n-gramas (1 a 3 caracteres) del modelo para subcadenas,
+    - trigramas del modelo para coincidencias aproximadas (errores de tipeo).
+    Fabricantes y descripciones se repiten mucho, así que se indexan sus textos distintos
+    y cada uno apunta a los modelos que lo usan. Esos textos tienen su propio índice de
+    n-gramas y sus palabras sus propios trigramas, de modo que 'toledo' y 'mettlr'
+    encuentran los modelos de Mettler Toledo.
+    """
+
+    def __init__(self, fichas=()):
+        auxiliares = {}
+        for modelo, fabricante, descripcion in fichas:
+            textos = auxiliares.setdefault(modelo, set())
+            for texto in (fabricante, descripcion):
+                if texto:
+                    textos.add(normalizar(texto))
+
+        self.modelos = sorted(auxiliares, key=lambda modelo: (normalizar(modelo), str(modelo)))
+        self.normalizados = [normalizar(modelo) for modelo in self.modelos]
+
+        por_texto = {}
+        for i, modelo in enumerate(self.modelos):
+            for texto in auxiliares[modelo]:
+                por_texto.setdefault(texto, []).append(i)
+        self.textos_auxiliares = sorted(por_texto)
+        self.modelos_por_texto = [np.array(por_texto[texto], dtype=np.int32) for texto in self.textos_auxiliares]
+
+        self.palabras = sorted({(palabra, i) for i, texto in enumerate(self.normalizados)
+                                for palabra in _SEPARADORES.split(texto) if palabra})
+        self.palabras_auxiliares = sorted({(palabra, j) for j, texto in enumerate(self.textos_auxiliares)
+                                           for palabra in _SEPARADORES.split(texto) if palabra})
+        self.gramas = _postings(self.normalizados, _subgramas)
+        self.difusos = _postings(self.normalizados, _trigramas_difusos)
+        self.n_difusos = np.array([len(_trigramas_difusos(texto)) for texto in self.normalizados], dtype=np.int32)
+
+        # Fabricantes y descripciones: n-gramas de sus textos para las subcadenas y trigramas
+        # de sus palabras distintas para la búsqueda aproximada
+        self.gramas_auxiliares = _postings(self.textos_auxiliares, _subgramas)
+        textos_por_palabra = defaultdict(list)
+        for palabra, j in self.palabras_auxiliares:
+            textos_por_palabra[palabra].append(j)
+        self.palabras_difusas = list(textos_por_palabra)
+        self.modelos_por_palabra = [self.modelos_por_texto[textos[0]] if len(textos) == 1 else
+                                    np.unique(np.concatenate([self.modelos_por_texto[j] for j in textos]))
+                                    for textos in textos_por_palabra.values()]
+        self.difusos_auxiliares = _postings(self.palabras_difusas, _trigramas_difusos)
+        self.n_difusos_auxiliares = np.array([len(_trigramas_difusos(palabra)) for palabra in self.palabras_difusas], dtype=np.int32)
+
+    def __len__(self):
+        return len(self.modelos)
+
+    @staticmethod
+    def _prefijo(claves, consulta):
+        # Identificadores de las claves (palabra, id) cuya palabra empieza por la consulta
+        i = bisect_left(claves, (consulta,))
+        while i < len(claves) and claves[i][0].startswith(consulta):
+            yield claves[i][1]
+            i += 1
+
+    def _prefijo_modelo(self, consulta):
+        i = bisect_left(self.normalizados, consulta)
+        while i < len(self.normalizados) and self.normalizados[i].startswith(consulta):
+            yield i
+            i += 1
+
+    def _exactos(self, consulta):
+        i = bisect_left(self.normalizados, consulta)
+        while i < len(self.normalizados) and self.normalizados[i] == consulta:
+            yield i
+            i += 1
+
+    def _prefijo_palabra(self, consulta):
+        yield from self._prefijo(self.palabras, consulta)
+        for j in self._prefijo(self.palabras_auxiliares, consulta):
+            yield from self.modelos_por_texto[j]
+
+    @staticmethod
+    def _candidatos(gramas, consulta):
+        # Ids cuyos textos contienen todos los trigramas de la consulta, en orden
+        if len(consulta) <= 3:
+            # El n-grama es la propia consulta: la lista ya es exacta
+            return gramas.get(consulta, ())
+        listas = sorted((gramas.get(grama) for grama in _gramas(consulta, 3)),
+                        key=lambda ids: -1 if ids is None else len(ids))
+        candidatos = () if listas[0] is None else listas[0]
+        for ids in listas[1:]:
+            if not len(candidatos):
+                break
+            candidatos = np.intersect1d(candidatos, ids, assume_unique=True)
+        return candidatos
+
+    def _subcadena(self, consulta):
+        for i in self._candidatos(self.gramas, consulta):
+            if consulta in self.normalizados[i]:
+                yield i
+        for j in self._candidatos(self.gramas_auxiliares, consulta):
+            if consulta in self.textos_auxiliares[j]:
+                yield from self.modelos_por_texto[j]
+
+    @staticmethod
+    def _dice(difusos, n_difusos, trigramas, umbral=0.0):
+        # (ids en orden, coeficiente de Dice) de los textos que comparten algún trigrama con la
+        # consulta y llegan al umbral; sólo se calcula para ellos, no para todo el índice
+        listas = [difusos[grama] for grama in trigramas if grama in difusos]
+        if not listas:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        compartidos = np.bincount(np.concatenate(listas), minlength=len(n_difusos))
+        # Un texto tiene al menos tantos trigramas como comparte, así que 2c / (q + n) >= umbral
+        # exige c >= umbral * q / (2 - umbral)
+        ids = np.flatnonzero(compartidos >= max(umbral * len(trigramas) / (2 - umbral), 1))
+        similitud = 2 * compartidos[ids] / (len(trigramas) + n_difusos[ids])
+        mascara = similitud >= umbral
+        return ids[mascara], similitud[mascara]
+
+    def _aproximado(self, consulta, umbral, cuantos=None):
+        """Hasta `cuantos` pares (similitud, id) con similitud de trigramas >= umbral, de mayor a menor.
+
+        La similitud de un modelo es la mayor entre la de su nombre y la de las palabras de
+        su fabricante y su descripción. Los empates se resuelven por nombre (id).
+        """
+        trigramas = _trigramas_difusos(consulta)
+        nombres, similitud = self._dice(self.difusos, self.n_difusos, trigramas, umbral)
+        palabras, auxiliar = self._dice(self.difusos_auxiliares, self.n_difusos_auxiliares, trigramas, umbral)
+        # Todos los modelos de una palabra tienen al menos su similitud, así que si uno queda entre
+        # los `cuantos` mejores también quedan los de id menor: bastan los primeros `cuantos` de cada una
+        listas = [self.modelos_por_palabra[p][:cuantos] for p in palabras]
+        if not listas:
+            candidatos, puntajes = nombres, similitud
+        else:
+            candidatos = np.unique(np.concatenate([nombres, *listas]))
+            puntajes = np.zeros(len(candidatos))
+            puntajes[np.searchsorted(candidatos, nombres)] = similitud
+            for p, valor in zip(palabras, auxiliar):
+                ids = self.modelos_por_palabra[p]
+                en_palabra = ids[np.minimum(np.searchsorted(ids, candidatos), len(ids) - 1)] == candidatos
+                puntajes[en_palabra] = np.maximum(puntajes[en_palabra], valor)
+        if cuantos is not None and len(candidatos) > cuantos:
+            # Sólo se ordenan los mejores; en el corte entran los empatados de menor id
+            corte = np.partition(puntajes, len(puntajes) - cuantos)[len(puntajes) - cuantos]
+            mayores = np.flatnonzero(puntajes > corte)
+            empatados = np.flatnonzero(puntajes == corte)[:cuantos - len(mayores)]
+            seleccion = np.concatenate((mayores, empatados))
+            candidatos, puntajes = candidatos[seleccion], puntajes[seleccion]
+        orden = np.lexsort((candidatos, -puntajes))
+        return list(zip(puntajes[orden].tolist(), candidatos[orden].tolist()))
+
+    @medir('ModelSearchIndex.buscar')
+    def buscar_con_puntaje(self, consulta, limite=50, modo='todo', umbral=0.4):
+        """Devuelve [(modelo, tipo_de_coincidencia, puntaje)] ordenados por relevancia.
+
+        modo 'prefijo' sólo busca modelos que empiezan por la consulta; 'subcadena' añade
+        prefijos de palabra y subcadenas; 'todo' añade coincidencias aproximadas cuando las
+        anteriores no llenan el límite. Salvo los prefijos del modelo, todas incluyen el
+        fabricante y la descripción.
+        limite=None devuelve todas las coincidencias.
+        """
+        consulta = normalizar(consulta)
+        resultados, vistos = [], set()
+
+        def agregar(ids, tipo, puntaje=1.0):
+            # True cuando ya se llenó el límite
+            for i in ids:
+                if limite is not None and len(resultados) >= limite:
+                    return True
+                i = int(i)
+                if i not in vistos:
+                    vistos.add(i)
+                    resultados.append((self.modelos[i], tipo, puntaje))
+            return limite is not None and len(resultados) >= limite
+
+        if not consulta:
+            agregar(range(len(self.modelos)), PREFIJO_MODELO)
+            return resultados
+        if agregar(self._exactos(consulta), EXACTO) or agregar(self._prefijo_modelo(consulta), PREFIJO_MODELO) or modo == 'prefijo':
+            return resultados
+        if agregar(self._prefijo_palabra(consulta), PREFIJO_PALABRA) or agregar(self._subcadena(consulta), SUBCADENA) or modo == 'subcadena':
+            return resultados
+        # Se piden `limite` candidatos porque los ya vistos pueden estar entre los mejores
+        for puntaje, i in self._aproximado(consulta, umbral, limite):
+            if agregar([i], APROXIMADO, puntaje):
+                break
+        return resultados
+
+    def buscar(self, consulta, limite=50, modo='todo'):
+        return [modelo for modelo, _, _ in self.buscar_con_puntaje(consulta, limite, modo)]
@@ -0,0 +1,171 @@
+# monteCarlo.py
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import NamedTuple
+
+import numpy as np
+
+from ScalesBalances import _clave_nominal, procesar_lote
+from instrumentation import medir
+
+# Número de ensayos recomendado por el GUM Suplemento 1 para un intervalo del 95 %
+ENSAYOS_POR_DEFECTO = 10 ** 6
+PROBABILIDAD_POR_DEFECTO = 0.95
+# CMC y MeasUncert son incertidumbres expandidas con k = 2; se muestrean sus incertidumbres típicas
+FACTOR_COBERTURA_POR_DEFECTO = 2.0
+# Distribución de la componente CMC; las rectangulares conservan la misma desviación típica
+DISTRIBUCIONES = ('normal', 'rectangular')
+# Valores por arreglo de muestras (16 MB en float64): acota la memoria de cada bloque de filas
+MUESTRAS_POR_BLOQUE = 1 << 21
+# Total de muestras a partir del cual se reparte la simulación entre procesos
+UMBRAL_PROCESOS = 1 << 25
+
+COLUMNAS_MONTECARLO = ['mc_uncertainty', 'mc_interval_low', 'mc_interval_high', 'mc_coverage_factor']
+
+class ResultadoMonteCarlo(NamedTuple):
+    """Resultados por fila del error de medición simulado, en la unidad de las entradas."""
+    media: np.ndarray
+    incertidumbre: np.ndarray
+    inferior: np.ndarray
+    superior: np.ndarray
+
+def _muestras(generador, incertidumbre, distribucion, forma):
+    if distribucion == 'normal':
+        return generador.standard_normal(forma) * incertidumbre[:, None]
+    # Rectangular con semiamplitud u·√3, de desviación típica u
+    return generador.uniform(-1.0, 1.0, forma) * (incertidumbre * math.sqrt(3))[:, None]
+
+# Ejecutores de procesos por número de procesos, creados la primera vez y reutilizados. Se usa
+# forkserver (o spawn) porque hacer fork de un proceso con hilos, como el servidor o la app, puede
+# dejar bloqueados a los hijos con locks tomados por otros hilos
+_ejecutores = {}
+_lock_ejecutores = threading.Lock()
+
+def _ejecutor(procesos):
+    with _lock_ejecutores:
+        ejecutor = _ejecutores.get(procesos)
+        if ejecutor is None:
+            metodos = multiprocessing.get_all_start_methods()
+            contexto = multiprocessing.get_context('forkserver' if 'forkserver' in metodos else 'spawn')
+            ejecutor = _ejecutores[procesos] = ProcessPoolExecutor(procesos, mp_context=contexto)
+        return ejecutor
+
+def _simular_en_procesos(tareas, procesos):
+    ejecutor = _ejecutor(procesos)
+    try:
+        return list(ejecutor.map(_simular_bloque, tareas))
+    except BrokenProcessPool:
+        # Un proceso murió (p. ej. por falta de memoria): la próxima simulación crea otro ejecutor
+        with _lock_ejecutores:
+            if _ejecutores.get(procesos) is ejecutor:
+                del _ejecutores[procesos]
+        raise
+
+def _simular_bloque(argumentos):
+    """Simula un bloque de filas: (media, desviación típica, límites del intervalo) de cada una."""
+    cmc_total, meas_uncert, ensayos, probabilidad, distribucion_cmc, semilla = argumentos
+    generador = np.random.default_rng(semilla)
+    forma = (len(cmc_total), ensayos)
+    # Modelo: error = error del CMC + error de la medición, independientes y de media cero
+    errores = _muestras(generador, cmc_total, distribucion_cmc, forma)
+    errores += _muestras(generador, meas_uncert, 'normal', forma)
+    alfa = (1 - probabilidad) / 2
+    # Intervalo probabilísticamente simétrico (GUM S1, 7.7)
+    inferior, superior = np.quantile(errores, [alfa, 1 - alfa], axis=1)
+    return errores.mean(axis=1), errores.std(axis=1, ddof=1), inferior, superior
+
+@medir('simular_incertidumbre')
+def simular_incertidumbre(cmc_total, meas_uncert, ensayos=ENSAYOS_POR_DEFECTO, probabilidad=PROBABILIDAD_POR_DEFECTO,
+                          semilla=None, distribucion_cmc='normal', procesos=None, factor_cobertura=FACTOR_COBERTURA_POR_DEFECTO):
+    """Propaga las distribuciones del CMC y de la incertidumbre de medición por Monte Carlo (GUM S1).
+
+    cmc_total y meas_uncert son arreglos (una fila por medición) en una misma unidad, con
+    incertidumbres expandidas: se dividen entre factor_cobertura para obtener las típicas que
+    se muestrean. Las filas con NaN quedan en NaN. Las filas se simulan por bloques de a lo sumo MUESTRAS_POR_BLOQUE
+    muestras, cada uno con su propia semilla derivada de `semilla`, así que el resultado no
+    depende del número de procesos. procesos=None usa uno por CPU sólo a partir de
+    UMBRAL_PROCESOS muestras; los procesos se reutilizan entre llamadas.
+    """
+    if distribucion_cmc not in DISTRIBUCIONES:
+        raise ValueError(f"Distribución no soportada: {distribucion_cmc}")
+    if not 0 < probabilidad < 1:
+        raise ValueError(f"La probabilidad de cobertura debe estar entre 0 y 1: {probabilidad}")
+    if ensayos < 2:
+        raise ValueError(f"Se necesitan al menos 2 ensayos: {ensayos}")
+    if not factor_cobertura > 0:
+        raise ValueError(f"El factor de cobertura debe ser positivo: {factor_cobertura}")
+    cmc_total = np.atleast_1d(np.asarray(cmc_total, dtype=float))
+    meas_uncert = np.atleast_1d(np.asarray(meas_uncert, dtype=float))
+    resultado = ResultadoMonteCarlo(*(np.full(len(cmc_total), np.nan) for _ in range(4)))
+    filas = np.flatnonzero(np.isfinite(cmc_total) & np.isfinite(meas_uncert))
+    if len(filas) == 0:
+        return resultado
+
+    filas_por_bloque = max(1, MUESTRAS_POR_BLOQUE // ensayos)
+    bloques = [filas[inicio:inicio + filas_por_bloque] for inicio in range(0, len(filas), filas_por_bloque)]
+    semillas = np.random.SeedSequence(semilla).spawn(len(bloques))
+    tareas = [(np.abs(cmc_total[bloque]) / factor_cobertura, np.abs(meas_uncert[bloque]) / factor_cobertura,
+               ensayos, probabilidad, distribucion_cmc, s)
+              for bloque, s in zip(bloques, semillas)]
+
+    if procesos is None:
+        procesos = os.cpu_count() if len(filas) * ensayos >= UMBRAL_PROCESOS else 1
+    procesos = min(procesos, len(tareas))
+    if procesos <= 1:
+        parciales = map(_simular_bloque, tareas)
+    else:
+        parciales = _simular_en_procesos(tareas, procesos)
+    for bloque, parcial in zip(bloques, parciales):
+        for columna, valores in zip(resultado, parcial):
+            columna[bloque] = valores
+    return resultado
+
+@medir('procesar_lote_montecarlo')
+def procesar_lote_montecarlo(labrowe_datalogger_data, certificado_balance_data, thermodynamics_data, certificado_objetivo=None,
+                             grupo_objetivo=None, ensayos=ENSAYOS_POR_DEFECTO, probabilidad=PROBABILIDAD_POR_DEFECTO,
+                             semilla=None, distribucion_cmc='normal', procesos=None,
+                             factor_cobertura=FACTOR_COBERTURA_POR_DEFECTO):
+    """procesar_lote con las columnas COLUMNAS_MONTECARLO añadidas.
+
+    mc_uncertainty es la desviación típica de las muestras, mc_interval_low y mc_interval_high
+    los límites del intervalo de cobertura alrededor del nominal y mc_coverage_factor la
+    semiamplitud del intervalo dividida por mc_uncertainty, todo en las unidades de cada
+    medición. Las filas sin rango CMC quedan en NaN. factor_cobertura es el k con el que se
+    expresan el CMC y MeasUncert.
+    """
+    tabla = procesar_lote(labrowe_datalogger_data, certificado_balance_data, thermodynamics_data, certificado_objetivo, grupo_objetivo)
+    # El modelo es lineal, así que se simula directamente en la unidad de cada medición
+    resultado = simular_incertidumbre(tabla['cmc_total'].to_numpy(dtype=float), tabla['meas_uncert'].to_numpy(dtype=float),
+                                      ensayos, probabilidad, semilla, distribucion_cmc, procesos, factor_cobertura)
+    nominal = tabla['nominal'].to_numpy(dtype=float)
+    tabla['mc_uncertainty'] = resultado.incertidumbre
+    tabla['mc_interval_low'] = nominal + resultado.inferior
+    tabla['mc_interval_high'] = nominal + resultado.superior
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tabla['mc_coverage_factor'] = (resultado.superior - resultado.inferior) / (2 * resultado.incertidumbre)
+    return tabla
+
+def procesar_lote_montecarlo_cacheado(cache, version, labrowe_datalogger_data, certificado_balance_data, thermodynamics_data,
+                                      certificado_objetivo, grupo_objetivo=None, ensayos=ENSAYOS_POR_DEFECTO,
+                                      probabilidad=PROBABILIDAD_POR_DEFECTO, semilla=0, distribucion_cmc='normal', procesos=None,
+                                      factor_cobertura=FACTOR_COBERTURA_POR_DEFECTO):
+    """procesar_lote_montecarlo de un certificado (o un grupo) memorizado en un ResultCache.
+
+    Sólo se memorizan las simulaciones con semilla fija, que son reproducibles.
+    """
+    clave = None
+    if semilla is not None:
+        clave = ('montecarlo', certificado_objetivo, grupo_objetivo, int(ensayos), _clave_nominal(probabilidad), semilla, distribucion_cmc,
+                 _clave_nominal(factor_cobertura))
+    resultado = cache.obtener(version, clave) if clave is not None else None
+    if resultado is None:
+        resultado = {'tabla': procesar_lote_montecarlo(labrowe_datalogger_data, certificado_balance_data, thermodynamics_data,
+                                                       certificado_objetivo, grupo_objetivo, ensayos, probabilidad, semilla,
+                                                       distribucion_cmc, procesos, factor_cobertura)}
+        if clave is not None:
+            cache.guardar(version, clave, resultado)
+    return resultado['tabla'].copy()
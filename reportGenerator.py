@@ -0,0 +1,218 @@
+# reportGenerator.py
+import argparse
+import gc
+import html
+import multiprocessing
+import os
+import sys
+import time
+from datetime import date
+
+import pandas as pd
+
+from ScalesBalances import cargar_json, procesar_lote, RangeIndex
+from dataloggerCache import cargar_exportaciones, rutas_exportaciones
+from standardsIndex import estado_vencimiento
+
+# Columnas de encabezado (lo que muestra display_certificate_info) antepuestas a las de procesar_lote
+COLUMNAS_CERTIFICADO = ['equipment_type', 'asset_description', 'manufacturer', 'model', 'operating_range',
+                        'standards_due_date', 'standards_status']
+COLUMNAS_TEXTO = {'cert_no', 'group', 'units', 'meas_parameter', 'tur', 'cmc_used', *COLUMNAS_CERTIFICADO}
+COLUMNAS_ENTERAS = {'row_id', 'cmc_id'}
+
+# Datos cargados una sola vez por proceso. Con fork los hijos heredan los del proceso padre
+# (páginas compartidas y la caché mapeada del datalogger), así que sólo viajan los CertNo
+_DATOS = None
+
+def cargar_datos(ruta_doc='doc'):
+    # Las mismas exportaciones del datalogger que la app y la API (ver rutas_exportaciones)
+    return {
+        'labrowe_datalogger': cargar_exportaciones(rutas_exportaciones(ruta_doc)),
+        'certificado_balance': RangeIndex(cargar_json(os.path.join(ruta_doc, 'Balances&Scales.json'))),
+        'thermodynamics': RangeIndex(cargar_json(os.path.join(ruta_doc, 'Thermodynamics.json')))
+    }
+
+def _inicializar(ruta_doc):
+    global _DATOS
+    if _DATOS is None:
+        _DATOS = cargar_datos(ruta_doc)
+
+def _encabezado(certificado, hoy):
+    # El patrón que vence antes determina el estado del certificado
+    fechas = [standard for standard in certificado.standards if standard.due_date is not None]
+    proximo = min(fechas, key=lambda standard: standard.due_date) if fechas else None
+    estado, detalle = estado_vencimiento(proximo.due_date if proximo else None, hoy)
+    return {
+        'equipment_type': certificado.equipment_type,
+        'asset_description': certificado.asset_description,
+        'manufacturer': certificado.manufacturer,
+        'model': certificado.model,
+        'operating_range': certificado.operating_range,
+        'standards_due_date': proximo.due_date_texto if proximo else None,
+        'standards_status': f"{estado} ({detalle})"
+    }
+
+def procesar_bloque(cert_nos, hoy=None):
+    """Tabla de informe (encabezado + incertidumbre/TUR por medición) de un bloque de certificados."""
+    hoy = hoy or date.today()
+    store = _DATOS['labrowe_datalogger']
+    tabla = procesar_lote(store, _DATOS['certificado_balance'], _DATOS['thermodynamics'], list(cert_nos))
+    encabezados = pd.DataFrame.from_dict(
+        {cert_no: _encabezado(store.encabezado(cert_no), hoy) for cert_no in dict.fromkeys(cert_nos)},
+        orient='index', columns=COLUMNAS_CERTIFICADO)
+    tabla = tabla.join(encabezados, on='cert_no')
+    return tabla[['cert_no', *COLUMNAS_CERTIFICADO, *tabla.columns[1:-len(COLUMNAS_CERTIFICADO)]]]
+
+def _tarea(argumentos):
+    cert_nos, hoy = argumentos
+    return len(cert_nos), procesar_bloque(cert_nos, hoy)
+
+class _SalidaCSV:
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self.primero = True
+
+    def escribir(self, tabla):
+        tabla.to_csv(self.archivo, header=self.primero, index=False)
+        self.primero = False
+
+    def cerrar(self):
+        pass
+
+class _SalidaParquet:
+    def __init__(self, archivo):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.escritor = None
+        self.esquema = None
+        self.pq = pq
+        self.archivo = archivo
+
+    def escribir(self, tabla):
+        pa = self.pa
+        if self.esquema is None:
+            # Esquema fijo: un bloque con todas las celdas vacías no debe cambiar los tipos
+            self.esquema = pa.schema([
+                (columna, pa.string() if columna in COLUMNAS_TEXTO else pa.int64() if columna in COLUMNAS_ENTERAS else pa.float64())
+                for columna in tabla.columns
+            ])
+            self.escritor = self.pq.ParquetWriter(self.archivo, self.esquema)
+        texto = [columna for columna in tabla.columns if columna in COLUMNAS_TEXTO]
+        tabla = tabla.astype({columna: object for columna in texto})
+        self.escritor.write_table(pa.Table.from_pandas(tabla, schema=self.esquema, preserve_index=False))
+
+    def cerrar(self):
+        if self.escritor is not None:
+            self.escritor.close()
+
+class _SalidaHTML:
+    """Tablas HTML listas para imprimir a PDF: una sección por certificado, con salto de página."""
+
+    def __init__(self, archivo):
+        self.archivo = archivo
+        archivo.write(
+            "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>Uncertainty report</title><style>\n"
+            "body { font-family: sans-serif; font-size: 10pt; }\n"
+            "table { border-collapse: collapse; margin-bottom: 1em; }\n"
+            "th, td { border: 1px solid #999; padding: 2px 6px; text-align: left; }\n"
+            "section { page-break-after: always; }\n"
+            "</style></head><body>\n"
+        )
+
+    def escribir(self, tabla):
+        for cert_no, filas in tabla.groupby('cert_no', sort=False):
+            encabezado = filas.iloc[0]
+            self.archivo.write(f"<section>\n<h2>Certificate {html.escape(str(cert_no))}</h2>\n<table>\n")
+            for columna in COLUMNAS_CERTIFICADO:
+                valor = '' if pd.isna(encabezado[columna]) else encabezado[columna]
+                self.archivo.write(f"<tr><th>{html.escape(columna)}</th><td>{html.escape(str(valor))}</td></tr>\n")
+            self.archivo.write("</table>\n")
+            filas.drop(columns=['cert_no', *COLUMNAS_CERTIFICADO]).to_html(self.archivo, index=False, na_rep='')
+            self.archivo.write("\n</section>\n")
+
+    def cerrar(self):
+        self.archivo.write("</body></html>\n")
+
+_SALIDAS = {'csv': _SalidaCSV, 'parquet': _SalidaParquet, 'html': _SalidaHTML}
+
+def _bloques(cert_nos, tamano, hoy):
+    for inicio in range(0, len(cert_nos), tamano):
+        yield cert_nos[inicio:inicio + tamano], hoy
+
+def generar_informe(salida, cert_nos, workers, tamano_bloque, ruta_doc='doc'):
+    """Calcula el informe por bloques y lo escribe en `salida` a medida que llegan, en orden.
+
+    Devuelve (certificados, filas) escritos.
+    """
+    hoy = date.today()
+    certificados = filas = 0
+    bloques = _bloques(cert_nos, tamano_bloque, hoy)
+    # En el proceso actual hacen falta para workers <= 1; con fork, además, los heredan los hijos
+    _inicializar(ruta_doc)
+    if workers <= 1:
+        resultados = map(_tarea, bloques)
+        pool = None
+    else:
+        contexto = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+        # Sin fork cada proceso carga los datos (desde la caché mapeada) en su inicializador
+        gc.freeze()
+        pool = contexto.Pool(workers, initializer=_inicializar, initargs=(ruta_doc,))
+        resultados = pool.imap(_tarea, bloques)
+    try:
+        for n, tabla in resultados:
+            salida.escribir(tabla)
+            certificados += n
+            filas += len(tabla)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            gc.unfreeze()
+    salida.cerrar()
+    return certificados, filas
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Informe masivo de incertidumbre y TUR de los certificados del datalogger")
+    parser.add_argument('output', help="Archivo de salida ('-' = salida estándar, sólo csv/html)")
+    parser.add_argument('--format', choices=sorted(_SALIDAS), default=None, help="Por defecto se deduce de la extensión")
+    parser.add_argument('--workers', type=int, default=0, help="Procesos de trabajo (0 = uno por CPU)")
+    parser.add_argument('--chunk', type=int, default=0, help="Certificados por tarea (0 = automático)")
+    parser.add_argument('--cert', nargs='*', help="Limitar el informe a estos CertNo")
+    parser.add_argument('--doc', default='doc', help="Carpeta con los archivos JSON")
+    args = parser.parse_args(argv)
+
+    formato = args.format or os.path.splitext(args.output)[1].lstrip('.').lower()
+    if formato not in _SALIDAS:
+        parser.error("Indique --format (csv, parquet o html)")
+    if args.output == '-' and formato == 'parquet':
+        parser.error("La salida parquet requiere un archivo")
+
+    _inicializar(args.doc)
+    store = _DATOS['labrowe_datalogger']
+    if args.cert:
+        faltantes = [cert_no for cert_no in args.cert if cert_no not in store]
+        if faltantes:
+            parser.error(f"No se encontraron los certificados: {', '.join(faltantes)}")
+        cert_nos = list(dict.fromkeys(args.cert))
+    else:
+        cert_nos = list(store.cert_nos())
+    workers = args.workers or os.cpu_count()
+    # Varios bloques por proceso para repartir bien la carga sin multiplicar el coste por tarea
+    tamano_bloque = args.chunk or max(1, min(256, len(cert_nos) // (workers * 8) or 1))
+
+    inicio = time.perf_counter()
+    if args.output == '-':
+        archivo = sys.stdout
+    elif formato == 'parquet':
+        archivo = open(args.output, 'wb')
+    else:
+        archivo = open(args.output, 'w', encoding='utf-8', newline='')
+    try:
+        certificados, filas = generar_informe(_SALIDAS[formato](archivo), cert_nos, workers, tamano_bloque, args.doc)
+    finally:
+        if archivo is not sys.stdout:
+            archivo.close()
+    print(f"{certificados} certificados, {filas} filas en {time.perf_counter() - inicio:.2f} s ({workers} procesos)", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# standardsIndex.py
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+
+from certificateModel import Standard, parsear_fecha
+
+def estado_vencimiento(due_date, hoy):
+    """Estado de un patrón según su fecha de vencimiento (date o None): (estado, detalle)."""
+    if due_date is None:
+        return "Invalid date", "Unable to calculate"
+    days_until_expiration = (due_date - hoy).days
+    if days_until_expiration < 0:
+        return "Expired", f"{abs(days_until_expiration)} days ago"
+    elif days_until_expiration == 0:
+        return "Expires today", "Today"
+    else:
+        return "Valid", f"{days_until_expiration} days remaining"
+
+class StandardsIndex:
+    """Índice de vencimientos de los patrones (Standards) usados en los certificados.
+
+    Guarda las fechas de vencimiento ya convertidas y ordenadas, de modo que las consultas
+    por ventana de fechas son una bisección, y un mapa inverso SerialNo -> certificados.
+    Los estados calculados se memorizan por texto de fecha y se descartan al cambiar el día.
+    """
+
+    def __init__(self, estandares=()):
+        self.fechas = []
+        self.entradas = []
+        self.por_serie = {}
+        self.por_certificado = {}
+        self.invalidos = []
+        self._dia = None
+        self._estados = {}
+        entradas = []
+        for cert_no, standards in estandares:
+            entradas.extend(self._registrar(cert_no, standards))
+        entradas.sort(key=lambda entrada: entrada[0])
+        self.fechas = [due_date for due_date, _, _ in entradas]
+        self.entradas = [(cert_no, standard) for _, cert_no, standard in entradas]
+
+    def _registrar(self, cert_no, standards):
+        entradas = []
+        for standard in standards:
+            standard = standard if isinstance(standard, Standard) else Standard.desde_dict(standard)
+            certificados = self.por_serie.setdefault(standard.serial_no, [])
+            if cert_no not in certificados:
+                certificados.append(cert_no)
+            if standard.due_date is None:
+                self.invalidos.append((cert_no, standard))
+                continue
+            proximo = self.por_certificado.get(cert_no)
+            if proximo is None or standard.due_date < proximo.due_date:
+                self.por_certificado[cert_no] = standard
+            entradas.append((standard.due_date, cert_no, standard))
+        return entradas
+
+    def agregar(self, cert_no, standards):
+        """Incorpora los patrones de un certificado nuevo manteniendo el orden."""
+        for due_date, cert_no, standard in self._registrar(cert_no, standards):
+            posicion = bisect_right(self.fechas, due_date)
+            self.fechas.insert(posicion, due_date)
+            self.entradas.insert(posicion, (cert_no, standard))
+
+    def copia(self):
+        """Copia independiente, para añadir patrones sin modificar un índice que otros hilos leen."""
+        indice = StandardsIndex()
+        indice.fechas = list(self.fechas)
+        indice.entradas = list(self.entradas)
+        indice.por_serie = {serial_no: list(cert_nos) for serial_no, cert_nos in self.por_serie.items()}
+        indice.por_certificado = dict(self.por_certificado)
+        indice.invalidos = list(self.invalidos)
+        return indice
+
+    def vencen_entre(self, desde, hasta):
+        """Entradas (cert_no, standard) con vencimiento en [desde, hasta], en orden de fecha."""
+        return self.entradas[bisect_left(self.fechas, desde):bisect_right(self.fechas, hasta)]
+
+    def vencen_en(self, dias, hoy=None):
+        hoy = hoy or date.today()
+        try:
+            hasta = hoy + timedelta(days=dias)
+        except OverflowError:
+            # La ventana pasa del último (o primer) día representable
+            hasta = date.max if dias > 0 else date.min
+        return self.vencen_entre(hoy, hasta)
+
+    def vencidos(self, hoy=None):
+        return self.entradas[:bisect_left(self.fechas, hoy or date.today())]
+
+    def certificados_que_vencen_en(self, dias, hoy=None):
+        """Certificados con algún patrón que vence en los próximos `dias` días, sin repetir."""
+        return list(dict.fromkeys(cert_no for cert_no, _ in self.vencen_en(dias, hoy)))
+
+    def certificados_por_serie(self, serial_no):
+        return self.por_serie.get(serial_no, [])
+
+    def proximo_vencimiento(self, cert_no):
+        """Patrón del certificado que vence antes (None si ninguno tiene fecha válida)."""
+        return self.por_certificado.get(cert_no)
+
+    def estado(self, due_date_texto):
+        hoy = date.today()
+        if hoy != self._dia:
+            self._dia, self._estados = hoy, {}
+        estado = self._estados.get(due_date_texto)
+        if estado is None:
+            estado = self._estados[due_date_texto] = estado_vencimiento(parsear_fecha(due_date_texto), hoy)
+        return estado
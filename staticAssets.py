@@ -0,0 +1,106 @@
+# staticAssets.py
+import hashlib
+import io
+import json
+import os
+
+from htmlTemplates import CSS_BUNDLE
+
+# Streamlit sirve la carpeta static/ junto a app.py en app/static/ (server.enableStaticServing)
+CARPETA_STATIC = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+URL_STATIC = 'app/static'
+MANIFIESTO = 'manifest.json'
+
+def _hash(datos):
+    return hashlib.sha256(datos).hexdigest()[:12]
+
+def _nombre_con_hash(nombre, datos):
+    base, extension = os.path.splitext(nombre)
+    return f"{base}.{_hash(datos)}{extension}"
+
+def _optimizar_imagen(datos, nombre):
+    """Recomprime la imagen sin pérdida con Pillow; devuelve la versión más pequeña."""
+    if not nombre.lower().endswith('.png'):
+        return datos
+    try:
+        from PIL import Image
+    except ImportError:
+        return datos
+    salida = io.BytesIO()
+    with Image.open(io.BytesIO(datos)) as imagen:
+        imagen.save(salida, format='PNG', optimize=True)
+    return min(datos, salida.getvalue(), key=len)
+
+def _escribir(ruta, datos):
+    # Los nombres llevan el hash del contenido: si el archivo existe ya es idéntico
+    if os.path.exists(ruta):
+        return
+    temporal = f"{ruta}.tmp{os.getpid()}"
+    with open(temporal, 'wb') as archivo:
+        archivo.write(datos)
+    os.replace(temporal, ruta)
+
+def _leer_manifiesto(destino):
+    try:
+        with open(os.path.join(destino, MANIFIESTO), encoding='utf-8') as archivo:
+            return json.load(archivo)
+    except (OSError, ValueError):
+        return {}
+
+def construir_assets(imagenes=('images/background.png',), destino=CARPETA_STATIC):
+    """Genera en `destino` las imágenes optimizadas y la hoja de estilos con nombres con hash.
+
+    Devuelve el manifiesto {nombre lógico: archivo generado}, p. ej.
+    {'background.png': 'background.3f2a...png', 'styles.css': 'styles.9c1d...css'}.
+    Las imágenes sólo se recomprimen si cambió su contenido de origen; los archivos de
+    versiones anteriores que ya no figuran en el manifiesto se eliminan.
+    """
+    os.makedirs(destino, exist_ok=True)
+    anterior = _leer_manifiesto(destino)
+    fuentes = anterior.get('_fuentes', {})
+    manifiesto = {'_fuentes': {}}
+
+    for ruta in imagenes:
+        nombre = os.path.basename(ruta)
+        with open(ruta, 'rb') as archivo:
+            datos = archivo.read()
+        hash_fuente = _hash(datos)
+        generado = anterior.get(nombre)
+        if fuentes.get(nombre) != hash_fuente or not generado or not os.path.exists(os.path.join(destino, generado)):
+            optimizado = _optimizar_imagen(datos, nombre)
+            generado = _nombre_con_hash(nombre, optimizado)
+            _escribir(os.path.join(destino, generado), optimizado)
+        manifiesto[nombre] = generado
+        manifiesto['_fuentes'][nombre] = hash_fuente
+
+    # Las URL de la hoja son relativas a ella, que se sirve desde la misma carpeta
+    css = CSS_BUNDLE.format(background_url=manifiesto.get('background.png', '')).encode('utf-8')
+    manifiesto['styles.css'] = _nombre_con_hash('styles.css', css)
+    _escribir(os.path.join(destino, manifiesto['styles.css']), css)
+
+    vigentes = {generado for nombre, generado in manifiesto.items() if nombre != '_fuentes'}
+    for nombre, generado in anterior.items():
+        if nombre != '_fuentes' and generado not in vigentes:
+            try:
+                os.remove(os.path.join(destino, generado))
+            except OSError:
+                pass
+    if manifiesto != anterior:
+        _escribir_manifiesto(destino, manifiesto)
+    return manifiesto
+
+def _escribir_manifiesto(destino, manifiesto):
+    temporal = os.path.join(destino, f"{MANIFIESTO}.tmp{os.getpid()}")
+    with open(temporal, 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo, indent=2)
+    os.replace(temporal, os.path.join(destino, MANIFIESTO))
+
+def url_asset(manifiesto, nombre):
+    """URL relativa con la que la página pide un asset generado."""
+    return f"{URL_STATIC}/{manifiesto[nombre]}"
+
+if __name__ == '__main__':
+    # Permite generar los assets durante el despliegue (p. ej. con el sistema de archivos de solo lectura después)
+    for nombre, generado in construir_assets().items():
+        if nombre != '_fuentes':
+            print(f"{nombre} -> {generado}")
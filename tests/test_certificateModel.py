@@ -0,0 +1,23 @@
+# test_certificateModel.py
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from certificateModel import Certificate, Measurement
+
+def test_solo_existen_las_claves_del_json():
+    medicion = Measurement.desde_dict({'RowId': 1, 'Units': '°C', 'Nominal': '90.0', 'Extra': 3})
+    assert list(medicion) == ['RowId', 'Units', 'Nominal', 'Extra']
+    assert 'LowLimit' not in medicion and 'Extra' in medicion
+    assert medicion.get('LowLimit', 'sin límite') == 'sin límite'
+    assert medicion.a_dict() == {'RowId': 1, 'Units': '°C', 'Nominal': '90.0', 'Extra': 3}
+
+def test_valor_null_sigue_presente():
+    certificado = Certificate.desde_dict({'CertNo': 'C1', 'Model': 'M', 'Remarks': None, 'Datasheet': []})
+    assert 'Remarks' in certificado and certificado.get('Remarks', 'x') is None
+    assert 'Manufacturer' not in certificado and certificado.get('Manufacturer', 'x') == 'x'
+
+def test_nominal_ausente_como_los_demas_campos_numericos():
+    medicion = Measurement.desde_dict({'RowId': 1, 'Nominal': None, 'LowLimit': None})
+    assert medicion.nominal_texto == medicion.low_limit_texto == ''
@@ -0,0 +1,80 @@
+# test_rangeIndex.py
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+from ScalesBalances import RangeIndex, compilar_cmc, identificar_rango_en_certificado
+
+@pytest.mark.parametrize('texto, magnitud, fijo, proporcional', [
+    # Balanzas grandes: 5.5 g fijos más 2.8 g por cada 25 kg
+    ('5.5 g + 2.8 g / 25 kg', 'masa', 5.5e-3, 2.8e-3 / 25),
+    ('3.5 μg + 0.33 μg/g', 'masa', 3.5e-9, 0.33e-6),
+    ('0.05 % of reading', None, 0.0, 5e-4),
+    ('0.1 °C + 0.05 % of reading', 'temperatura', 0.1, 5e-4),
+    ('7.5 kg/15 000 kg', 'masa', 0.0, 7.5 / 15000),
+    ('0.028 °C', 'temperatura', 0.028, 0.0),
+])
+def test_formas_de_cmc(texto, magnitud, fijo, proporcional):
+    cmc = compilar_cmc(texto)
+    assert cmc.magnitud == magnitud
+    assert cmc.fijo == pytest.approx(fijo)
+    assert cmc.proporcional == pytest.approx(proporcional)
+
+def _recorrido_lineal(registros, valor, equipment):
+    # Referencia: el primer registro del archivo cuyo rango cubre el valor
+    for posicion, registro in enumerate(registros):
+        if registro['Equipment'] == equipment and registro['Range']['Min'] <= valor <= registro['Range']['Max']:
+            return posicion
+    return -1
+
+def _registros_aleatorios(generador, cantidad):
+    registros = []
+    for i in range(cantidad):
+        minimo = generador.choice([generador.randint(0, 50), round(generador.uniform(0, 50), 3)])
+        maximo = minimo + generador.choice([0, generador.randint(1, 20), round(generador.uniform(0, 20), 3)])
+        registros.append({'ID': i + 1, 'Equipment': generador.choice(['A', 'B']),
+                          'Range': {'Min': minimo, 'Max': maximo, 'Unit': '°C'}, 'CMC': '0.1 °C'})
+    return registros
+
+@pytest.mark.parametrize('semilla', range(20))
+def test_coincide_con_recorrido_lineal(semilla):
+    generador = random.Random(semilla)
+    registros = _registros_aleatorios(generador, generador.randint(1, 30))
+    indice = RangeIndex(registros)
+    limites = sorted({v for r in registros for v in (r['Range']['Min'], r['Range']['Max'])})
+    # Los límites exactos, los puntos entre límites y valores fuera de todos los rangos
+    valores = limites + [(a + b) / 2 for a, b in zip(limites, limites[1:])] + [-1.0, 71.5]
+    valores += [generador.uniform(-5, 75) for _ in range(50)]
+    for equipment in ('A', 'B', 'C'):
+        esperado = [_recorrido_lineal(registros, valor, equipment) for valor in valores]
+        assert [indice.buscar_posicion(valor, equipment) for valor in valores] == esperado
+        assert indice.buscar_posiciones(valores, equipment).tolist() == esperado
+
+def test_identificar_rango_usa_el_primer_registro():
+    registros = [
+        {'ID': 1, 'Equipment': 'A', 'Range': {'Min': 0, 'Max': 10, 'Unit': '°C'}, 'CMC': '0.1 °C'},
+        {'ID': 2, 'Equipment': 'A', 'Range': {'Min': 5, 'Max': 20, 'Unit': '°C'}, 'CMC': '0.2 °C'},
+    ]
+    assert identificar_rango_en_certificado(registros, 10, 'A') == (1, '0.1 °C')
+    assert identificar_rango_en_certificado(registros, 10.5, 'A') == (2, '0.2 °C')
+    with pytest.raises(ValueError):
+        identificar_rango_en_certificado(registros, 25, 'A')
+
+def test_busqueda_con_conversion_de_unidades():
+    registros = [
+        {'ID': 1, 'Equipment': 'T', 'Range': {'Min': -40, 'Max': 0, 'Unit': '°C'}, 'CMC': '0.05 °C'},
+        {'ID': 2, 'Equipment': 'T', 'Range': {'Min': 32, 'Max': 212, 'Unit': '°F'}, 'CMC': '0.1 °C'},
+    ]
+    indice = RangeIndex(registros)
+    # El segundo rango se guarda en °C (0 a 100); 0 °C sigue perteneciendo al primero
+    assert indice.buscar_posicion(50, 'T') == 1
+    assert indice.buscar_posicion(0, 'T') == 0
+    assert indice.buscar_posicion(98.6, 'T', '°F') == 1
+    assert indice.buscar_posicion(310.15, 'T', 'K') == 1
+    assert indice.buscar_posicion(-4, 'T', '°F') == 0
+    assert indice.buscar_posiciones(np.array([-10.0, 37.0, 150.0]), 'T').tolist() == [0, 1, -1]
@@ -0,0 +1,29 @@
+# test_standardsIndex.py
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from standardsIndex import StandardsIndex
+
+HOY = date(2026, 1, 15)
+
+def _indice():
+    return StandardsIndex([
+        ('C1', [{'SerialNo': 'A', 'DueDate': '01/20/2026'}, {'SerialNo': 'B', 'DueDate': '12/31/2030'}]),
+        ('C2', [{'SerialNo': 'A', 'DueDate': '01/10/2026'}, {'SerialNo': 'C', 'DueDate': 'sin fecha'}]),
+    ])
+
+def test_vencen_en_ventana():
+    indice = _indice()
+    assert [(cert_no, s.serial_no) for cert_no, s in indice.vencen_en(30, HOY)] == [('C1', 'A')]
+    assert [(cert_no, s.serial_no) for cert_no, s in indice.vencidos(HOY)] == [('C2', 'A')]
+    assert indice.certificados_por_serie('A') == ['C1', 'C2']
+
+def test_ventana_fuera_del_rango_de_fechas():
+    indice = _indice()
+    # timedelta no admite estos días: la ventana llega hasta el último día representable
+    for dias in (3_000_000, 100_000_000_000):
+        assert [s.serial_no for _, s in indice.vencen_en(dias, HOY)] == ['A', 'B']
+    assert indice.vencen_en(-100_000_000_000, HOY) == []
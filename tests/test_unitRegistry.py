@@ -0,0 +1,72 @@
+# test_unitRegistry.py
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+
+from unitRegistry import ADIMENSIONAL, UNIDADES
+
+@pytest.mark.parametrize('texto, simbolo, magnitud, factor', [
+    ('kg', 'kg', 'masa', 1.0),
+    ('g', 'g', 'masa', 1e-3),
+    ('mg', 'mg', 'masa', 1e-6),
+    ('μg', 'μg', 'masa', 1e-9),
+    ('ug', 'ug', 'masa', 1e-9),
+    ('lb', 'lb', 'masa', 0.45359237),
+    ('degC', '°C', 'temperatura', 1.0),
+    ('% RH', '%RH', 'humedad', 1.0),
+    ('bar', 'bar', 'presion', 1e5),
+    ('bar a', 'bar a', 'presion absoluta', 1e5),
+    ('kPa abs', 'kPa abs', 'presion absoluta', 1e3),
+    ('psig', 'psig', 'presion manometrica', 6894.757293168361),
+    ('%', '%', ADIMENSIONAL, 1e-2),
+])
+def test_unidades_simples(texto, simbolo, magnitud, factor):
+    unidad = UNIDADES.unidad(texto)
+    assert (unidad.simbolo, unidad.magnitud) == (simbolo, magnitud)
+    assert unidad.factor == pytest.approx(factor)
+    assert unidad.desplazamiento == 0.0
+
+@pytest.mark.parametrize('texto, factor', [
+    ('μg/g', 1e-6),
+    ('g / 25 kg', 1e-3 / 25),
+    ('kg/15 000 kg', 1 / 15000),
+])
+def test_cocientes_de_masa_son_adimensionales(texto, factor):
+    unidad = UNIDADES.unidad(texto)
+    assert unidad.magnitud == ADIMENSIONAL
+    assert unidad.factor == pytest.approx(factor)
+
+@pytest.mark.parametrize('texto', ['furlong', 'm/s^2', ''])
+def test_unidad_desconocida(texto):
+    with pytest.raises(ValueError):
+        UNIDADES.unidad(texto)
+
+def test_conversion_entre_magnitudes_distintas():
+    with pytest.raises(ValueError):
+        UNIDADES.convertir(1.0, 'kg', '°C')
+
+@pytest.mark.parametrize('valor, origen, destino, esperado', [
+    (37.0, '°C', '°F', 98.6),
+    (98.6, '°F', '°C', 37.0),
+    (-40.0, '°C', '°F', -40.0),
+    (0.0, '°C', 'K', 273.15),
+    (32.0, '°F', 'K', 273.15),
+    (1500.0, 'g', 'kg', 1.5),
+])
+def test_conversion_afin(valor, origen, destino, esperado):
+    assert UNIDADES.convertir(valor, origen, destino) == pytest.approx(esperado)
+
+def test_conversion_de_arreglos():
+    celsius = np.array([-40.0, 0.0, 37.0, 100.0])
+    np.testing.assert_allclose(UNIDADES.convertir(celsius, '°C', 'K'), celsius + 273.15)
+    np.testing.assert_allclose(UNIDADES.convertir(UNIDADES.convertir(celsius, '°C', '°F'), '°F', '°C'), celsius)
+
+def test_diferencias_sin_desplazamiento():
+    # Una incertidumbre de 1 °C es de 1.8 °F y de 1 K, no de 33.8 °F ni de 274.15 K
+    assert UNIDADES.convertir_diferencia(1.0, '°C', '°F') == pytest.approx(1.8)
+    assert UNIDADES.convertir_diferencia(1.0, '°C', 'K') == pytest.approx(1.0)
+    assert UNIDADES.a_base(32.0, '°F') == pytest.approx(0.0)
@@ -0,0 +1,234 @@
+# unitRegistry.py
+import re
+import threading
+from fractions import Fraction
+from typing import NamedTuple
+
+import numpy as np
+
+# Magnitud de las proporciones ('%', 'ppm', 'μg/g', 'g / 25 kg'): su unidad base es la fracción 1
+ADIMENSIONAL = 'adimensional'
+
+NUMERO = r'[-+]?(?:\d+(?:[ \u00a0]\d{3})*(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?'
+_DENOMINADOR = re.compile(rf'^(?P<valor>{NUMERO})?\s*(?P<unidad>.+)$')
+_HUMEDAD = re.compile(r'%\s*(?:RH|HR)\b', re.IGNORECASE)
+# Referencia de presión: 'bar a', 'bar(g)', 'psia', 'kPa abs'
+_REFERENCIA_PRESION = re.compile(r'^(?P<unidad>.+?)\s*(?:\((?P<entre_parentesis>[ag])\)|(?P<letra>[ag])|(?P<abs>abs))$')
+_POTENCIA = re.compile(r'^(?P<unidad>.+?)(?P<exponente>[23²³])$')
+
+PREFIJOS = {
+    'p': 1e-12, 'n': 1e-9, 'μ': 1e-6, 'u': 1e-6, 'm': 1e-3, 'c': 1e-2, 'd': 1e-1,
+    'h': 1e2, 'k': 1e3, 'M': 1e6, 'G': 1e9,
+}
+
+class Unit(NamedTuple):
+    """Unidad compilada: valor en la unidad base de su magnitud = (valor + desplazamiento) * factor."""
+    simbolo: str
+    magnitud: str
+    factor: float
+    desplazamiento: float = 0.0
+
+# (símbolo, magnitud, factor, desplazamiento, admite prefijos SI). Unidades base: kg, °C (lecturas;
+# K para diferencias), %RH, Pa, m, m³, V, A, Ω, Hz, W, F, s y la fracción 1
+DEFINICIONES = (
+    ('1', ADIMENSIONAL, 1.0, 0.0, False),
+    ('%', ADIMENSIONAL, 1e-2, 0.0, False),
+    ('% of reading', ADIMENSIONAL, 1e-2, 0.0, False),
+    ('% of rdg', ADIMENSIONAL, 1e-2, 0.0, False),
+    ('% rdg', ADIMENSIONAL, 1e-2, 0.0, False),
+    ('ppm', ADIMENSIONAL, 1e-6, 0.0, False),
+    ('g', 'masa', 1e-3, 0.0, True),
+    ('kg', 'masa', 1.0, 0.0, False),
+    ('t', 'masa', 1e3, 0.0, False),
+    ('lb', 'masa', 0.45359237, 0.0, False),
+    ('oz', 'masa', 0.028349523125, 0.0, False),
+    ('°C', 'temperatura', 1.0, 0.0, False),
+    ('K', 'temperatura', 1.0, -273.15, True),
+    ('°F', 'temperatura', 5 / 9, -32.0, False),
+    ('%RH', 'humedad', 1.0, 0.0, False),
+    ('Pa', 'presion', 1.0, 0.0, True),
+    ('bar', 'presion', 1e5, 0.0, True),
+    ('psi', 'presion', 6894.757293168361, 0.0, False),
+    ('atm', 'presion', 101325.0, 0.0, False),
+    ('Torr', 'presion', 101325 / 760, 0.0, False),
+    ('mmHg', 'presion', 133.322387415, 0.0, False),
+    ('inHg', 'presion', 3386.388640341, 0.0, False),
+    ('mmH2O', 'presion', 9.80665, 0.0, False),
+    ('inH2O', 'presion', 249.08891, 0.0, False),
+    ('kgf/cm²', 'presion', 98066.5, 0.0, False),
+    ('m', 'longitud', 1.0, 0.0, True),
+    ('in', 'longitud', 0.0254, 0.0, False),
+    ('ft', 'longitud', 0.3048, 0.0, False),
+    ('L', 'volumen', 1e-3, 0.0, True),
+    ('gal', 'volumen', 3.785411784e-3, 0.0, False),
+    ('V', 'tension', 1.0, 0.0, True),
+    ('A', 'corriente', 1.0, 0.0, True),
+    ('Ω', 'resistencia', 1.0, 0.0, True),
+    ('Hz', 'frecuencia', 1.0, 0.0, True),
+    ('W', 'potencia', 1.0, 0.0, True),
+    ('F', 'capacitancia', 1.0, 0.0, True),
+    ('s', 'tiempo', 1.0, 0.0, True),
+    ('min', 'tiempo', 60.0, 0.0, False),
+    ('h', 'tiempo', 3600.0, 0.0, False),
+)
+
+# Otras grafías que aparecen en los certificados
+ALIAS = {
+    '° C': '°C', 'deg C': '°C', 'degC': '°C', 'Celsius': '°C',
+    '° F': '°F', 'degF': '°F', 'Fahrenheit': '°F',
+    'l': 'L', 'ohm': 'Ω', 'Ohm': 'Ω', 'PSI': 'psi', 'kg/cm²': 'kgf/cm²', 'kgf/cm2': 'kgf/cm²',
+    'PPM': 'ppm', '% Of Reading': '% of reading', '% of Reading': '% of reading', '%rdg': '% rdg',
+}
+
+_REFERENCIAS = {'a': 'presion absoluta', 'abs': 'presion absoluta', 'g': 'presion manometrica'}
+_POTENCIAS = {'2': ('area', 2), '²': ('area', 2), '3': ('volumen', 3), '³': ('volumen', 3)}
+
+def _escala(factor_origen, factor_destino):
+    """(multiplicador, divisor) de una conversión.
+
+    Los cocientes simples (9/5, 1000, 1/1000) se aplican como enteros para que 37 °C den
+    exactamente 98.6 °F; los demás, como factor de origen / factor de destino.
+    """
+    cociente = factor_origen / factor_destino
+    fraccion = Fraction(cociente).limit_denominator(1000)
+    if abs(fraccion - Fraction(cociente)) <= abs(cociente) * 1e-15:
+        return float(fraccion.numerator), float(fraccion.denominator)
+    return factor_origen, factor_destino
+
+class UnitRegistry:
+    """Registro de unidades: cada texto de unidad se interpreta una sola vez.
+
+    Guarda las unidades ya interpretadas y los pares (escala, desplazamiento) de cada
+    conversión, que se aplican igual a escalares que a arreglos de NumPy. Las conversiones
+    entre magnitudes distintas y las unidades desconocidas lanzan ValueError.
+    """
+
+    def __init__(self, definiciones=DEFINICIONES, alias=ALIAS):
+        self._base = {}
+        self._prefijables = {}
+        self._alias = {}
+        self._unidades = {}
+        self._conversiones = {}
+        self._lock = threading.Lock()
+        for simbolo, magnitud, factor, desplazamiento, prefijos in definiciones:
+            self.registrar(simbolo, magnitud, factor, desplazamiento, prefijos)
+        for texto, simbolo in alias.items():
+            self._alias[texto] = simbolo
+
+    def registrar(self, simbolo, magnitud, factor, desplazamiento=0.0, prefijos=False):
+        with self._lock:
+            unidad = Unit(simbolo, magnitud, float(factor), float(desplazamiento))
+            self._base[simbolo] = unidad
+            if prefijos:
+                self._prefijables[simbolo] = unidad
+            # Un símbolo nuevo puede cambiar cómo se interpretan textos ya vistos
+            self._unidades = {}
+            self._conversiones = {}
+
+    @staticmethod
+    def _normalizar(texto):
+        # Micro, ohmio y grado tienen variantes Unicode que se ven iguales
+        texto = re.sub(r'\s+', ' ', str(texto).strip()).replace('µ', 'μ').replace('\u2126', 'Ω').replace('º', '°')
+        return _HUMEDAD.sub('%RH', texto)
+
+    def _simple(self, texto):
+        texto = self._alias.get(texto, texto)
+        unidad = self._base.get(texto)
+        if unidad is not None:
+            return unidad
+        for prefijo, escala in PREFIJOS.items():
+            if texto.startswith(prefijo) and len(texto) > len(prefijo):
+                base = self._prefijables.get(self._alias.get(texto[len(prefijo):], texto[len(prefijo):]))
+                if base is not None:
+                    return Unit(texto, base.magnitud, base.factor * escala, base.desplazamiento / escala)
+        coincidencia = _POTENCIA.match(texto)
+        if coincidencia:
+            base = self._simple(coincidencia['unidad'])
+            if base is not None and base.magnitud == 'longitud':
+                magnitud, exponente = _POTENCIAS[coincidencia['exponente']]
+                return Unit(texto, magnitud, base.factor ** exponente)
+        coincidencia = _REFERENCIA_PRESION.match(texto)
+        if coincidencia:
+            base = self._simple(coincidencia['unidad'])
+            if base is not None and base.magnitud == 'presion':
+                referencia = coincidencia['entre_parentesis'] or coincidencia['letra'] or 'abs'
+                return Unit(texto, _REFERENCIAS[referencia], base.factor)
+        return None
+
+    def _interpretar(self, texto):
+        normalizado = self._normalizar(texto)
+        unidad = self._simple(normalizado)
+        if unidad is None and '/' in normalizado:
+            # Cociente, p. ej. 'μg/g' o 'g / 25 kg': adimensional si ambas partes son de la misma magnitud
+            numerador, denominador = (parte.strip() for parte in normalizado.split('/', 1))
+            coincidencia = _DENOMINADOR.match(denominador)
+            arriba = self._simple(numerador)
+            abajo = self._simple(coincidencia['unidad'].strip()) if coincidencia else None
+            # Los desplazamientos no intervienen: un cociente relaciona diferencias (°C/min, μg/g)
+            if arriba is not None and abajo is not None:
+                cantidad = float(re.sub(r'[ \u00a0]', '', coincidencia['valor'])) if coincidencia['valor'] else 1.0
+                magnitud = ADIMENSIONAL if arriba.magnitud == abajo.magnitud else f"{arriba.magnitud}/{abajo.magnitud}"
+                unidad = Unit(normalizado, magnitud, arriba.factor / (cantidad * abajo.factor))
+        if unidad is None:
+            raise ValueError(f"Unidad no soportada: {texto}")
+        return unidad
+
+    def unidad(self, texto):
+        """Unit de un texto como 'mg', '°F', 'bar a', '% RH' o 'μg/g'."""
+        unidad = self._unidades.get(texto)
+        if unidad is None:
+            unidad = self._interpretar(texto)
+            self._unidades[texto] = unidad
+        return unidad
+
+    def magnitud(self, texto):
+        return self.unidad(texto).magnitud
+
+    def _conversion(self, origen, destino):
+        # (desplazamiento de origen, multiplicador, divisor, desplazamiento de destino)
+        clave = (origen, destino)
+        conversion = self._conversiones.get(clave)
+        if conversion is None:
+            desde, hacia = self.unidad(origen), self.unidad(destino)
+            if desde.magnitud != hacia.magnitud:
+                raise ValueError(f"Conversión no soportada: de {origen} a {destino}")
+            conversion = (desde.desplazamiento, *_escala(desde.factor, hacia.factor), hacia.desplazamiento)
+            self._conversiones[clave] = conversion
+        return conversion
+
+    def escala(self, origen, destino):
+        """Factor que convierte diferencias e incertidumbres de `origen` a `destino`."""
+        _, multiplicador, divisor, _ = self._conversion(origen, destino)
+        return multiplicador / divisor
+
+    def convertir(self, valor, origen, destino):
+        """Convierte una lectura (escalar, lista o arreglo) aplicando también el desplazamiento (°F, °C, K)."""
+        antes, multiplicador, divisor, despues = self._conversion(origen, destino)
+        if isinstance(valor, (list, tuple)):
+            valor = np.asarray(valor, dtype=float)
+        if antes:
+            valor = valor + antes
+        if multiplicador != 1:
+            valor = valor * multiplicador
+        if divisor != 1:
+            valor = valor / divisor
+        return valor - despues if despues else valor
+
+    def convertir_diferencia(self, valor, origen, destino):
+        """Convierte una diferencia o incertidumbre: sólo la escala (1 °C de diferencia son 1.8 °F)."""
+        _, multiplicador, divisor, _ = self._conversion(origen, destino)
+        if isinstance(valor, (list, tuple)):
+            valor = np.asarray(valor, dtype=float)
+        if multiplicador != 1:
+            valor = valor * multiplicador
+        return valor / divisor if divisor != 1 else valor
+
+    def a_base(self, valor, unidad):
+        """Lectura en la unidad base de su magnitud (kg, °C, Pa, ...)."""
+        unidad = self.unidad(unidad)
+        if isinstance(valor, (list, tuple)):
+            valor = np.asarray(valor, dtype=float)
+        return (valor + unidad.desplazamiento) * unidad.factor if unidad.desplazamiento else valor * unidad.factor
+
+# Registro compartido por la aplicación, la API y los informes
+UNIDADES = UnitRegistry()